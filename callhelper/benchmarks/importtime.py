@@ -0,0 +1,91 @@
+"""
+Import-time profile of web and Celery worker startup
+
+Runs each startup path in a fresh interpreter with `-X importtime` and
+prints the wall time plus the slowest top-level imports, so regressions
+in cold start (autoscaled workers) are easy to spot.
+
+    cd callhelper
+    python -m benchmarks.importtime
+"""
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+TOP = 15
+REPEAT = 3
+
+SCENARIOS = {
+    'django.setup()': 'import django; django.setup()',
+    'web (urls + views)': (
+        'import django; django.setup(); '
+        'from django.urls import get_resolver; get_resolver().url_patterns'
+    ),
+    'celery worker (tasks)': (
+        'from callhelper.celery import app; '
+        'app.loader.import_default_modules()'
+    ),
+}
+
+
+def _env():
+    env = os.environ.copy()
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'callhelper.settings')
+    return env
+
+
+def run(code, importtime=False):
+    """Runs `code` in a new interpreter, returns (seconds, stderr)"""
+    args = [sys.executable]
+    if importtime:
+        args += ['-X', 'importtime']
+    args += ['-c', code]
+    started = time.perf_counter()
+    result = subprocess.run(
+        args, cwd=PROJECT_DIR, env=_env(), capture_output=True, text=True, check=True
+    )
+    return time.perf_counter() - started, result.stderr
+
+
+def parse_importtime(stderr):
+    """Returns [(cumulative_us, module)] for top-level imports"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Вложенные импорты отмечены отступом, берем только верхний уровень
+        if name.startswith('  ', 1):
+            continue
+        rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    return rows
+
+
+def main():
+    for label, code in SCENARIOS.items():
+        best = min(run(code)[0] for _ in range(REPEAT))
+        _, stderr = run(code, importtime=True)
+        print(f"{label}: {best * 1000:.0f} ms (best of {REPEAT})")
+        for cumulative, name in parse_importtime(stderr)[:TOP]:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+        print()
+
+    best = min(run_check() for _ in range(REPEAT))
+    print(f"manage.py check: {best * 1000:.0f} ms (best of {REPEAT})")
+
+
+def run_check():
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, 'manage.py', 'check'],
+        cwd=PROJECT_DIR, env=_env(), capture_output=True, check=True,
+    )
+    return time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Throughput of public_link -> session lookups
+
+Compares a direct DB lookup with the resolver (in-process LRU, shared
+cache only) for existing links and for random links a bot would probe.
+Runs against a throwaway test database created like `manage.py test`
+and the configured cache backend. The link sets are kept small enough to
+fit LocMemCache's default MAX_ENTRIES, so no culling skews the numbers.
+
+    cd callhelper
+    python -m benchmarks.link_bench
+"""
+import os
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'callhelper.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.test.runner import DiscoverRunner  # noqa: E402
+
+SESSIONS = 100
+LOOKUPS = 20000
+
+
+def measure(label, func, links):
+    started = time.perf_counter()
+    for link in links:
+        func(link)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {len(links) / elapsed:>12,.0f} lookups/s")
+
+
+def main():
+    from bookings import links as link_module
+    from bookings.links import generate_public_link, resolve_public_link
+    from bookings.models import BookingSession
+
+    owner = User.objects.create_user('bench-owner')
+    BookingSession.objects.bulk_create(
+        BookingSession(owner_session=owner, title=f'Session {i}', public_link=generate_public_link())
+        for i in range(SESSIONS)
+    )
+    existing = list(BookingSession.objects.values_list('public_link', flat=True))
+    hits = [existing[i % len(existing)] for i in range(LOOKUPS)]
+    misses = [generate_public_link() for _ in range(SESSIONS)] * (LOOKUPS // SESSIONS)
+
+    def db_lookup(link):
+        return BookingSession.objects.filter(public_link=link).values_list('id', flat=True).first()
+
+    def shared_cache_only(link):
+        link_module._local.clear()
+        return resolve_public_link(link)
+
+    for title, sample in (('existing links', hits), ('random links (bots)', misses)):
+        print(f"{title}:")
+        measure('DB query', db_lookup, sample)
+        cache.clear()
+        link_module._local.clear()
+        measure('resolver, shared cache', shared_cache_only, sample)
+        measure('resolver, in-process LRU', resolve_public_link, sample)
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        main()
+    finally:
+        runner.teardown_databases(old_config)
@@ -0,0 +1,138 @@
+"""
+Benchmark of my_slots / public_view rendering at 1k and 10k rows
+
+Renders the real templates with unsaved in-memory objects (no database),
+comparing a cold render (empty fragment cache) with a warm one.
+
+    cd callhelper
+    python -m benchmarks.render_bench
+"""
+import os
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'callhelper.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import AnonymousUser, User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.template.loader import render_to_string  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+
+from bookings.models import BookingSession, TimeSlot  # noqa: E402
+from bookings.views import _url_template, _with_slot_urls, _SAMPLE_ID, _SAMPLE_LINK  # noqa: E402
+
+SIZES = (1000, 10000)
+REPEAT = 3
+
+
+def make_slots(count):
+    owner = User(id=1, username='owner')
+    session = BookingSession(id=1, owner_session=owner, title='Calls', public_link='abc123')
+    start = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+    updated = datetime(2029, 1, 1, tzinfo=dt_timezone.utc)
+    slots = []
+    for i in range(count):
+        slot_start = start + timedelta(minutes=45 * i)
+        slots.append(TimeSlot(
+            id=i + 1,
+            owner=owner,
+            session=session,
+            start_time=slot_start,
+            end_time=slot_start + timedelta(minutes=30),
+            is_booked=bool(i % 3 == 0),
+            guest_name='Guest' if i % 3 == 0 else None,
+            booked_at=updated if i % 3 == 0 else None,
+            updated_at=updated,
+        ))
+    return owner, session, slots
+
+
+def make_days(slots, public_link):
+    book_url = _url_template(
+        'bookings:book_slot', public_link=_SAMPLE_LINK, slot_id=_SAMPLE_ID
+    ).replace('{public_link}', public_link)
+    days = []
+    for slot in slots:
+        date = slot.start_time.date()
+        if not days or days[-1]['date'] != date:
+            days.append({'date': date, 'slots': []})
+        days[-1]['slots'].append({
+            'id': slot.id,
+            'start': slot.start_time.strftime('%H:%M'),
+            'end': slot.end_time.strftime('%H:%M'),
+            'duration': '30m',
+            'start_ts': slot.start_time.timestamp(),
+            'book_url': book_url.format(slot_id=slot.id),
+        })
+    return days
+
+
+def timed(render):
+    best = None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        render()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_my_slots(owner, slots):
+    request = RequestFactory().get('/slots/')
+    request.user = owner
+
+    def render():
+        context = {
+            'slots': _with_slot_urls(slots),
+            'query': '',
+            'slots_version': f'{len(slots)}:bench',
+        }
+        render_to_string('bookings/my_slots.html', context, request=request)
+
+    cache.clear()
+    started = time.perf_counter()
+    render()
+    cold = time.perf_counter() - started
+    return cold, timed(render)
+
+
+def bench_public_view(session, slots):
+    request = RequestFactory().get('/public/abc123/')
+    request.user = AnonymousUser()
+    days = make_days(slots, session.public_link)
+
+    def render():
+        context = {
+            'session': session,
+            'days': days,
+            'slots_count': len(slots),
+            'public_link': session.public_link,
+            'guest_timezone': 'UTC',
+            'schedule_version': f'{len(slots)}:bench',
+        }
+        render_to_string('bookings/public_view.html', context, request=request)
+
+    cache.clear()
+    started = time.perf_counter()
+    render()
+    cold = time.perf_counter() - started
+    return cold, timed(render)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+def main():
+    print(f"{'page':<12}{'rows':>8}{'cold, ms':>12}{'warm, ms':>12}")
+    for size in SIZES:
+        owner, session, slots = make_slots(size)
+        for name, bench in (('my_slots', bench_my_slots), ('public_view', bench_public_view)):
+            target = owner if name == 'my_slots' else session
+            cold, warm = bench(target, slots)
+            print(f"{name:<12}{size:>8}{cold * 1000:>12.1f}{warm * 1000:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
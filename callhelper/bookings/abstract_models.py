@@ -1,9 +1,33 @@
 from django.db import models
+from django.utils import timezone
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+
+    def soft_delete(self, **fields):
+        """
+        Marks rows deleted with one UPDATE; signals are not sent
+
+        `fields` are set in the same UPDATE.
+        """
+        now = timezone.now()
+        return self.update(deleted_at=now, updated_at=now, **fields)
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """Default manager: hides soft-deleted rows"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 
 class BaseModel(models.Model):
     """
     An abstract base class model that provides self-updating
-    'created_at' and 'updated_at' fields.
+    'created_at' and 'updated_at' fields and soft deletion.
+
+    `objects` skips rows with deleted_at set, `all_objects` sees everything.
+    Soft-deleted rows are removed later by purge.purge_deleted().
     """
     created_at = models.DateTimeField(
                     auto_now_add=True,
@@ -11,7 +35,16 @@ class BaseModel(models.Model):
                     help_text="Timestamp when the object was created"
                 )
     updated_at = models.DateTimeField(auto_now=True)
+    deleted_at = models.DateTimeField(
+                    null=True,
+                    blank=True,
+                    editable=False,
+                    help_text="Set when the object is soft-deleted"
+                )
+
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
 
     class Meta:
         abstract = True
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
@@ -1,24 +1,147 @@
 from django.contrib import admin
-from .models import TimeSlot, BookingSession, UserProfile
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from .models import TimeSlot, BookingSession, SlotBooking, UserProfile, WaitlistEntry
+from .search import search_sessions, search_slots
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that takes the row count of an unfiltered Postgres table from
+    pg_class.reltuples instead of running COUNT(*) over millions of rows
+
+    "Unfiltered" means no filter beyond the default manager's own
+    deleted_at IS NULL. reltuples also counts soft-deleted rows that are
+    waiting for purge_deleted(), so above the threshold the estimate may
+    overstate the live count by up to SOFT_DELETE_RETENTION_HOURS worth of
+    deletions; it only sizes the page links.
+    """
+    estimate_threshold = 100000
+
+    def _is_unfiltered(self, queryset):
+        base = queryset.model._default_manager.get_queryset()
+        return queryset.query.where == base.query.where
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and self._is_unfiltered(queryset):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.estimate_threshold:
+                return row[0]
+        return super().count
+
+
+class InputListFilter(admin.SimpleListFilter):
+    """
+    List filter rendered as a text input instead of a list of every choice
+    """
+    template = 'admin/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        # Остальные параметры фильтрации сохраняем скрытыми полями формы
+        query_parts = [
+            (key, value)
+            for key, value in changelist.get_filters_params().items()
+            if key != self.parameter_name
+        ]
+        if changelist.query:
+            query_parts.append(('q', changelist.query))
+        yield {'query_parts': query_parts}
+
+
+class OwnerUsernameFilter(InputListFilter):
+    title = 'owner'
+    parameter_name = 'owner'
+    field_path = 'owner__username'
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if value:
+            return queryset.filter(**{self.field_path: value})
+        return queryset
+
+
+class SessionOwnerUsernameFilter(OwnerUsernameFilter):
+    field_path = 'owner_session__username'
 
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'telegram_id') 
-    search_fields = ('user__username', 'telegram_username')
-    list_filter = ('telegram_id',)
+    list_display = ('user', 'telegram_id', 'language') 
+    list_select_related = ('user',)
+    search_fields = ('user__username',)
+    autocomplete_fields = ('user',)
+    show_full_result_count = False
 
 
 @admin.register(BookingSession)
 class BookingSessionAdmin(admin.ModelAdmin):
-    list_display = ('title', 'owner_session', 'public_link', 'created_at')
+    list_display = ('title', 'owner_session', 'public_link', 'slots_count', 'booked_count', 'created_at')
+    list_select_related = ('owner_session',)
     search_fields = ('title', 'public_link')
-    list_filter = ('created_at', 'owner_session')
+    list_filter = ('created_at', SessionOwnerUsernameFilter)
+    autocomplete_fields = ('owner_session',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_sessions(queryset, search_term), False
+
+
+class SlotBookingInline(admin.TabularInline):
+    model = SlotBooking
+    fields = ('user', 'guest_name', 'created_at')
+    readonly_fields = ('user', 'guest_name', 'created_at')
+    extra = 0
+    can_delete = False
 
 
 @admin.register(TimeSlot)
 class TimeSlotAdmin(admin.ModelAdmin):
-    list_display = ('owner', 'start_time', 'end_time', 'is_booked', 'booked_by', 'session')
-    list_filter = ('is_booked', 'start_time', 'owner')
+    list_display = ('owner', 'start_time', 'end_time', 'is_booked', 'booked_by', 'capacity', 'booked_count', 'session')
+    list_select_related = ('owner', 'booked_by', 'session')
+    list_filter = ('is_booked', 'start_time', OwnerUsernameFilter)
     search_fields = ('owner__username', 'guest_name')
-    date_hierarchy = 'start_time'
\ No newline at end of file
+    autocomplete_fields = ('owner', 'booked_by', 'session')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Места меняются только через seats.claim_seat/release_seat
+    readonly_fields = ('booked_count',)
+    inlines = (SlotBookingInline,)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Владельца ищем точно по логину (уникальный индекс), гостей - по триграммам
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        owner_ids = User.objects.filter(username=search_term).values('pk')
+        return (
+            queryset.filter(owner_id__in=owner_ids)
+            | search_slots(queryset, search_term)
+        ), False
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'session', 'status', 'offered_slot', 'hold_expires_at', 'created_at')
+    list_select_related = ('user', 'session', 'offered_slot')
+    list_filter = ('status',)
+    autocomplete_fields = ('user', 'session')
+    raw_id_fields = ('slot', 'offered_slot')
+    show_full_result_count = False
+
@@ -0,0 +1,182 @@
+"""
+Utilization rollups
+
+refresh_utilization() runs from Celery beat. It finds (owner, local day)
+pairs touched since the last run:
+- slots with updated_at past the watermark;
+- days that lost a slot, recorded by signals;
+- soft-deleted slots, which are marked with a new updated_at.
+For each touched owner it recomputes those days with one GROUP BY query
+over TruncDate in the owner's time zone. The result is stored in
+DailyUtilization, and dashboards read only that table.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    DailyUtilization,
+    RollupWatermark,
+    TimeSlot,
+    UserProfile,
+    UtilizationInvalidation,
+)
+from .timezones import get_zone, is_valid_timezone
+
+WATERMARK_NAME = 'daily_utilization'
+# Транзакции, начатые до прошлого запуска, могли закоммитить строки с
+# updated_at чуть раньше водяной отметки; пересчет идемпотентен
+OVERLAP = timedelta(minutes=5)
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+_BOOKED = Q(is_booked=True)
+_DURATION = ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField())
+_LEAD_TIME = ExpressionWrapper(F('start_time') - F('booked_at'), output_field=DurationField())
+
+
+def record_invalidation(owner_id, start_time):
+    """Marks the owner's day of `start_time` for recomputation"""
+    if owner_id and start_time:
+        UtilizationInvalidation.objects.create(owner_id=owner_id, start_time=start_time)
+
+
+def owner_zones(owner_ids):
+    zones = dict(UserProfile.objects.filter(
+        user_id__in=owner_ids
+    ).values_list('user_id', 'timezone'))
+    return {
+        owner_id: get_zone(zones[owner_id] if is_valid_timezone(zones.get(owner_id)) else 'UTC')
+        for owner_id in owner_ids
+    }
+
+
+def _seconds(value):
+    return int(value.total_seconds()) if value else 0
+
+
+def recompute_days(owner_id, days, tz):
+    """Rebuilds rollup rows of one owner for the given local days"""
+    rows = TimeSlot.objects.filter(owner_id=owner_id).annotate(
+        day=TruncDate('start_time', tzinfo=tz),
+    ).filter(day__in=days).values('session_id', 'day').annotate(
+        slots=Count('id'),
+        booked_slots=Count('id', filter=_BOOKED),
+        offered=Sum(_DURATION),
+        booked=Sum(_DURATION, filter=_BOOKED),
+        lead_time=Sum(_LEAD_TIME, filter=_BOOKED),
+        cancelled=Sum('cancellations'),
+    ).order_by()
+
+    rollups = [
+        DailyUtilization(
+            owner_id=owner_id,
+            session_id=row['session_id'],
+            day=row['day'],
+            slots=row['slots'],
+            booked_slots=row['booked_slots'],
+            offered_seconds=_seconds(row['offered']),
+            booked_seconds=_seconds(row['booked']),
+            lead_time_seconds=_seconds(row['lead_time']),
+            cancellations=row['cancelled'] or 0,
+        )
+        for row in rows
+    ]
+    # Заменяем дни целиком: так исчезают и строки, где слотов не осталось
+    DailyUtilization.objects.filter(owner_id=owner_id, day__in=days).delete()
+    DailyUtilization.objects.bulk_create(rollups)
+    return len(rollups)
+
+
+def refresh_utilization(full=False):
+    """
+    Recomputes rollups for days touched since the last run
+
+    Returns the number of (owner, day) pairs recomputed.
+    """
+    upper = timezone.now()
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(
+            name=WATERMARK_NAME, defaults={'value': EPOCH},
+        )
+        since = EPOCH if full else watermark.value - OVERLAP
+
+        # all_objects: удаленные слоты тоже меняют свои дни
+        touched = TimeSlot.all_objects.filter(
+            updated_at__gt=since, updated_at__lte=upper,
+        ).values_list('owner_id', 'start_time')
+        invalidations = list(UtilizationInvalidation.objects.values_list(
+            'pk', 'owner_id', 'start_time'
+        ))
+
+        starts = defaultdict(set)
+        for owner_id, start_time in touched.iterator(chunk_size=5000):
+            starts[owner_id].add(start_time)
+        for _, owner_id, start_time in invalidations:
+            starts[owner_id].add(start_time)
+
+        zones = owner_zones(list(starts))
+        pairs = 0
+        for owner_id, owner_starts in starts.items():
+            tz = zones[owner_id]
+            days = sorted({moment.astimezone(tz).date() for moment in owner_starts})
+            recompute_days(owner_id, days, tz)
+            pairs += len(days)
+
+        UtilizationInvalidation.objects.filter(
+            pk__in=[pk for pk, _, _ in invalidations]
+        ).delete()
+        watermark.value = upper
+        watermark.save(update_fields=['value'])
+    return pairs
+
+
+def utilization_series(owner, days=14, session_id=None, today=None):
+    """
+    Per-day totals for the dashboard and the API, read from rollups only
+    """
+    today = today or timezone.localdate()
+    first_day = today - timedelta(days=days - 1)
+    rollups = DailyUtilization.objects.filter(owner=owner, day__gte=first_day, day__lte=today)
+    if session_id:
+        rollups = rollups.filter(session_id=session_id)
+    totals = {
+        row['day']: row
+        for row in rollups.values('day').annotate(
+            slots=Sum('slots'),
+            booked_slots=Sum('booked_slots'),
+            offered_seconds=Sum('offered_seconds'),
+            booked_seconds=Sum('booked_seconds'),
+            lead_time_seconds=Sum('lead_time_seconds'),
+            cancellations=Sum('cancellations'),
+        ).order_by()
+    }
+
+    series = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        row = totals.get(day, {})
+        offered = row.get('offered_seconds') or 0
+        booked = row.get('booked_seconds') or 0
+        booked_slots = row.get('booked_slots') or 0
+        cancellations = row.get('cancellations') or 0
+        series.append({
+            'date': day.isoformat(),
+            'offered_hours': round(offered / 3600, 2),
+            'booked_hours': round(booked / 3600, 2),
+            'utilization': round(booked / offered, 3) if offered else 0,
+            'bookings': booked_slots,
+            'cancellations': cancellations,
+            'cancellation_rate': (
+                round(cancellations / (booked_slots + cancellations), 3)
+                if booked_slots + cancellations else 0
+            ),
+            'avg_lead_hours': (
+                round((row.get('lead_time_seconds') or 0) / booked_slots / 3600, 1)
+                if booked_slots else None
+            ),
+        })
+    return series
@@ -0,0 +1,79 @@
+"""
+Denormalized slot counters on BookingSession
+
+Counters are changed with F() expressions in a single UPDATE, so concurrent
+bookings never lose increments. `free_future_count` drifts as free slots move
+into the past; reconcile_session_counters() recomputes everything from
+TimeSlot and is run periodically by the management command of the same name.
+"""
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+
+def slot_contribution(is_booked, start_time, now=None):
+    """Returns (slots, free_future, booked) contributed by one slot"""
+    now = now or timezone.now()
+    free_future = int(not is_booked and start_time is not None and start_time > now)
+    return 1, free_future, int(bool(is_booked))
+
+
+def apply_session_counters(session_id, slots=0, free_future=0, booked=0):
+    """Adds deltas to the session counters in one atomic UPDATE"""
+    from .models import BookingSession
+
+    if session_id is None or not (slots or free_future or booked):
+        return
+    BookingSession.objects.filter(pk=session_id).update(
+        slots_count=F('slots_count') + slots,
+        free_future_count=F('free_future_count') + free_future,
+        booked_count=F('booked_count') + booked,
+    )
+
+
+def reconcile_session_counters(queryset=None, batch_size=500):
+    """
+    Recomputes counters from TimeSlot for the given sessions
+
+    Returns the number of sessions whose counters were corrected.
+    """
+    from .models import BookingSession
+
+    if queryset is None:
+        queryset = BookingSession.objects.all()
+
+    now = timezone.now()
+    # JOIN по related_name не применяет менеджер по умолчанию
+    alive = Q(session_slots__deleted_at__isnull=True)
+    annotated = queryset.order_by().annotate(
+        real_slots=Count('session_slots', filter=alive),
+        real_free_future=Count(
+            'session_slots',
+            filter=alive & Q(session_slots__is_booked=False, session_slots__start_time__gt=now),
+        ),
+        real_booked=Count('session_slots', filter=alive & Q(session_slots__is_booked=True)),
+    ).only('pk', 'slots_count', 'free_future_count', 'booked_count')
+
+    fixed = []
+    updated = 0
+    for session in annotated.iterator(chunk_size=batch_size):
+        actual = (session.real_slots, session.real_free_future, session.real_booked)
+        stored = (session.slots_count, session.free_future_count, session.booked_count)
+        if actual == stored:
+            continue
+        session.slots_count, session.free_future_count, session.booked_count = actual
+        fixed.append(session)
+        if len(fixed) >= batch_size:
+            updated += _flush(fixed)
+            fixed = []
+    if fixed:
+        updated += _flush(fixed)
+    return updated
+
+
+def _flush(sessions):
+    from .models import BookingSession
+
+    BookingSession.objects.bulk_update(
+        sessions, ['slots_count', 'free_future_count', 'booked_count']
+    )
+    return len(sessions)
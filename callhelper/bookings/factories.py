@@ -0,0 +1,65 @@
+"""
+Test data factories
+
+Plain functions rather than factory_boy: every argument has a sensible
+default, and anything else is passed through to the model.
+"""
+from datetime import timedelta
+from itertools import count
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .models import BookingSession, TimeSlot, UserProfile
+
+PASSWORD = 'secret'
+_sequence = count(1)
+# Слоты без явного времени получают каждый свой день и не пересекаются
+_free_days = count(1)
+
+
+def make_user(username=None, telegram_id=None, tz=None, **kwargs):
+    """User with a password and its auto-created profile"""
+    user = User.objects.create_user(
+        username or f'user{next(_sequence)}', password=PASSWORD, **kwargs
+    )
+    profile_fields = {}
+    if telegram_id is not None:
+        profile_fields['telegram_id'] = telegram_id
+    if tz is not None:
+        profile_fields['timezone'] = tz
+    if profile_fields:
+        UserProfile.objects.filter(user=user).update(**profile_fields)
+    return user
+
+
+def make_session(owner=None, **kwargs):
+    kwargs.setdefault('title', f'Session {next(_sequence)}')
+    return BookingSession.objects.create(owner_session=owner or make_user(), **kwargs)
+
+
+def make_slot(owner=None, session=None, start=None, minutes=30, **kwargs):
+    """
+    Slot starting `start` (default: on a day no other default slot uses),
+    owned by the session owner when a session is given
+    """
+    if owner is None:
+        owner = session.owner_session if session else make_user()
+    if start is None:
+        start = timezone.now() + timedelta(days=next(_free_days))
+    return TimeSlot.objects.create(
+        owner=owner,
+        session=session,
+        start_time=start,
+        end_time=start + timedelta(minutes=minutes),
+        **kwargs,
+    )
+
+
+def make_slots(session, number, start=None, minutes=30):
+    """Back-to-back slots of one session, created through signals like the UI"""
+    start = start or timezone.now() + timedelta(days=next(_free_days))
+    return [
+        make_slot(session=session, start=start + timedelta(minutes=minutes * i), minutes=minutes)
+        for i in range(number)
+    ]
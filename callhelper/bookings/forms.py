@@ -1,6 +1,10 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from zoneinfo import available_timezones
+from .models import UserProfile
+
+INPUT_CLASS = 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-primary-500 focus:border-primary-500 transition'
 
 
 class UserRegistrationForm(UserCreationForm):
@@ -38,3 +42,17 @@ class UserRegistrationForm(UserCreationForm):
             user.save()
         return user
 
+
+class ProfileSettingsForm(forms.ModelForm):
+    timezone = forms.ChoiceField(
+        choices=[(name, name) for name in sorted(available_timezones())],
+        widget=forms.Select(attrs={'class': INPUT_CLASS}),
+    )
+
+    class Meta:
+        model = UserProfile
+        fields = ('timezone', 'language')
+        widgets = {
+            'language': forms.Select(attrs={'class': INPUT_CLASS}),
+        }
+
@@ -0,0 +1,114 @@
+"""
+Public links: generation and public_link -> session_id resolution
+
+Links are random base62 strings. Resolution goes through two layers:
+
+1. a small in-process LRU with a short TTL (no network round trip at all);
+2. the shared cache, which also stores misses, so bots probing random
+   links are answered without touching Postgres.
+
+Deleting a session drops its link from the shared cache; other processes
+may still resolve it for up to LOCAL_TTL seconds, after which the view's
+PK lookup simply finds nothing.
+"""
+from collections import OrderedDict
+import secrets
+import string
+import threading
+import time
+
+from django.core.cache import cache
+
+ALPHABET = string.digits + string.ascii_letters
+LINK_LENGTH = 10  # 62**10 ~ 8 * 10**17 вариантов
+MAX_LINK_LENGTH = 100
+
+LOCAL_SIZE = 10000
+LOCAL_TTL = 60
+CACHE_TIMEOUT = 60 * 60 * 24
+NEGATIVE_TIMEOUT = 60 * 5
+_MISSING = 0  # session_id не бывает нулевым
+
+
+def generate_public_link(length=LINK_LENGTH):
+    return ''.join(secrets.choice(ALPHABET) for _ in range(length))
+
+
+def is_well_formed(link):
+    """Cheap check before any lookup: links are short alphanumeric strings"""
+    return bool(link) and len(link) <= MAX_LINK_LENGTH and link.isascii() and link.isalnum()
+
+
+class LocalLRU:
+    """Thread-safe LRU with per-entry expiry"""
+
+    def __init__(self, size=LOCAL_SIZE, ttl=LOCAL_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local = LocalLRU()
+
+
+def _cache_key(link):
+    return f'public_link:{link}'
+
+
+def resolve_public_link(link):
+    """
+    Returns the id of the session with this public link, or None
+    """
+    if not is_well_formed(link):
+        return None
+
+    session_id = _local.get(link)
+    if session_id is None:
+        session_id = cache.get(_cache_key(link))
+        if session_id is None:
+            from .models import BookingSession
+
+            session_id = BookingSession.objects.filter(
+                public_link=link
+            ).values_list('id', flat=True).first() or _MISSING
+            cache.set(
+                _cache_key(link),
+                session_id,
+                CACHE_TIMEOUT if session_id else NEGATIVE_TIMEOUT,
+            )
+        _local.set(link, session_id)
+    return session_id or None
+
+
+def forget_public_link(link):
+    """Drops a link from both layers (session deleted or link changed)"""
+    _local.pop(link)
+    cache.delete(_cache_key(link))
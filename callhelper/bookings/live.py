@@ -0,0 +1,155 @@
+"""
+Живое обновление доступности слотов на публичной странице (SSE)
+
+Изменения слотов публикуются в Redis pub/sub в канал сессии после коммита.
+В каждом ASGI процессе есть одно подключение-подписчик (SlotBroadcaster),
+которое раздает сообщения всем открытым страницам через asyncio.Queue.
+"""
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'slots:'
+CLIENT_QUEUE_SIZE = 100
+
+_publisher = None
+
+
+def channel_for(session_id):
+    return f'{CHANNEL_PREFIX}{session_id}'
+
+
+class _NullPublisher:
+    """Publisher used when live events are disabled"""
+
+    def publish(self, channel, payload):
+        return 0
+
+
+def _get_publisher():
+    global _publisher
+    if not settings.LIVE_EVENTS_ENABLED:
+        return _NullPublisher()
+    if _publisher is None:
+        import redis
+
+        _publisher = redis.Redis.from_url(
+            settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=1
+        )
+    return _publisher
+
+
+def publish_slot_event(session_id, slot_id, event):
+    """
+    Публикует событие слота после коммита транзакции
+
+    event: 'available' | 'unavailable' | 'resync' | 'closed'
+    """
+    if session_id is None:
+        return
+    payload = json.dumps({'type': event, 'slot_id': slot_id})
+
+    def publish():
+        try:
+            _get_publisher().publish(channel_for(session_id), payload)
+        except Exception as e:
+            # Живые обновления не должны ломать бронирование
+            logger.warning(f"Could not publish slot event: {e}")
+
+    transaction.on_commit(publish)
+
+
+def _drain(queue):
+    """Выбрасывает все накопленные сообщения через публичный API очереди"""
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+
+class SlotBroadcaster:
+    """
+    Одна подписка на Redis на процесс, раздача сообщений клиентам
+    """
+
+    def __init__(self, redis_url=None):
+        self.redis_url = redis_url
+        self.clients = {}
+        self._task = None
+
+    def subscribe(self, session_id):
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.clients.setdefault(channel_for(session_id), set()).add(queue)
+        self._ensure_listener()
+        return queue
+
+    def unsubscribe(self, session_id, queue):
+        channel = channel_for(session_id)
+        queues = self.clients.get(channel)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.clients[channel]
+
+    def dispatch(self, channel, data):
+        """Раздает сообщение всем клиентам канала"""
+        for queue in list(self.clients.get(channel, ())):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                # Медленный клиент: просим его перезагрузить список целиком
+                _drain(queue)
+                queue.put_nowait(json.dumps({'type': 'resync'}))
+
+    def _ensure_listener(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+
+        while True:
+            try:
+                client = aioredis.Redis.from_url(self.redis_url or settings.REDIS_URL)
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(f'{CHANNEL_PREFIX}*')
+                    async for message in pubsub.listen():
+                        if message['type'] != 'pmessage':
+                            continue
+                        channel = message['channel'].decode()
+                        self.dispatch(channel, message['data'].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Slot events subscription lost: {e}")
+                # Клиенты могли пропустить события
+                for channel in list(self.clients):
+                    self.dispatch(channel, json.dumps({'type': 'resync'}))
+                await asyncio.sleep(1)
+
+
+broadcaster = SlotBroadcaster()
+
+
+async def stream_slot_events(session_id, keepalive=15):
+    """
+    Асинхронный генератор SSE сообщений для одной открытой страницы
+    """
+    queue = broadcaster.subscribe(session_id)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                data = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield f'data: {data}\n\n'
+    finally:
+        broadcaster.unsubscribe(session_id, queue)
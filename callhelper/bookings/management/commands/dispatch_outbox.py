@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.outbox import dispatch_batch
+
+
+class Command(BaseCommand):
+    help = "Delivers pending Telegram notifications from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when the outbox is empty",
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Drain the outbox and exit",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        sent = 0
+        while True:
+            claimed = dispatch_batch(batch_size=batch_size)
+            sent += claimed
+            if claimed < batch_size:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"Dispatched {sent} message(s)"))
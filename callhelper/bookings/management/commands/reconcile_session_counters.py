@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from bookings.counters import reconcile_session_counters
+from bookings.models import BookingSession
+
+
+class Command(BaseCommand):
+    help = "Recomputes denormalized slot counters on BookingSession"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--owner',
+            type=int,
+            help="Only reconcile sessions of this user id",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+        )
+
+    def handle(self, *args, **options):
+        queryset = BookingSession.objects.all()
+        if options['owner']:
+            queryset = queryset.filter(owner_session_id=options['owner'])
+
+        fixed = reconcile_session_counters(queryset, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {fixed} session(s)"))
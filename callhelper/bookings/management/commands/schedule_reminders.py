@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from bookings.reminders import schedule_missing_reminders
+
+
+class Command(BaseCommand):
+    help = "Queues reminder tasks for booked slots that have none (run once after deploy)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+        )
+
+    def handle(self, *args, **options):
+        scheduled = schedule_missing_reminders(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Scheduled {scheduled} reminder(s)"))
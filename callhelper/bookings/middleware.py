@@ -0,0 +1,38 @@
+"""
+Часовой пояс владельца на его страницах
+
+Формы создания слотов, список слотов и дашборд показывают и принимают
+время в поясе из профиля, как и импорт. Публичные страницы поверх этого
+переключаются на пояс гостя (timezone.override во view).
+"""
+from django.utils import timezone
+
+from .timezones import OWNER_TZ_SESSION_KEY, get_zone, is_valid_timezone, remember_owner_timezone
+
+
+class OwnerTimezoneMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        name = self._owner_timezone(request)
+        if name:
+            timezone.activate(get_zone(name))
+        else:
+            timezone.deactivate()
+        return self.get_response(request)
+
+    def _owner_timezone(self, request):
+        # Анонимный посетитель без cookie сессии: ни одного запроса
+        if not request.session.session_key:
+            return None
+        name = request.session.get(OWNER_TZ_SESSION_KEY)
+        if name is None and request.user.is_authenticated:
+            # Сессия открыта до появления ключа: читаем профиль один раз
+            from .models import UserProfile
+
+            remember_owner_timezone(request, UserProfile.objects.filter(
+                user=request.user).values_list('timezone', flat=True).first())
+            name = request.session[OWNER_TZ_SESSION_KEY]
+        return name if is_valid_timezone(name) else None
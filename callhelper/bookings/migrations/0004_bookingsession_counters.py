@@ -0,0 +1,61 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:41
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+BATCH_SIZE = 500
+
+
+def fill_session_counters(apps, schema_editor):
+    BookingSession = apps.get_model('bookings', 'BookingSession')
+    now = timezone.now()
+    sessions = BookingSession.objects.order_by().annotate(
+        real_slots=Count('session_slots'),
+        real_free_future=Count(
+            'session_slots',
+            filter=Q(session_slots__is_booked=False, session_slots__start_time__gt=now),
+        ),
+        real_booked=Count('session_slots', filter=Q(session_slots__is_booked=True)),
+    ).filter(real_slots__gt=0).only('pk')
+
+    # Как counters.reconcile_session_counters: пачки bulk_update вместо
+    # save() на каждую сессию; сессии без слотов уже с нулями по умолчанию
+    batch = []
+    for session in sessions.iterator(chunk_size=BATCH_SIZE):
+        session.slots_count = session.real_slots
+        session.free_future_count = session.real_free_future
+        session.booked_count = session.real_booked
+        batch.append(session)
+        if len(batch) >= BATCH_SIZE:
+            BookingSession.objects.bulk_update(batch, ['slots_count', 'free_future_count', 'booked_count'])
+            batch = []
+    if batch:
+        BookingSession.objects.bulk_update(batch, ['slots_count', 'free_future_count', 'booked_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_alter_bookingsession_options_alter_timeslot_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingsession',
+            name='booked_count',
+            field=models.PositiveIntegerField(default=0, help_text='Denormalized number of booked slots'),
+        ),
+        migrations.AddField(
+            model_name='bookingsession',
+            name='free_future_count',
+            field=models.PositiveIntegerField(default=0, help_text='Denormalized number of free upcoming slots'),
+        ),
+        migrations.AddField(
+            model_name='bookingsession',
+            name='slots_count',
+            field=models.PositiveIntegerField(default=0, help_text='Denormalized number of slots in the session'),
+        ),
+        migrations.RunPython(fill_session_counters, migrations.RunPython.noop),
+    ]
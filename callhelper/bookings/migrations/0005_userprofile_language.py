@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_bookingsession_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='language',
+            field=models.CharField(choices=[('ru', 'Русский'), ('en', 'English')], default='ru', help_text='Language of Telegram notifications', max_length=8),
+        ),
+    ]
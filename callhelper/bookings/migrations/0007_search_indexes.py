@@ -0,0 +1,30 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:47
+
+import bookings.operations
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_notificationoutbox'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        bookings.operations.AddPostgresIndex(
+            model_name='bookingsession',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('title', 'description', config='simple'), name='session_search_vector_idx'),
+        ),
+        bookings.operations.AddPostgresIndex(
+            model_name='bookingsession',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='session_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        bookings.operations.AddPostgresIndex(
+            model_name='timeslot',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['guest_name'], name='timeslot_guest_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
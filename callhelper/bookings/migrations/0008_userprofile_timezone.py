@@ -0,0 +1,19 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:48
+
+import bookings.timezones
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='timezone',
+            field=models.CharField(default='UTC', help_text='IANA time zone used to show and announce slots', max_length=64, validators=[bookings.timezones.validate_timezone]),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0008_userprofile_timezone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Timestamp when the object was created', verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('offered', 'Offered'), ('booked', 'Booked'), ('expired', 'Expired')], default='waiting', max_length=10)),
+                ('hold_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('offered_slot', models.ForeignKey(blank=True, help_text='Slot held for this guest', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_offers', to='bookings.timeslot')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='bookings.bookingsession')),
+                ('slot', models.ForeignKey(blank=True, help_text='Only this slot; any slot of the session if empty', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='bookings.timeslot')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['session', 'status', 'created_at'], name='waitlist_queue_idx'), models.Index(fields=['offered_slot', 'status'], name='waitlist_offer_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='waitlistentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['waiting', 'offered'])), fields=('session', 'user'), name='waitlist_one_active_entry'),
+        ),
+    ]
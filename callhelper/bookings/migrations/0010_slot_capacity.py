@@ -0,0 +1,57 @@
+# Generated by Django 4.2.27 on 2026-10-19 12:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0009_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Timestamp when the object was created', verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('guest_name', models.CharField(blank=True, default='', max_length=100)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='timeslot',
+            name='booked_count',
+            field=models.PositiveIntegerField(default=0, help_text='Seats taken in a group slot'),
+        ),
+        migrations.AddField(
+            model_name='timeslot',
+            name='capacity',
+            field=models.PositiveIntegerField(default=1, help_text='Number of seats; group slots (>1) are booked via SlotBooking'),
+        ),
+        migrations.AddConstraint(
+            model_name='timeslot',
+            constraint=models.CheckConstraint(check=models.Q(('booked_count__lte', models.F('capacity'))), name='timeslot_seats_within_capacity'),
+        ),
+        migrations.AddField(
+            model_name='slotbooking',
+            name='slot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_bookings', to='bookings.timeslot'),
+        ),
+        migrations.AddField(
+            model_name='slotbooking',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='seat_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='slotbooking',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('slot', 'user'), name='slotbooking_one_seat_per_user'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.27 on 2026-10-19 12:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0010_slot_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyUtilization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('slots', models.PositiveIntegerField(default=0)),
+                ('booked_slots', models.PositiveIntegerField(default=0)),
+                ('offered_seconds', models.BigIntegerField(default=0)),
+                ('booked_seconds', models.BigIntegerField(default=0)),
+                ('lead_time_seconds', models.BigIntegerField(default=0, help_text='Sum of start_time - booked_at over booked slots')),
+                ('cancellations', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UtilizationInvalidation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner_id', models.IntegerField()),
+                ('start_time', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='timeslot',
+            name='cancellations',
+            field=models.PositiveIntegerField(default=0, help_text='How many times a booking of this slot was cancelled'),
+        ),
+        migrations.AddIndex(
+            model_name='timeslot',
+            index=models.Index(fields=['updated_at'], name='timeslot_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailyutilization',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_utilization', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='dailyutilization',
+            name='session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_utilization', to='bookings.bookingsession'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyutilization',
+            index=models.Index(fields=['owner', 'day'], name='utilization_owner_day_idx'),
+        ),
+    ]
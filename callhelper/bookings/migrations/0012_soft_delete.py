@@ -0,0 +1,51 @@
+# Generated by Django 4.2.27 on 2026-10-19 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_utilization_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingsession',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Set when the object is soft-deleted', null=True),
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Set when the object is soft-deleted', null=True),
+        ),
+        migrations.AddField(
+            model_name='slotbooking',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Set when the object is soft-deleted', null=True),
+        ),
+        migrations.AddField(
+            model_name='timeslot',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Set when the object is soft-deleted', null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Set when the object is soft-deleted', null=True),
+        ),
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Set when the object is soft-deleted', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='bookingsession',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='session_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeslot',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='timeslot_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.27 on 2026-10-19 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0012_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeslot',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='timeslot',
+            name='reminder_task_id',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Id of the scheduled reminder task; empty if none', max_length=36),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.utils import timezone
+
+REMOVED_TASK = 'bookings.tasks.send_reminder_notifications'
+
+
+def remove_reminder_scan(apps, schema_editor):
+    # DatabaseScheduler только добавляет записи из CELERY_BEAT_SCHEDULE и
+    # никогда не удаляет исчезнувшие, поэтому старую задачу убираем сами
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTasks = apps.get_model('django_celery_beat', 'PeriodicTasks')
+    deleted, _ = PeriodicTask.objects.filter(task=REMOVED_TASK).delete()
+    if deleted:
+        # beat перечитывает расписание, когда меняется last_update
+        PeriodicTasks.objects.update_or_create(ident=1, defaults={'last_update': timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0013_slot_reminders'),
+        ('django_celery_beat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_reminder_scan, migrations.RunPython.noop),
+    ]
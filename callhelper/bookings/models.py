@@ -1,9 +1,25 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from .abstract_models import BaseModel
+from .links import generate_public_link
+from .timezones import validate_timezone
 from django.utils import timezone
-import uuid 
+
+
+def format_duration(total_seconds):
+    """Formats a number of seconds as '1h 30m' / '1h' / '45m'"""
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    if hours > 0:
+        return f"{hours}h {minutes}m" if minutes > 0 else f"{hours}h"
+    return f"{minutes}m"
+
+
+PUBLIC_LINK_ATTEMPTS = 5
 
 
 class BookingSession(BaseModel):
@@ -26,14 +42,60 @@ class BookingSession(BaseModel):
         max_length=100,
         unique=True
     )
+    slots_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Denormalized number of slots in the session"
+    )
+    free_future_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Denormalized number of free upcoming slots"
+    )
+    booked_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Denormalized number of booked slots"
+    )
     
+    class Meta(BaseModel.Meta):
+        # Индексы создаются только на PostgreSQL (см. operations.AddPostgresIndex)
+        indexes = [
+            GinIndex(
+                SearchVector('title', 'description', config='simple'),
+                name='session_search_vector_idx',
+            ),
+            GinIndex(
+                fields=['title'],
+                name='session_title_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+            # Для очистки: частичный индекс почти пустой
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='session_deleted_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.pk:  # только при создании
-            self.public_link = uuid.uuid4().hex[:12]
-        super().save(*args, **kwargs)
+        if self.pk:
+            super().save(*args, **kwargs)
+            return
+
+        # Только при создании: при совпадении ссылки генерируем новую
+        for attempt in range(PUBLIC_LINK_ATTEMPTS):
+            self.public_link = generate_public_link()
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                self.pk = None
+                # Ссылку занимают и удаленные, но еще не очищенные сессии
+                taken = BookingSession.all_objects.filter(public_link=self.public_link).exists()
+                if not taken or attempt == PUBLIC_LINK_ATTEMPTS - 1:
+                    raise
 
 class TimeSlot(BaseModel):
     """
@@ -80,6 +142,52 @@ class TimeSlot(BaseModel):
         blank=True,
         help_text="When it was booked"
     )
+    capacity = models.PositiveIntegerField(
+        default=1,
+        help_text="Number of seats; group slots (>1) are booked via SlotBooking"
+    )
+    booked_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Seats taken in a group slot"
+    )
+    cancellations = models.PositiveIntegerField(
+        default=0,
+        help_text="How many times a booking of this slot was cancelled"
+    )
+    reminder_task_id = models.CharField(
+        max_length=36,
+        blank=True,
+        default='',
+        editable=False,
+        help_text="Id of the scheduled reminder task; empty if none"
+    )
+    reminder_sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+    )
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            GinIndex(
+                fields=['guest_name'],
+                name='timeslot_guest_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+            # Инкрементальный пересчет аналитики идет по updated_at
+            models.Index(fields=['updated_at'], name='timeslot_updated_idx'),
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='timeslot_deleted_idx',
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(booked_count__lte=models.F('capacity')),
+                name='timeslot_seats_within_capacity',
+            ),
+        ]
   
     def __str__(self):
         return f"{self.owner} | {self.start_time} - {self.end_time}"
@@ -94,28 +202,90 @@ class TimeSlot(BaseModel):
         """Returns a human-readable duration string"""
         duration = self.get_duration()
         if duration:
-            total_seconds = int(duration.total_seconds())
-            hours = total_seconds // 3600
-            minutes = (total_seconds % 3600) // 60
-            if hours > 0:
-                return f"{hours}h {minutes}m" if minutes > 0 else f"{hours}h"
-            return f"{minutes}m"
+            return format_duration(int(duration.total_seconds()))
         return "N/A"
 
-        
+    @property
+    def is_group(self):
+        return self.capacity > 1
+
+    @property
+    def seats_left(self):
+        return max(self.capacity - self.booked_count, 0)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Состояние на момент загрузки: сигналы и save() сравнивают с ним
+        # вместо повторного SELECT
+        instance._loaded_values = dict(zip(field_names, values))
+        # Связи такого объекта (select_related) загружены из БД, а не
+        # переданы вызывающим кодом, и им можно верить в уведомлениях
+        instance._loaded_from_db = True
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        # Django перечитывает значения через отдельный объект, мимо from_db
+        if fields is None:
+            deferred = self.get_deferred_fields()
+            attnames = [f.attname for f in self._meta.concrete_fields if f.attname not in deferred]
+        else:
+            attnames = [self._meta.get_field(name).attname for name in fields]
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for attname in attnames:
+            loaded[attname] = getattr(self, attname)
+
+    def _unchanged_since_load(self, *attnames):
+        loaded = getattr(self, '_loaded_values', None)
+        if not loaded or self._state.adding:
+            return False
+        return all(
+            name in loaded and loaded[name] == getattr(self, name)
+            for name in attnames
+        )
+
+    def _validation_exclude(self):
+        """
+        Fields full_clean() may skip: values unchanged since load and
+        foreign keys pointing at already loaded objects. Both would only
+        cost existence/constraint queries that can't fail.
+        """
+        exclude = set()
+        for field in self._meta.concrete_fields:
+            if self._unchanged_since_load(field.attname):
+                exclude.add(field.name)
+            elif field.is_relation and field.is_cached(self):
+                related = field.get_cached_value(self)
+                if related is not None and not related._state.adding:
+                    exclude.add(field.name)
+        return exclude
+
     def clean(self):
         if self.end_time <= self.start_time:
             raise ValidationError(
                 "The end time must be later than the start time."
             )
-        if self.is_booked and not self.booked_by and not self.guest_name:
+        if self.is_group and (self.booked_by_id or self.guest_name):
+            raise ValidationError(
+                "Group slots are booked by seats, not by a single guest."
+            )
+        if self.capacity < self.booked_count:
+            raise ValidationError(
+                "Capacity can't be lower than the number of seats already taken."
+            )
+        if self.is_booked and not self.is_group and not self.booked_by_id and not self.guest_name:
             raise ValidationError(
                 "Booked slot must have 'booked_by' or 'guest_name' specified."
             )
-        
+
+        # Время не менялось с загрузки - пересечений быть не может
+        if self._unchanged_since_load('owner_id', 'start_time', 'end_time'):
+            return
+
         if self.start_time and self.end_time:
             overlapping_slots = TimeSlot.objects.filter(
-                owner=self.owner,
+                owner_id=self.owner_id,
                 start_time__lt=self.end_time,
                 end_time__gt=self.start_time
             )
@@ -128,8 +298,11 @@ class TimeSlot(BaseModel):
                 )
     
     def save(self, *args, **kwargs):
+        # Групповой слот занят, когда разобраны все места
+        if self.is_group:
+            self.is_booked = self.booked_count >= self.capacity
         # Синхронизация is_booked и booked_by
-        if self.booked_by is not None or (self.guest_name and self.guest_name.strip()):
+        elif self.booked_by_id is not None or (self.guest_name and self.guest_name.strip()):
             self.is_booked = True
             if self.booked_at is None:  # Устанавливаем только если еще не установлен
                 self.booked_at = timezone.now()
@@ -137,8 +310,51 @@ class TimeSlot(BaseModel):
             self.is_booked = False
             self.booked_at = None  # Очищаем при отмене бронирования
         
-        self.full_clean()
-        super().save(*args, **kwargs)
+        self.full_clean(exclude=self._validation_exclude())
+        # Сигналы post_save пишут в outbox в той же транзакции, что и слот
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+        }
+
+class SlotBooking(BaseModel):
+    """
+    One seat in a group slot (TimeSlot.capacity > 1)
+    """
+    slot = models.ForeignKey(
+        TimeSlot,
+        on_delete=models.CASCADE,
+        related_name='seat_bookings',
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='seat_bookings',
+        null=True,
+        blank=True,
+    )
+    guest_name = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+    )
+
+    class Meta(BaseModel.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=['slot', 'user'],
+                condition=models.Q(user__isnull=False),
+                name='slotbooking_one_seat_per_user',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.slot_id} | {self.user or self.guest_name}"
+
 
 class UserProfile(BaseModel):
     """
@@ -149,10 +365,204 @@ class UserProfile(BaseModel):
         on_delete=models.CASCADE,
         related_name='profile'
     )
+    LANGUAGE_CHOICES = [
+        ('ru', 'Русский'),
+        ('en', 'English'),
+    ]
+
     telegram_id = models.BigIntegerField(
         unique=True,
         blank=True,
         null=True
     )
+    language = models.CharField(
+        max_length=8,
+        choices=LANGUAGE_CHOICES,
+        default='ru',
+        help_text="Language of Telegram notifications"
+    )
+    timezone = models.CharField(
+        max_length=64,
+        default='UTC',
+        validators=[validate_timezone],
+        help_text="IANA time zone used to show and announce slots"
+    )
 
 
+class NotificationOutbox(BaseModel):
+    """
+    Outgoing Telegram messages written in the same transaction as the change
+    that caused them and delivered by the outbox dispatcher
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    chat_id = models.BigIntegerField(
+        help_text="Telegram chat to deliver the message to"
+    )
+    message = models.TextField()
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+    )
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Message is not sent before this time (retry backoff)"
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+    )
+    last_error = models.TextField(
+        blank=True,
+        default='',
+    )
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.chat_id} | {self.status}"
+
+
+class WaitlistEntry(BaseModel):
+    """
+    Guest waiting for a slot of a session (or a specific slot) to free up
+    """
+    STATUS_WAITING = 'waiting'
+    STATUS_OFFERED = 'offered'
+    STATUS_BOOKED = 'booked'
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (STATUS_WAITING, 'Waiting'),
+        (STATUS_OFFERED, 'Offered'),
+        (STATUS_BOOKED, 'Booked'),
+        (STATUS_EXPIRED, 'Expired'),
+    ]
+
+    session = models.ForeignKey(
+        BookingSession,
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries',
+    )
+    slot = models.ForeignKey(
+        TimeSlot,
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries',
+        null=True,
+        blank=True,
+        help_text="Only this slot; any slot of the session if empty"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries',
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_WAITING,
+    )
+    offered_slot = models.ForeignKey(
+        TimeSlot,
+        on_delete=models.SET_NULL,
+        related_name='waitlist_offers',
+        null=True,
+        blank=True,
+        help_text="Slot held for this guest"
+    )
+    hold_expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['session', 'status', 'created_at'], name='waitlist_queue_idx'),
+            models.Index(fields=['offered_slot', 'status'], name='waitlist_offer_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['session', 'user'],
+                condition=models.Q(status__in=['waiting', 'offered']),
+                name='waitlist_one_active_entry',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} | {self.session} | {self.status}"
+
+
+
+class DailyUtilization(models.Model):
+    """
+    Daily rollup of slots per owner and session, in the owner's time zone
+
+    Written only by analytics.refresh_utilization(); dashboards read these
+    rows instead of scanning TimeSlot.
+    """
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='daily_utilization',
+    )
+    session = models.ForeignKey(
+        BookingSession,
+        on_delete=models.CASCADE,
+        related_name='daily_utilization',
+        null=True,
+        blank=True,
+    )
+    day = models.DateField()
+    slots = models.PositiveIntegerField(default=0)
+    booked_slots = models.PositiveIntegerField(default=0)
+    offered_seconds = models.BigIntegerField(default=0)
+    booked_seconds = models.BigIntegerField(default=0)
+    lead_time_seconds = models.BigIntegerField(
+        default=0,
+        help_text="Sum of start_time - booked_at over booked slots"
+    )
+    cancellations = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['day']
+        indexes = [
+            models.Index(fields=['owner', 'day'], name='utilization_owner_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner_id} | {self.session_id} | {self.day}"
+
+
+class UtilizationInvalidation(models.Model):
+    """
+    Day that lost a slot (moved or deleted); the updated_at watermark can't
+    see those, so signals record them for the next rollup run
+    """
+    owner_id = models.IntegerField()
+    start_time = models.DateTimeField()
+
+
+class RollupWatermark(models.Model):
+    """
+    Position of an incremental job: rows with updated_at after `value`
+    have not been processed yet
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} | {self.value}"
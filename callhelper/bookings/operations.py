@@ -0,0 +1,19 @@
+"""
+Migration operations for PostgreSQL-only schema objects
+
+Индексы GIN/pg_trgm есть только в PostgreSQL. Эти операции меняют состояние
+миграций как обычно, но на других СУБД (например, SQLite в тестах) не
+выполняют SQL.
+"""
+from django.db import migrations
+
+
+class AddPostgresIndex(migrations.AddIndex):
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
@@ -0,0 +1,132 @@
+"""
+Transactional outbox for Telegram notifications
+
+Messages are inserted in the same transaction as the booking change, so they
+are never lost and never sent for a rolled back change. Dispatchers claim
+pending rows with SELECT ... FOR UPDATE SKIP LOCKED, which lets any number of
+them run side by side without sending a message twice.
+
+The claim is a lease: a short transaction pushes available_at CLAIM_LEASE
+ahead and counts the attempt, then commits. Messages are sent with no
+transaction open and no row locked, and a second short transaction records
+the results. A dispatcher killed mid-batch leaves its rows to be picked up
+again when the lease runs out.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_WORKERS = 8
+MAX_ATTEMPTS = 5
+# Дольше, чем жесткий лимит задачи dispatch_notification_outbox
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def enqueue_notification(chat_id, message):
+    """
+    Adds a message to the outbox and wakes the dispatcher after commit
+    """
+    row = NotificationOutbox.objects.create(chat_id=chat_id, message=message)
+    transaction.on_commit(kick_dispatcher)
+    return row
+
+
+def enqueue_notifications(messages):
+    """Adds many (chat_id, message) pairs with one bulk insert"""
+    rows = NotificationOutbox.objects.bulk_create(
+        [NotificationOutbox(chat_id=chat_id, message=message) for chat_id, message in messages],
+        batch_size=1000,
+    )
+    if rows:
+        transaction.on_commit(kick_dispatcher)
+    return rows
+
+
+def kick_dispatcher():
+    """Schedules a dispatch run; beat picks the rows up if the broker is down"""
+    from .tasks import dispatch_notification_outbox
+
+    try:
+        dispatch_notification_outbox.delay()
+    except Exception as e:
+        logger.warning(f"Could not schedule outbox dispatch: {e}")
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=min(30 * 2 ** attempts, 3600))
+
+
+def _claim(batch_size):
+    """Leases up to batch_size due messages to this dispatcher"""
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True).filter(
+                status=NotificationOutbox.STATUS_PENDING,
+                available_at__lte=now,
+            ).order_by('available_at')[:batch_size]
+        )
+        for row in rows:
+            row.attempts += 1
+            row.available_at = now + CLAIM_LEASE
+            row.updated_at = now
+        NotificationOutbox.objects.bulk_update(rows, ['attempts', 'available_at', 'updated_at'])
+    return rows
+
+
+def dispatch_batch(batch_size=BATCH_SIZE, max_workers=MAX_WORKERS):
+    """
+    Claims up to batch_size pending messages, sends them concurrently and
+    records the result. Returns the number of claimed rows.
+    """
+    rows = _claim(batch_size)
+    if not rows:
+        return 0
+
+    from .telegram_service import send_telegram_message
+
+    # Сеть - вне транзакции: строки уже за нами, блокировки сняты
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(rows))) as pool:
+        results = list(pool.map(
+            lambda row: send_telegram_message(row.chat_id, row.message),
+            rows,
+        ))
+
+    now = timezone.now()
+    for row, delivered in zip(rows, results):
+        row.updated_at = now
+        if delivered:
+            row.status = NotificationOutbox.STATUS_SENT
+            row.sent_at = now
+        elif row.attempts >= MAX_ATTEMPTS:
+            row.status = NotificationOutbox.STATUS_FAILED
+            row.last_error = 'Delivery failed, giving up'
+        else:
+            row.available_at = now + _retry_delay(row.attempts)
+            row.last_error = 'Delivery failed, will retry'
+
+    with transaction.atomic():
+        NotificationOutbox.objects.bulk_update(
+            rows,
+            ['status', 'available_at', 'sent_at', 'last_error', 'updated_at'],
+        )
+    return len(rows)
+
+
+def dispatch_pending(batch_size=BATCH_SIZE, max_batches=50):
+    """Dispatches batches until the outbox is drained or max_batches is hit"""
+    total = 0
+    for _ in range(max_batches):
+        claimed = dispatch_batch(batch_size=batch_size)
+        total += claimed
+        if claimed < batch_size:
+            break
+    return total
@@ -0,0 +1,126 @@
+"""
+Soft deletion of sessions and deferred purge
+
+Deleting a session used to run session.delete(): Django collected every
+slot, seat and waitlist row into memory to send per-object signals, and the
+request held row locks until the cascade finished. Now the request only
+marks rows with a few set-based UPDATEs (soft_delete_session), and
+purge_deleted() removes them later in small batches, children first, with
+plain DELETE ... WHERE id IN (...) statements.
+
+Raw deletes skip signals and Django's cascade, so everything signals would
+have done (caches, analytics) happens at soft-delete time, and every table
+referencing a purged row is cleared before it.
+"""
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .links import forget_public_link
+from .live import publish_slot_event
+from .models import (
+    BookingSession,
+    DailyUtilization,
+    SlotBooking,
+    TimeSlot,
+    WaitlistEntry,
+)
+from .slot_index import invalidate_owner_index
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = 500
+
+
+def soft_delete_session(session):
+    """
+    Hides a session with all its slots; cost does not depend on slot count
+    """
+    with transaction.atomic():
+        # updated_at у слотов тоже меняется: пересчет аналитики увидит их.
+        # Без reminder_task_id поставленные напоминания завершатся, ничего
+        # не отправив
+        TimeSlot.objects.filter(session_id=session.pk).soft_delete(reminder_task_id='')
+        SlotBooking.objects.filter(slot__session_id=session.pk).soft_delete()
+        WaitlistEntry.objects.filter(
+            session_id=session.pk,
+            status__in=[WaitlistEntry.STATUS_WAITING, WaitlistEntry.STATUS_OFFERED],
+        ).update(
+            status=WaitlistEntry.STATUS_EXPIRED,
+            hold_expires_at=None,
+            updated_at=timezone.now(),
+        )
+        BookingSession.objects.filter(pk=session.pk).soft_delete()
+
+        owner_id = session.owner_session_id
+        link = session.public_link
+        transaction.on_commit(lambda: invalidate_owner_index(owner_id))
+        transaction.on_commit(lambda: forget_public_link(link))
+        # Открытые публичные страницы узнают, что сессии больше нет
+        publish_slot_event(session.pk, None, 'closed')
+
+
+def _raw_delete(queryset):
+    """
+    Single DELETE without collecting rows or sending signals
+
+    QuerySet._raw_delete is what Django itself uses for fast deletes.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def _purge_slots(ids):
+    _raw_delete(SlotBooking.all_objects.filter(slot_id__in=ids))
+    _raw_delete(WaitlistEntry.all_objects.filter(slot_id__in=ids))
+    WaitlistEntry.all_objects.filter(offered_slot_id__in=ids).update(offered_slot=None)
+    return _raw_delete(TimeSlot.all_objects.filter(pk__in=ids))
+
+
+def _purge_sessions(ids):
+    _raw_delete(WaitlistEntry.all_objects.filter(session_id__in=ids))
+    _raw_delete(DailyUtilization.objects.filter(session_id__in=ids))
+    return _raw_delete(BookingSession.all_objects.filter(pk__in=ids))
+
+
+def purge_deleted(retention=None, batch_size=PURGE_BATCH_SIZE):
+    """
+    Hard-deletes rows soft-deleted more than `retention` ago
+
+    Each batch is its own short transaction, so locks are held briefly.
+
+    Returns:
+        dict: сколько слотов и сессий удалено
+    """
+    if retention is None:
+        retention = timedelta(hours=settings.SOFT_DELETE_RETENTION_HOURS)
+    cutoff = timezone.now() - retention
+    purged = {'slots': 0, 'sessions': 0}
+
+    # Сначала слоты: на них ссылаются места и лист ожидания, а сами они
+    # ссылаются на сессии
+    slots = TimeSlot.all_objects.filter(
+        Q(deleted_at__lt=cutoff) | Q(session__deleted_at__lt=cutoff)
+    ).order_by().values_list('pk', flat=True)
+    while True:
+        with transaction.atomic():
+            ids = list(slots[:batch_size])
+            if not ids:
+                break
+            purged['slots'] += _purge_slots(ids)
+
+    sessions = BookingSession.all_objects.filter(
+        deleted_at__lt=cutoff
+    ).order_by().values_list('pk', flat=True)
+    while True:
+        with transaction.atomic():
+            ids = list(sessions[:batch_size])
+            if not ids:
+                break
+            purged['sessions'] += _purge_sessions(ids)
+
+    logger.info(f"Purged {purged['slots']} slots and {purged['sessions']} sessions")
+    return purged
@@ -0,0 +1,150 @@
+"""
+Reminders about upcoming meetings
+
+A reminder is scheduled when a slot gets booked: a Celery task with an
+ETA of start_time - REMINDER_LEAD_HOURS. Its id is stored in
+TimeSlot.reminder_task_id, which is the source of truth:
+
+- cancelling or moving a booked slot replaces the id (the old task is
+  revoked, and would find nothing to do anyway);
+- the task sends only while the slot still carries its id, and claims the
+  send with a conditional UPDATE of reminder_sent_at, so a redelivered or
+  duplicated task never sends twice.
+
+Brokers redeliver unacknowledged ETA tasks after the visibility timeout
+(1 hour on Redis), so far-off reminders hop: the task re-queues itself
+under the same id at most MAX_COUNTDOWN ahead until the reminder is due.
+"""
+from datetime import timedelta
+import logging
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import TimeSlot
+
+logger = logging.getLogger(__name__)
+
+MAX_COUNTDOWN = timedelta(minutes=45)
+
+
+def reminder_due(start_time):
+    return start_time - timedelta(hours=settings.REMINDER_LEAD_HOURS)
+
+
+def next_eta(start_time, now=None):
+    now = now or timezone.now()
+    return min(reminder_due(start_time), now + MAX_COUNTDOWN)
+
+
+def new_reminder_id(start_time, now=None):
+    """Task id for a fresh booking, or '' if it's too late to remind"""
+    if reminder_due(start_time) <= (now or timezone.now()):
+        return ''
+    return str(uuid.uuid4())
+
+
+def schedule_reminder(slot_id, task_id, start_time):
+    """Queues the reminder task after the booking commits"""
+    transaction.on_commit(lambda: _apply(slot_id, task_id, next_eta(start_time)))
+
+
+def _apply(slot_id, task_id, eta):
+    from .tasks import send_slot_reminder
+
+    try:
+        send_slot_reminder.apply_async(args=[slot_id], task_id=task_id, eta=eta)
+    except Exception as e:
+        logger.error(f"Could not schedule reminder for slot {slot_id}: {e}")
+
+
+def revoke_reminder(task_id):
+    """Best effort: a task that is not revoked exits on the id check"""
+    transaction.on_commit(lambda: _revoke(task_id))
+
+
+def _revoke(task_id):
+    from celery import current_app
+
+    if current_app.conf.task_always_eager:
+        return
+    try:
+        current_app.control.revoke(task_id)
+    except Exception as e:
+        logger.warning(f"Could not revoke reminder {task_id}: {e}")
+
+
+def process_reminder(slot_id, task_id, now=None):
+    """
+    Sends the reminder if it is due
+
+    Returns:
+        datetime | None: когда проверить снова, если напоминать еще рано
+    """
+    from .outbox import enqueue_notification
+    from .telegram_service import load_slot_notification, render_reminder_notification
+
+    now = now or timezone.now()
+    pending = TimeSlot.objects.filter(
+        pk=slot_id,
+        reminder_task_id=task_id,
+        is_booked=True,
+        reminder_sent_at__isnull=True,
+    )
+    start_time = pending.values_list('start_time', flat=True).first()
+    if start_time is None:
+        # Отменен, перенесен, удален или уже отправлен
+        return None
+    if reminder_due(start_time) > now:
+        return next_eta(start_time, now)
+    if start_time <= now:
+        logger.warning(f"Reminder for slot {slot_id} is late, meeting already started")
+        return None
+
+    with transaction.atomic():
+        if not pending.update(reminder_sent_at=now):
+            return None
+        notification = load_slot_notification(slot_id)
+        if notification and notification.telegram_id:
+            enqueue_notification(
+                chat_id=notification.telegram_id,
+                message=render_reminder_notification(notification),
+            )
+    return None
+
+
+def schedule_missing_reminders(batch_size=500, now=None):
+    """
+    Assigns ids and queues tasks for booked slots that have none
+
+    For bookings made before reminders were scheduled at booking time.
+    Slots whose reminder is already due are skipped: the old hourly scan
+    covered them.
+
+    Returns:
+        int: сколько напоминаний поставлено
+    """
+    now = now or timezone.now()
+    missing = TimeSlot.objects.filter(
+        is_booked=True,
+        reminder_task_id='',
+        reminder_sent_at__isnull=True,
+        start_time__gt=now + timedelta(hours=settings.REMINDER_LEAD_HOURS),
+    ).order_by('pk').only('pk', 'start_time', 'reminder_task_id')
+
+    scheduled = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            slots = list(missing.filter(pk__gt=last_pk)[:batch_size])
+            if not slots:
+                break
+            for slot in slots:
+                slot.reminder_task_id = new_reminder_id(slot.start_time, now)
+                schedule_reminder(slot.pk, slot.reminder_task_id, slot.start_time)
+            TimeSlot.objects.bulk_update(slots, ['reminder_task_id'])
+        scheduled += len(slots)
+        last_pk = slots[-1].pk
+    return scheduled
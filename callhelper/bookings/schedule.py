@@ -0,0 +1,115 @@
+"""
+Публичное расписание сессии, сгруппированное по локальным дням
+
+Структура строится одним запросом и одним проходом по слотам, без
+шаблонных фильтров |date на каждую строку, и кэшируется по
+(сессия, часовой пояс, версия). Версия меняется при любом изменении
+слотов сессии, а прошедшие слоты отбрасываются при чтении.
+"""
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .timezones import get_zone, localize_many
+
+SCHEDULE_CACHE_TIMEOUT = 60 * 10
+
+
+def _version_key(session_id):
+    return f'public_schedule:version:{session_id}'
+
+
+def _schedule_key(session_id, tz_name, version):
+    return f'public_schedule:{session_id}:{tz_name}:{version}'
+
+
+def build_public_schedule(session_id, tz_name, now=None):
+    """
+    Returns [{'date', 'slots': [{'id', 'start', 'end', 'duration', 'start_ts',
+    'seats_left'}]}] for free upcoming slots of the session in the given
+    timezone; seats_left is None for single-guest slots
+    """
+    from django.db.models import Exists, OuterRef
+    from django.utils import timezone
+    from .models import TimeSlot, WaitlistEntry, format_duration
+
+    now = now or timezone.now()
+    rows = list(TimeSlot.objects.filter(
+        session_id=session_id,
+        is_booked=False,
+        start_time__gt=now,
+    ).annotate(
+        # Удержание за гостем из листа ожидания: обычный слот скрыт целиком,
+        # в групповом занято одно место
+        held=Exists(WaitlistEntry.objects.filter(
+            offered_slot_id=OuterRef('pk'),
+            status=WaitlistEntry.STATUS_OFFERED,
+            hold_expires_at__gt=now,
+        )),
+    ).order_by('start_time').values_list(
+        'id', 'start_time', 'end_time', 'capacity', 'booked_count', 'held'))
+    rows = [
+        row for row in rows
+        if not row[5] or (row[3] > 1 and row[3] - row[4] > 1)
+    ]
+
+    tz = get_zone(tz_name)
+    starts = localize_many([row[1] for row in rows], tz)
+    ends = localize_many([row[2] for row in rows], tz)
+
+    days = []
+    current_date = None
+    for (slot_id, start_utc, end_utc, capacity, booked, held), start, end in zip(rows, starts, ends):
+        if start.date() != current_date:
+            current_date = start.date()
+            days.append({'date': current_date, 'slots': []})
+        days[-1]['slots'].append({
+            'id': slot_id,
+            'start': start.strftime('%H:%M'),
+            'end': end.strftime('%H:%M'),
+            'duration': format_duration(int((end_utc - start_utc).total_seconds())),
+            'start_ts': start_utc.timestamp(),
+            'seats_left': capacity - booked - int(held) if capacity > 1 else None,
+        })
+    return days
+
+
+def get_schedule_version(session_id):
+    """Текущая версия расписания сессии (меняется при изменении слотов)"""
+    version = cache.get(_version_key(session_id))
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(_version_key(session_id), version, None)
+    return version
+
+
+def get_public_schedule(session_id, tz_name, version=None):
+    """
+    Returns the cached schedule without slots that already started
+    """
+    version = version or get_schedule_version(session_id)
+
+    key = _schedule_key(session_id, tz_name, version)
+    days = cache.get(key)
+    if days is None:
+        days = build_public_schedule(session_id, tz_name)
+        cache.set(key, days, SCHEDULE_CACHE_TIMEOUT)
+
+    now_ts = time.time()
+    result = []
+    for day in days:
+        slots = [slot for slot in day['slots'] if slot['start_ts'] > now_ts]
+        if slots:
+            result.append({'date': day['date'], 'slots': slots})
+    return result
+
+
+def invalidate_public_schedule(session_id):
+    """Меняет версию расписания сессии после коммита транзакции"""
+    if session_id is None:
+        return
+    transaction.on_commit(
+        lambda: cache.set(_version_key(session_id), uuid.uuid4().hex, None)
+    )
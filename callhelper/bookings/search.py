@@ -0,0 +1,71 @@
+"""
+Поиск по сессиям и гостям
+
+На PostgreSQL используется полнотекстовый поиск (GIN по SearchVector) для
+названия и описания сессии и pg_trgm (GIN gin_trgm_ops) для нечеткого поиска
+по названию и имени гостя. На других СУБД - обычный icontains.
+"""
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
+SEARCH_CONFIG = 'simple'
+
+
+def _is_postgres(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def search_sessions(queryset, term):
+    """
+    Фильтрует сессии по поисковой строке и сортирует по релевантности
+    """
+    term = (term or '').strip()
+    if not term:
+        return queryset
+
+    if not _is_postgres(queryset):
+        return queryset.filter(
+            Q(title__icontains=term) | Q(description__icontains=term) | Q(public_link=term)
+        )
+
+    # Выражение совпадает с индексом session_search_vector_idx
+    vector = SearchVector('title', 'description', config=SEARCH_CONFIG)
+    query = SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.annotate(
+        search=vector,
+        relevance=Greatest(
+            SearchRank(vector, query),
+            TrigramWordSimilarity(term, 'title'),
+        ),
+    ).filter(
+        Q(search=query) | Q(title__trigram_word_similar=term) | Q(public_link=term)
+    ).order_by('-relevance', '-created_at')
+
+
+def search_slots(queryset, term):
+    """
+    Фильтрует слоты по имени гостя, логину забронировавшего и названию сессии
+    """
+    term = (term or '').strip()
+    if not term:
+        return queryset
+
+    if not _is_postgres(queryset):
+        return queryset.filter(
+            Q(guest_name__icontains=term)
+            | Q(booked_by__username=term)
+            | Q(session__title__icontains=term)
+        )
+
+    return queryset.filter(
+        Q(guest_name__trigram_word_similar=term)
+        | Q(booked_by__username=term)
+        | Q(session__title__trigram_word_similar=term)
+    )
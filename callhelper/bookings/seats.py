@@ -0,0 +1,158 @@
+"""
+Seats in group slots (TimeSlot.capacity > 1)
+
+A group call is a single TimeSlot row plus one SlotBooking per guest.
+A seat is claimed with one conditional UPDATE:
+
+    UPDATE ... SET booked_count = booked_count + 1
+    WHERE id = %s AND booked_count < capacity
+
+so concurrent guests can never overbook, and no overlap checks run per
+guest. The slot turns is_booked only when the last seat is taken, which is
+what session counters and the public schedule look at.
+
+Like bulk import, .update() skips TimeSlot signals, so counters, caches,
+live pages, reminders and waitlist promotion are handled here.
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .counters import apply_session_counters
+from .live import publish_slot_event
+from .models import SlotBooking, TimeSlot
+from .outbox import enqueue_notification
+from .reminders import new_reminder_id, revoke_reminder, schedule_reminder
+from .schedule import invalidate_public_schedule
+from .waitlist import schedule_promotion
+
+logger = logging.getLogger(__name__)
+
+
+class SeatUnavailable(Exception):
+    """No free seats left, or the user already holds a seat"""
+
+
+def _availability_changed(slot, became_full):
+    """
+    Counters, live pages, reminders and the waitlist only care about
+    full <-> not full
+    """
+    free_future = int(slot.start_time > timezone.now())
+    if became_full:
+        apply_session_counters(slot.session_id, 0, -free_future, 1)
+        publish_slot_event(slot.session_id, slot.pk, 'unavailable')
+        task_id = new_reminder_id(slot.start_time)
+        if task_id:
+            TimeSlot.objects.filter(pk=slot.pk).update(
+                reminder_task_id=task_id, reminder_sent_at=None,
+            )
+            schedule_reminder(slot.pk, task_id, slot.start_time)
+    else:
+        apply_session_counters(slot.session_id, 0, free_future, -1)
+        publish_slot_event(slot.session_id, slot.pk, 'available')
+        schedule_promotion(slot.pk)
+        task_id = TimeSlot.objects.filter(pk=slot.pk).values_list(
+            'reminder_task_id', flat=True).first()
+        if task_id:
+            TimeSlot.objects.filter(pk=slot.pk).update(
+                reminder_task_id='', reminder_sent_at=None,
+            )
+            revoke_reminder(task_id)
+
+
+def claim_seat(slot, user=None, guest_name='', reserved=0):
+    """
+    Takes one seat in a group slot
+
+    `reserved` seats stay free for someone else (a waitlist hold): the
+    claim fails unless more than that many seats are left.
+
+    Returns:
+        SlotBooking: созданная запись
+    Raises:
+        SeatUnavailable: мест нет или пользователь уже записан
+    """
+    with transaction.atomic():
+        # Значения в SET считаются по строке до обновления
+        claimed = TimeSlot.objects.filter(
+            pk=slot.pk,
+            capacity__gt=1,
+            booked_count__lt=F('capacity') - reserved,
+        ).update(
+            booked_count=F('booked_count') + 1,
+            is_booked=Case(
+                When(booked_count__gte=F('capacity') - 1, then=Value(True)),
+                default=Value(False),
+            ),
+            booked_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        if not claimed:
+            raise SeatUnavailable('No seats left')
+
+        try:
+            with transaction.atomic():
+                booking = SlotBooking.objects.create(
+                    slot=slot,
+                    user=user if user is not None and user.is_authenticated else None,
+                    guest_name=guest_name,
+                )
+        except IntegrityError:
+            raise SeatUnavailable('Already booked')
+
+        slot.refresh_from_db(fields=['booked_count', 'is_booked', 'booked_at'])
+        if slot.is_booked:
+            _availability_changed(slot, became_full=True)
+        invalidate_public_schedule(slot.session_id)
+        _notify_owner(slot, booking)
+    return booking
+
+
+def release_seat(booking):
+    """
+    Frees a seat; returns False if the booking was already removed
+    """
+    with transaction.atomic():
+        deleted, _ = SlotBooking.objects.filter(pk=booking.pk).delete()
+        if not deleted:
+            return False
+
+        slot = booking.slot
+        # Сначала пробуем освободить место в заполненном слоте: условие
+        # в UPDATE, а не отдельный SELECT, чтобы две отмены не посчитали
+        # слот заполненным обе
+        was_full = TimeSlot.objects.filter(pk=slot.pk, is_booked=True).update(
+            booked_count=F('booked_count') - 1,
+            is_booked=False,
+            cancellations=F('cancellations') + 1,
+            updated_at=timezone.now(),
+        )
+        if was_full:
+            _availability_changed(slot, became_full=False)
+        else:
+            TimeSlot.objects.filter(pk=slot.pk, booked_count__gt=0).update(
+                booked_count=F('booked_count') - 1,
+                cancellations=F('cancellations') + 1,
+                updated_at=timezone.now(),
+            )
+        invalidate_public_schedule(slot.session_id)
+    return True
+
+
+def _notify_owner(slot, booking):
+    from .telegram_service import load_slot_notification, render_booking_notification
+
+    try:
+        notification = load_slot_notification(slot.pk)
+        if notification and notification.telegram_id:
+            notification.booked_by = booking.user.username if booking.user else None
+            notification.guest_name = booking.guest_name or None
+            enqueue_notification(
+                chat_id=notification.telegram_id,
+                message=render_booking_notification(notification, is_owner=True),
+            )
+    except Exception as e:
+        logger.error(f"Ошибка при отправке уведомления владельцу: {e}")
@@ -4,42 +4,173 @@ Django Signals для автоматической отправки уведом
 Signals позволяют выполнять код при определенных событиях в Django.
 В данном случае - отправка уведомлений при бронировании/отмене.
 """
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import TimeSlot
-from .telegram_service import (
-    send_telegram_message,
-    format_booking_notification,
-    format_cancellation_notification
-)
+from django.contrib.auth.signals import user_logged_in
+from .links import forget_public_link
+from .models import BookingSession, TimeSlot
+from django.db import transaction
+from django.utils import timezone
+from .analytics import record_invalidation
+from .live import publish_slot_event
+from .reminders import new_reminder_id, revoke_reminder, schedule_reminder
+from .counters import apply_session_counters, slot_contribution
+from .schedule import invalidate_public_schedule
+from .slot_index import invalidate_owner_index
+from .timezones import remember_owner_timezone
+from .waitlist import schedule_promotion
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Поля, с которыми сигналы сравнивают новое состояние слота
+TRACKED_FIELDS = (
+    'is_booked', 'booked_by_id', 'start_time', 'end_time', 'session_id',
+    'reminder_task_id',
+)
+
+
 @receiver(pre_save, sender=TimeSlot)
 def track_booking_status_before_save(sender, instance, **kwargs):
     """
     Сохраняет предыдущее состояние до сохранения для отслеживания изменений
+
+    Слоты, загруженные из БД, помнят исходные значения (TimeSlot.from_db,
+    refresh_from_db), поэтому повторный SELECT нужен только для объектов,
+    собранных вручную или загруженных не целиком.
     """
-    if instance.pk:
-        try:
-            old_instance = TimeSlot.objects.get(pk=instance.pk)
-            instance._old_is_booked = old_instance.is_booked
-            instance._old_booked_by = old_instance.booked_by
-        except TimeSlot.DoesNotExist:
-            instance._old_is_booked = False
-            instance._old_booked_by = None
+    loaded = getattr(instance, '_loaded_values', None)
+    # Снимка нет или он неполный (only()/defer()) - читаем из БД
+    if instance.pk and not (loaded and all(name in loaded for name in TRACKED_FIELDS)):
+        loaded = TimeSlot.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+
+    if loaded:
+        instance._old_is_booked = loaded['is_booked']
+        instance._old_booked_by_id = loaded['booked_by_id']
+        instance._old_interval = (loaded['start_time'], loaded['end_time'])
+        instance._old_session_id = loaded['session_id']
+        instance._old_reminder_task_id = loaded['reminder_task_id']
     else:
         instance._old_is_booked = False
-        instance._old_booked_by = None
+        instance._old_booked_by_id = None
+        instance._old_interval = None
+        instance._old_session_id = None
+        instance._old_reminder_task_id = ''
+
+    # Счетчик отмен для аналитики пишется тем же UPDATE
+    if instance._old_is_booked and not instance.is_booked:
+        instance.cancellations += 1
+
+    # Новое бронирование или перенос забронированного слота получают
+    # новую задачу напоминания, отмена - снимает ее
+    old_start = instance._old_interval[0] if instance._old_interval else None
+    if instance.is_booked and (not instance._old_is_booked or old_start != instance.start_time):
+        instance.reminder_task_id = new_reminder_id(instance.start_time)
+        instance.reminder_sent_at = None
+    elif not instance.is_booked:
+        instance.reminder_task_id = ''
+        instance.reminder_sent_at = None
+
+
+@receiver(post_save, sender=TimeSlot)
+def update_session_counters_on_save(sender, instance, created, **kwargs):
+    """
+    Обновляет счетчики сессии по разнице состояния слота до и после сохранения
+    """
+    now = timezone.now()
+    new = slot_contribution(instance.is_booked, instance.start_time, now)
+
+    old_interval = getattr(instance, '_old_interval', None)
+    if created or old_interval is None:
+        apply_session_counters(instance.session_id, *new)
+        return
+
+    old = slot_contribution(getattr(instance, '_old_is_booked', False), old_interval[0], now)
+    old_session_id = getattr(instance, '_old_session_id', None)
+    if old_session_id != instance.session_id:
+        apply_session_counters(old_session_id, *(-value for value in old))
+        apply_session_counters(instance.session_id, *new)
+    else:
+        apply_session_counters(
+            instance.session_id,
+            *(n - o for n, o in zip(new, old))
+        )
+
+
+@receiver(post_delete, sender=TimeSlot)
+def update_session_counters_on_delete(sender, instance, **kwargs):
+    """
+    Уменьшает счетчики сессии при удалении слота
+    """
+    old = slot_contribution(instance.is_booked, instance.start_time)
+    apply_session_counters(instance.session_id, *(-value for value in old))
+
+
+@receiver(post_save, sender=TimeSlot)
+def invalidate_slot_index_on_save(sender, instance, created, **kwargs):
+    """
+    Сбрасывает индекс интервалов владельца, если слот создан или перемещен,
+    и кэш публичного расписания сессии
+    """
+    old_interval = getattr(instance, '_old_interval', None)
+    if created or old_interval != (instance.start_time, instance.end_time):
+        invalidate_owner_index(instance.owner_id)
+    if old_interval and old_interval[0] != instance.start_time:
+        # Старый день аналитики потерял слот
+        record_invalidation(instance.owner_id, old_interval[0])
+
+    # Публичное расписание зависит и от статуса бронирования
+    invalidate_public_schedule(instance.session_id)
+    old_session_id = getattr(instance, '_old_session_id', None)
+    if old_session_id and old_session_id != instance.session_id:
+        invalidate_public_schedule(old_session_id)
+
+
+@receiver(post_delete, sender=TimeSlot)
+def invalidate_slot_index_on_delete(sender, instance, **kwargs):
+    """
+    Сбрасывает индекс интервалов владельца при удалении слота
+    """
+    invalidate_owner_index(instance.owner_id)
+    invalidate_public_schedule(instance.session_id)
+    record_invalidation(instance.owner_id, instance.start_time)
+
+
+@receiver(post_save, sender=TimeSlot)
+def publish_slot_availability_on_save(sender, instance, created, **kwargs):
+    """
+    Публикует изменение доступности слота для открытых публичных страниц
+    """
+    old_session_id = getattr(instance, '_old_session_id', None)
+    old_interval = getattr(instance, '_old_interval', None)
+    if created:
+        if not instance.is_booked:
+            publish_slot_event(instance.session_id, instance.pk, 'available')
+        return
+
+    if old_session_id != instance.session_id:
+        publish_slot_event(old_session_id, instance.pk, 'unavailable')
+        if not instance.is_booked:
+            publish_slot_event(instance.session_id, instance.pk, 'available')
+    elif old_interval != (instance.start_time, instance.end_time):
+        # Слот передвинут: страницам проще перечитать список
+        publish_slot_event(instance.session_id, instance.pk, 'resync')
+    elif getattr(instance, '_old_is_booked', False) != instance.is_booked:
+        event = 'unavailable' if instance.is_booked else 'available'
+        publish_slot_event(instance.session_id, instance.pk, event)
+
+
+@receiver(post_delete, sender=TimeSlot)
+def publish_slot_availability_on_delete(sender, instance, **kwargs):
+    publish_slot_event(instance.session_id, instance.pk, 'unavailable')
 
 
 @receiver(post_save, sender=TimeSlot)
 def send_booking_telegram_notification(sender, instance, created, **kwargs):
     """
-    Отправляет уведомление в Telegram при бронировании слота
+    Ставит уведомление в Telegram в outbox при бронировании слота
     
     sender - модель, которая вызвала сигнал (TimeSlot)
     instance - конкретный объект TimeSlot, который был сохранен
@@ -47,16 +178,25 @@ def send_booking_telegram_notification(sender, instance, created, **kwargs):
     """
     # Проверяем, стал ли слот забронированным (is_booked изменился с False на True)
     was_booked_before = getattr(instance, '_old_is_booked', False)
-    
+    if instance.is_booked == was_booked_before:
+        return
+
+    # Модули уведомлений нужны только при смене статуса, не при запуске
+    from .outbox import enqueue_notification
+    from .telegram_service import (
+        notification_for_slot,
+        render_booking_notification,
+        render_cancellation_notification
+    )
+
     if instance.is_booked and not was_booked_before:
         # Слот только что был забронирован - отправляем уведомление владельцу
         try:
-            profile = instance.owner.profile
-            if profile and profile.telegram_id:
-                message = format_booking_notification(instance, is_owner=True)
-                send_telegram_message(
-                    chat_id=profile.telegram_id,
-                    message=message
+            notification = notification_for_slot(instance)
+            if notification and notification.telegram_id:
+                enqueue_notification(
+                    chat_id=notification.telegram_id,
+                    message=render_booking_notification(notification, is_owner=True)
                 )
         except Exception as e:
             logger.error(f"Ошибка при отправке уведомления владельцу: {e}")
@@ -65,17 +205,53 @@ def send_booking_telegram_notification(sender, instance, created, **kwargs):
     elif was_booked_before and not instance.is_booked:
         # Бронирование было отменено - отправляем уведомление
         try:
-            profile = instance.owner.profile
-            if profile and profile.telegram_id:
-                message = format_cancellation_notification(instance)
-                send_telegram_message(
-                    chat_id=profile.telegram_id,
-                    message=message
+            notification = notification_for_slot(instance)
+            if notification and notification.telegram_id:
+                enqueue_notification(
+                    chat_id=notification.telegram_id,
+                    message=render_cancellation_notification(notification)
                 )
         except Exception as e:
             logger.error(f"Ошибка при отправке уведомления об отмене: {e}")
 
 
+@receiver(post_save, sender=TimeSlot)
+def schedule_reminder_on_save(sender, instance, created, **kwargs):
+    """
+    Ставит задачу напоминания с ETA и отзывает замененную
+    """
+    old_task_id = getattr(instance, '_old_reminder_task_id', '')
+    if instance.reminder_task_id == old_task_id:
+        return
+    if old_task_id:
+        revoke_reminder(old_task_id)
+    if instance.reminder_task_id:
+        schedule_reminder(instance.pk, instance.reminder_task_id, instance.start_time)
+
+
+@receiver(post_delete, sender=TimeSlot)
+def revoke_reminder_on_delete(sender, instance, **kwargs):
+    if instance.reminder_task_id:
+        revoke_reminder(instance.reminder_task_id)
+
+
+@receiver(post_save, sender=TimeSlot)
+def promote_waitlist_on_cancel(sender, instance, created, **kwargs):
+    """
+    После отмены бронирования предлагает слот следующему в листе ожидания
+    """
+    if getattr(instance, '_old_is_booked', False) and not instance.is_booked:
+        schedule_promotion(instance.pk)
+
+
+@receiver(post_delete, sender=BookingSession)
+def forget_public_link_on_delete(sender, instance, **kwargs):
+    """
+    Убирает ссылку удаленной сессии из кэша резолвера
+    """
+    transaction.on_commit(lambda: forget_public_link(instance.public_link))
+
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     """
@@ -85,3 +261,17 @@ def create_user_profile(sender, instance, created, **kwargs):
         from .models import UserProfile
         UserProfile.objects.get_or_create(user=instance)
 
+
+
+@receiver(user_logged_in)
+def remember_owner_timezone_on_login(sender, request, user, **kwargs):
+    """
+    Кладет пояс владельца в сессию: OwnerTimezoneMiddleware включает его
+    без запроса к профилю
+    """
+    if request is None or not hasattr(request, 'session'):
+        return
+    from .models import UserProfile
+
+    remember_owner_timezone(request, UserProfile.objects.filter(
+        user=user).values_list('timezone', flat=True).first())
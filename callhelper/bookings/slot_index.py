@@ -0,0 +1,142 @@
+"""
+In-memory index of busy intervals per owner
+
+Owner's slots never overlap (TimeSlot.clean guarantees it), so when they are
+sorted by start_time their end_time values are sorted too. That lets us answer
+"does [start, end) overlap anything?" with two binary searches instead of a
+query. The index is cached per owner and invalidated by bumping a version key
+whenever a slot is created, moved or deleted.
+
+The index is advisory: it rejects obvious conflicts before we touch the DB,
+TimeSlot.clean() remains the source of truth.
+"""
+from bisect import bisect_right
+from datetime import datetime, timezone as dt_timezone
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+INDEX_CACHE_TIMEOUT = 60 * 60
+
+
+def _version_key(owner_id):
+    return f'slot_index:version:{owner_id}'
+
+
+def _index_key(owner_id, version):
+    return f'slot_index:{owner_id}:{version}'
+
+
+def _ts(value):
+    return value.timestamp()
+
+
+def _dt(value):
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+
+
+class SlotIntervalIndex:
+    """
+    Sorted busy intervals of one owner, stored as parallel lists of
+    epoch seconds to keep the cached payload compact.
+    """
+    __slots__ = ('starts', 'ends', 'pks')
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        self.pks = []
+        for pk, start, end in sorted(intervals, key=lambda item: item[1]):
+            self.pks.append(pk)
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def __len__(self):
+        return len(self.pks)
+
+    def __getstate__(self):
+        return (self.starts, self.ends, self.pks)
+
+    def __setstate__(self, state):
+        self.starts, self.ends, self.pks = state
+
+    @classmethod
+    def build(cls, owner_id):
+        """Loads the owner's intervals from the DB with a single query"""
+        from .models import TimeSlot
+
+        rows = TimeSlot.objects.filter(owner_id=owner_id).values_list(
+            'pk', 'start_time', 'end_time'
+        ).order_by('start_time')
+        return cls((pk, _ts(start), _ts(end)) for pk, start, end in rows)
+
+    @classmethod
+    def for_owner(cls, owner_id):
+        """Returns the cached index for the owner, building it on a miss"""
+        version = cache.get(_version_key(owner_id))
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.set(_version_key(owner_id), version, None)
+
+        key = _index_key(owner_id, version)
+        index = cache.get(key)
+        if index is None:
+            index = cls.build(owner_id)
+            cache.set(key, index, INDEX_CACHE_TIMEOUT)
+        return index
+
+    def conflicts(self, start, end, exclude_pk=None):
+        """
+        Returns (pk, start, end) of stored intervals overlapping [start, end)
+
+        The first candidate is the first interval ending after `start`;
+        we walk forward while intervals still start before `end`.
+        """
+        start, end = _ts(start), _ts(end)
+        result = []
+        i = bisect_right(self.ends, start)
+        while i < len(self.pks) and self.starts[i] < end:
+            if self.pks[i] != exclude_pk:
+                result.append((self.pks[i], _dt(self.starts[i]), _dt(self.ends[i])))
+            i += 1
+        return result
+
+    def overlaps(self, start, end, exclude_pk=None):
+        return bool(self.conflicts(start, end, exclude_pk=exclude_pk))
+
+    def check_batch(self, intervals):
+        """
+        Validates a batch of proposed (start, end) intervals
+
+        Returns a list of (position, reason) for rejected items, where
+        position is the index of the item in `intervals`. Items are checked
+        against the stored slots and against each other.
+        """
+        errors = []
+        ordered = sorted(range(len(intervals)), key=lambda pos: intervals[pos][0])
+        previous_end = None
+        for pos in ordered:
+            start, end = intervals[pos]
+            if end <= start:
+                errors.append((pos, 'The end time must be later than the start time.'))
+                continue
+            if self.overlaps(start, end):
+                errors.append((pos, 'Overlaps with an existing slot.'))
+                continue
+            if previous_end is not None and start < previous_end:
+                errors.append((pos, 'Overlaps with another slot in the batch.'))
+                continue
+            previous_end = end
+        errors.sort()
+        return errors
+
+
+def invalidate_owner_index(owner_id):
+    """
+    Bumps the owner's version once the current transaction commits,
+    so readers never cache a snapshot of uncommitted data.
+    """
+    transaction.on_commit(
+        lambda: cache.set(_version_key(owner_id), uuid.uuid4().hex, None)
+    )
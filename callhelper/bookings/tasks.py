@@ -1,33 +1,94 @@
 from celery import shared_task
-from .models import TimeSlot
-from django.utils import timezone
-from datetime import timedelta
-from .telegram_service import send_telegram_message
-
-@shared_task
-def send_reminder_notifications():
-    """Sends reminders about upcoming meetings"""
-    now = timezone.now()
-    # Слоты которые начнутся в окне 23.5-24.5 часа
-    time_24h_from = now + timedelta(hours=23, minutes=30)
-    time_24h_to = now + timedelta(hours=24, minutes=30)
-
-    
-    slots_24h = TimeSlot.objects.filter(
-        is_booked=True,
-        start_time__gte=time_24h_from,
-        start_time__lte=time_24h_to
-    )
-    for slot in slots_24h:
-        try:
-            telegram_profile = slot.owner.profile
-            if telegram_profile and telegram_profile.telegram_id:
-                message = f"⏰ Reminder! You have a meeting in 24 hours..."
-                send_telegram_message(
-                    telegram_profile.telegram_id, 
-                    message
-                )
-        except exception as e:
-            logging.error(f"Error: {e}")
-
-    return f"Count of free slots: {slots_24h.count()}"
+from .outbox import dispatch_pending
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, soft_time_limit=20, time_limit=30)
+def send_slot_reminder(self, slot_id):
+    """Sends the reminder scheduled when the slot was booked"""
+    from .reminders import process_reminder
+
+    check_again_at = process_reminder(slot_id, self.request.id)
+    # В eager режиме (тесты) ждать нельзя
+    if check_again_at is not None and not self.request.is_eager:
+        # Тот же id: отмена или перенос отзывают всю цепочку
+        self.apply_async(args=[slot_id], task_id=self.request.id, eta=check_again_at)
+    return check_again_at is None
+
+
+@shared_task(soft_time_limit=120, time_limit=150)
+def dispatch_notification_outbox():
+    """Delivers pending outbox messages"""
+    return dispatch_pending()
+
+
+# Лимит Telegram - около 30 сообщений в секунду на бота
+@shared_task(rate_limit='20/s', soft_time_limit=20, time_limit=30)
+def process_telegram_update(update):
+    """Handles an update received by the Telegram webhook"""
+    from .telegram_bot import parse_start_command, link_telegram_account
+    from .telegram_service import send_telegram_message
+
+    command = parse_start_command(update)
+    if command is None:
+        return None
+
+    chat_id, token = command
+    user_id = link_telegram_account(token, chat_id)
+    if user_id is None:
+        send_telegram_message(chat_id, "❌ Link expired. Please request a new one on the website.")
+        return None
+
+    send_telegram_message(chat_id, "✅ Telegram connected! You will receive booking notifications here.")
+    return user_id
+
+
+@shared_task(soft_time_limit=20, time_limit=30)
+def promote_waitlist(slot_id):
+    """Offers a freed slot to the next guest on the waitlist"""
+    from .waitlist import promote_next
+
+    entry = promote_next(slot_id)
+    return entry.pk if entry else None
+
+
+@shared_task(soft_time_limit=20, time_limit=30)
+def expire_waitlist_offer(entry_id):
+    """Releases an unclaimed waitlist hold and promotes the next guest"""
+    from .waitlist import expire_offer
+
+    return expire_offer(entry_id)
+
+
+@shared_task(soft_time_limit=120, time_limit=150)
+def expire_waitlist_holds():
+    """Safety net for holds whose expiry task was lost"""
+    from .waitlist import expire_stale_offers
+
+    return expire_stale_offers()
+
+
+@shared_task(soft_time_limit=1800, time_limit=2000)
+def reconcile_counters():
+    """Nightly recount of denormalized session counters"""
+    from .counters import reconcile_session_counters
+
+    return reconcile_session_counters()
+
+
+@shared_task(soft_time_limit=600, time_limit=660)
+def refresh_utilization_rollups():
+    """Incremental refresh of daily utilization rollups"""
+    from .analytics import refresh_utilization
+
+    return refresh_utilization()
+
+
+@shared_task(soft_time_limit=1800, time_limit=2000)
+def purge_deleted_rows():
+    """Nightly hard delete of soft-deleted sessions and slots"""
+    from .purge import purge_deleted
+
+    return purge_deleted()
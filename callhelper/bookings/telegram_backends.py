@@ -0,0 +1,47 @@
+"""
+Транспорты сообщений Telegram
+
+Выбирается настройкой TELEGRAM_BACKEND, как почтовый бэкенд через
+EMAIL_BACKEND. send(payload) получает готовый payload sendMessage и
+возвращает True, если сообщение принято.
+"""
+import logging
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def get_backend():
+    return import_string(settings.TELEGRAM_BACKEND)()
+
+
+class HttpBackend:
+    """Bot API по HTTP (TELEGRAM_API_URL)"""
+
+    def send(self, payload):
+        # requests тянет за собой urllib3/ssl, импортируем при первой отправке
+        import requests
+
+        url = f"{settings.TELEGRAM_API_URL}/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
+        try:
+            response = requests.post(url, json=payload, timeout=10)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Ошибка при отправке сообщения в Telegram: {e}")
+            return False
+        logger.info(f"Сообщение успешно отправлено в Telegram chat_id: {payload['chat_id']}")
+        return True
+
+
+class LocmemBackend:
+    """
+    Складывает сообщения в LocmemBackend.outbox, как locmem почтовый
+    бэкенд в django.core.mail.outbox (тесты)
+    """
+    outbox = []
+
+    def send(self, payload):
+        self.outbox.append(payload)
+        return True
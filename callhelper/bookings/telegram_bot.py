@@ -0,0 +1,98 @@
+"""
+Привязка Telegram аккаунта через deep link бота
+
+Пользователь получает ссылку https://t.me/<bot>?start=<token>. Токен хранится
+в кэше и указывает на user_id. Когда бот получает "/start <token>" через
+webhook, мы записываем chat_id в UserProfile.telegram_id.
+"""
+import secrets
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+UPDATE_DEDUP_TIMEOUT = 60 * 60 * 24
+
+
+def _link_token_key(token):
+    return f'telegram_link:{token}'
+
+
+def _update_key(update_id):
+    return f'telegram_update:{update_id}'
+
+
+def create_link_token(user):
+    """Создает одноразовый токен привязки и сохраняет его в кэше"""
+    token = secrets.token_urlsafe(16)
+    cache.set(_link_token_key(token), user.pk, settings.TELEGRAM_LINK_TOKEN_TTL)
+    return token
+
+
+def get_deep_link(token):
+    """Возвращает ссылку на бота с токеном в параметре start"""
+    return f"https://t.me/{settings.TELEGRAM_BOT_USERNAME}?start={token}"
+
+
+def mark_update_seen(update_id):
+    """
+    Возвращает True, если update_id встречается впервые
+
+    cache.add атомарен, поэтому повторная доставка одного update
+    несколькими воркерами обработается только один раз.
+    """
+    return cache.add(_update_key(update_id), 1, UPDATE_DEDUP_TIMEOUT)
+
+
+def forget_update(update_id):
+    """Снимает отметку, чтобы повторная доставка update была обработана"""
+    cache.delete(_update_key(update_id))
+
+
+def parse_start_command(update):
+    """
+    Извлекает (chat_id, token) из update с командой "/start <token>"
+
+    Returns:
+        tuple | None: None если update не является командой /start с токеном
+    """
+    message = update.get('message') or {}
+    text = message.get('text') or ''
+    chat_id = (message.get('chat') or {}).get('id')
+    if not chat_id or not text.startswith('/start'):
+        return None
+
+    parts = text.split(maxsplit=1)
+    if parts[0].split('@')[0] != '/start' or len(parts) < 2:
+        return None
+    return chat_id, parts[1].strip()
+
+
+def link_telegram_account(token, telegram_id):
+    """
+    Привязывает telegram_id к пользователю по токену
+
+    Returns:
+        int | None: user_id при успешной привязке, None если токен неизвестен
+    """
+    from .models import UserProfile
+
+    key = _link_token_key(token)
+    user_id = cache.get(key)
+    # delete атомарен и возвращает True только одному из параллельных вызовов
+    if user_id is None or not cache.delete(key):
+        return None
+
+    with transaction.atomic():
+        # telegram_id уникален: отвязываем его от предыдущего аккаунта
+        UserProfile.objects.filter(telegram_id=telegram_id).exclude(
+            user_id=user_id
+        ).update(telegram_id=None)
+        profile, _ = UserProfile.objects.get_or_create(user_id=user_id)
+        profile.telegram_id = telegram_id
+        profile.save(update_fields=['telegram_id', 'updated_at'])
+
+    logger.info(f"Telegram chat_id {telegram_id} привязан к пользователю {user_id}")
+    return user_id
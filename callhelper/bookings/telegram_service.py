@@ -3,9 +3,12 @@ Telegram Bot Service для отправки уведомлений
 
 Этот модуль содержит функции для работы с Telegram Bot API
 """
-import requests
 import logging
+from functools import lru_cache
 from django.conf import settings
+from .models import format_duration
+from .telegram_backends import get_backend
+from .timezones import get_zone, default_zone, is_valid_timezone
 
 logger = logging.getLogger(__name__)
 
@@ -32,22 +35,282 @@ def send_telegram_message(chat_id, message, parse_mode='HTML'):
         logger.warning("chat_id не указан, невозможно отправить сообщение")
         return False
     
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    
     payload = {
         'chat_id': chat_id,
         'text': message,
         'parse_mode': parse_mode
     }
-    
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        response.raise_for_status()
-        logger.info(f"Сообщение успешно отправлено в Telegram chat_id: {chat_id}")
-        return True
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Ошибка при отправке сообщения в Telegram: {e}")
+    return get_backend().send(payload)
+
+
+# Поля проекции слота: все, что нужно для любого уведомления, одним запросом
+NOTIFICATION_FIELDS = (
+    'id',
+    'start_time',
+    'end_time',
+    'guest_name',
+    'booked_by__username',
+    'owner__username',
+    'owner__profile__telegram_id',
+    'owner__profile__language',
+    'owner__profile__timezone',
+    'session__title',
+    'session__description',
+)
+
+DEFAULT_LANGUAGE = 'ru'
+
+# Шаблоны собираются один раз при импорте модуля
+_TEMPLATES = {
+    'ru': {
+        'booking_owner': (
+            "📅 <b>Новое бронирование!</b>\n\n"
+            "⏰ <b>Время:</b> {start} - {end}\n"
+            "👤 <b>Забронировано:</b> {booked_by}\n"
+            "⏱️ <b>Длительность:</b> {duration}"
+        ),
+        'booking_guest': (
+            "✅ <b>Бронирование подтверждено!</b>\n\n"
+            "⏰ <b>Ваше время:</b> {start} - {end}\n"
+            "⏱️ <b>Длительность:</b> {duration}\n"
+            "👤 <b>С кем:</b> {owner}"
+        ),
+        'session': "\n📋 <b>Сессия:</b> {session_title}",
+        'description': "\n📝 {session_description}",
+        'cancellation': (
+            "❌ <b>Бронирование отменено</b>\n\n"
+            "⏰ <b>Время:</b> {start} - {end}"
+        ),
+        'reminder': (
+            "⏰ <b>Напоминание!</b> Встреча через 24 часа\n\n"
+            "⏰ <b>Время:</b> {start} - {end}\n"
+            "👤 <b>С кем:</b> {booked_by}"
+        ),
+        'waitlist_offer': (
+            "🔔 <b>Освободился слот!</b>\n\n"
+            "⏰ <b>Время:</b> {start} - {end}\n"
+            "👤 <b>С кем:</b> {owner}\n"
+            "Слот удерживается за вами {hold_minutes} мин: {url}"
+        ),
+    },
+    'en': {
+        'booking_owner': (
+            "📅 <b>New booking!</b>\n\n"
+            "⏰ <b>Time:</b> {start} - {end}\n"
+            "👤 <b>Booked by:</b> {booked_by}\n"
+            "⏱️ <b>Duration:</b> {duration}"
+        ),
+        'booking_guest': (
+            "✅ <b>Booking confirmed!</b>\n\n"
+            "⏰ <b>Your time:</b> {start} - {end}\n"
+            "⏱️ <b>Duration:</b> {duration}\n"
+            "👤 <b>With:</b> {owner}"
+        ),
+        'session': "\n📋 <b>Session:</b> {session_title}",
+        'description': "\n📝 {session_description}",
+        'cancellation': (
+            "❌ <b>Booking cancelled</b>\n\n"
+            "⏰ <b>Time:</b> {start} - {end}"
+        ),
+        'reminder': (
+            "⏰ <b>Reminder!</b> You have a meeting in 24 hours\n\n"
+            "⏰ <b>Time:</b> {start} - {end}\n"
+            "👤 <b>With:</b> {booked_by}"
+        ),
+        'waitlist_offer': (
+            "🔔 <b>A slot is free!</b>\n\n"
+            "⏰ <b>Time:</b> {start} - {end}\n"
+            "👤 <b>With:</b> {owner}\n"
+            "It is held for you for {hold_minutes} min: {url}"
+        ),
+    },
+}
+
+COMPILED_TEMPLATES = {
+    language: {kind: template.format_map for kind, template in templates.items()}
+    for language, templates in _TEMPLATES.items()
+}
+
+
+class SlotNotification:
+    """
+    Slim projection of a TimeSlot with everything a notification needs.
+
+    Built from a values() row, so rendering never touches the ORM.
+    """
+    __slots__ = (
+        'slot_id',
+        'start_time',
+        'end_time',
+        'guest_name',
+        'booked_by',
+        'owner',
+        'telegram_id',
+        'language',
+        'timezone',
+        'session_title',
+        'session_description',
+    )
+
+    def __init__(self, slot_id, start_time, end_time, guest_name=None, booked_by=None,
+                 owner=None, telegram_id=None, language=None, timezone=None,
+                 session_title=None, session_description=None):
+        self.slot_id = slot_id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.guest_name = guest_name
+        self.booked_by = booked_by
+        self.owner = owner
+        self.telegram_id = telegram_id
+        self.language = language or DEFAULT_LANGUAGE
+        self.timezone = timezone
+        self.session_title = session_title
+        self.session_description = session_description
+
+    @classmethod
+    def from_row(cls, row):
+        """Builds a projection from a row of values(*NOTIFICATION_FIELDS)"""
+        return cls(
+            row['id'],
+            row['start_time'],
+            row['end_time'],
+            guest_name=row['guest_name'],
+            booked_by=row['booked_by__username'],
+            owner=row['owner__username'],
+            telegram_id=row['owner__profile__telegram_id'],
+            language=row['owner__profile__language'],
+            timezone=row['owner__profile__timezone'],
+            session_title=row['session__title'],
+            session_description=row['session__description'],
+        )
+
+    @classmethod
+    def from_slot(cls, slot):
+        """Builds a projection from a TimeSlot instance (may hit lazy relations)"""
+        profile = getattr(slot.owner, 'profile', None)
+        return cls(
+            slot.pk,
+            slot.start_time,
+            slot.end_time,
+            guest_name=slot.guest_name,
+            booked_by=slot.booked_by.username if slot.booked_by else None,
+            owner=slot.owner.username,
+            telegram_id=profile.telegram_id if profile else None,
+            language=profile.language if profile else None,
+            timezone=profile.timezone if profile else None,
+            session_title=slot.session.title if slot.session else None,
+            session_description=slot.session.description if slot.session else None,
+        )
+
+
+def load_slot_notifications(queryset, chunk_size=2000):
+    """
+    Yields SlotNotification for every slot of the queryset using one query
+    """
+    rows = queryset.order_by().values(*NOTIFICATION_FIELDS)
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield SlotNotification.from_row(row)
+
+
+def load_slot_notification(slot_id):
+    """Loads a single projection, or None if the slot does not exist"""
+    from .models import TimeSlot
+
+    return next(load_slot_notifications(TimeSlot.objects.filter(pk=slot_id)), None)
+
+
+def _relations_loaded(slot):
+    """
+    True if from_slot() can be built without lazy queries from relations
+    loaded together with the slot (objects attached by the caller may be stale)
+    """
+    if not getattr(slot, '_loaded_from_db', False):
         return False
+    cache = slot._state.fields_cache
+    if 'owner' not in cache or 'profile' not in cache['owner']._state.fields_cache:
+        return False
+    if slot.session_id is not None and 'session' not in cache:
+        return False
+    return slot.booked_by_id is None or 'booked_by' in cache
+
+
+def notification_for_slot(slot):
+    """
+    Projection of a slot instance: built in memory when the caller already
+    loaded owner__profile/session/booked_by, otherwise with one query
+    """
+    if _relations_loaded(slot):
+        return SlotNotification.from_slot(slot)
+    return load_slot_notification(slot.pk)
+
+
+_duration_display = lru_cache(maxsize=256)(format_duration)
+
+
+def _zone_for(notification):
+    if is_valid_timezone(notification.timezone):
+        return get_zone(notification.timezone)
+    return default_zone()
+
+
+def _context(notification, tz):
+    tz = tz or _zone_for(notification)
+    start = notification.start_time.astimezone(tz)
+    end = notification.end_time.astimezone(tz)
+    return {
+        'start': start.strftime('%d.%m.%Y %H:%M'),
+        'end': end.strftime('%H:%M'),
+        'duration': _duration_display(int((end - start).total_seconds())),
+        'booked_by': notification.booked_by or notification.guest_name,
+        'owner': notification.owner,
+        'session_title': notification.session_title,
+        'session_description': notification.session_description,
+    }
+
+
+def _templates(notification):
+    return COMPILED_TEMPLATES.get(notification.language) or COMPILED_TEMPLATES[DEFAULT_LANGUAGE]
+
+
+def render_booking_notification(notification, is_owner=True, tz=None):
+    """
+    Рендерит уведомление о бронировании из проекции SlotNotification
+    """
+    templates = _templates(notification)
+    context = _context(notification, tz)
+    if is_owner:
+        message = templates['booking_owner'](context)
+        if notification.session_title:
+            message += templates['session'](context)
+    else:
+        message = templates['booking_guest'](context)
+        if notification.session_description:
+            message += templates['description'](context)
+    return message
+
+
+def render_cancellation_notification(notification, tz=None):
+    """
+    Рендерит уведомление об отмене бронирования
+    """
+    return _templates(notification)['cancellation'](_context(notification, tz))
+
+
+def render_reminder_notification(notification, tz=None):
+    """
+    Рендерит напоминание о встрече
+    """
+    return _templates(notification)['reminder'](_context(notification, tz))
+
+
+def render_waitlist_offer(notification, hold_minutes, url, tz=None):
+    """
+    Рендерит предложение слота из листа ожидания
+    """
+    context = _context(notification, tz)
+    context['hold_minutes'] = hold_minutes
+    context['url'] = url
+    return _templates(notification)['waitlist_offer'](context)
 
 
 def format_booking_notification(slot, is_owner=True):
@@ -61,43 +324,11 @@ def format_booking_notification(slot, is_owner=True):
     Returns:
         str: Отформатированное сообщение
     """
-    if is_owner:
-        # Уведомление для владельца слота
-        booked_by = slot.booked_by.username if slot.booked_by else slot.guest_name
-        message = f"""
-📅 <b>Новое бронирование!</b>
-
-⏰ <b>Время:</b> {slot.start_time.strftime('%d.%m.%Y %H:%M')} - {slot.end_time.strftime('%H:%M')}
-👤 <b>Забронировано:</b> {booked_by}
-⏱️ <b>Длительность:</b> {slot.get_duration_display()}
-"""
-        if slot.session:
-            message += f"📋 <b>Сессия:</b> {slot.session.title}\n"
-        
-        return message.strip()
-    else:
-        # Уведомление для гостя
-        message = f"""
-✅ <b>Бронирование подтверждено!</b>
-
-⏰ <b>Ваше время:</b> {slot.start_time.strftime('%d.%m.%Y %H:%M')} - {slot.end_time.strftime('%H:%M')}
-⏱️ <b>Длительность:</b> {slot.get_duration_display()}
-👤 <b>С кем:</b> {slot.owner.username}
-"""
-        if slot.session and slot.session.description:
-            message += f"📝 {slot.session.description}\n"
-        
-        return message.strip()
+    return render_booking_notification(SlotNotification.from_slot(slot), is_owner=is_owner)
 
 
 def format_cancellation_notification(slot):
     """
     Форматирует уведомление об отмене бронирования
     """
-    message = f"""
-❌ <b>Бронирование отменено</b>
-
-⏰ <b>Время:</b> {slot.start_time.strftime('%d.%m.%Y %H:%M')} - {slot.end_time.strftime('%H:%M')}
-"""
-    return message.strip()
-
+    return render_cancellation_notification(SlotNotification.from_slot(slot))
@@ -1,3 +1,1849 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import datetime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import transaction
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import telegram_service
+from .admin import EstimatedCountPaginator
+from .analytics import refresh_utilization, utilization_series
+from .factories import PASSWORD, make_session, make_slot, make_slots, make_user
+from .links import _local as local_links, resolve_public_link
+from .live import SlotBroadcaster, channel_for
+from .models import BookingSession, DailyUtilization, NotificationOutbox, SlotBooking, TimeSlot, UserProfile, WaitlistEntry
+from .counters import apply_session_counters, reconcile_session_counters
+from .outbox import _claim as _claim_outbox, dispatch_batch
+from .purge import purge_deleted, soft_delete_session
+from .schedule import build_public_schedule
+from .search import search_sessions, search_slots
+from .slot_index import SlotIntervalIndex, _version_key
+from .seats import SeatUnavailable, claim_seat, release_seat
+from .reminders import process_reminder, reminder_due
+from .tasks import (
+    expire_waitlist_offer,
+    process_telegram_update,
+    promote_waitlist,
+    reconcile_counters,
+    send_slot_reminder,
+)
+from .telegram_backends import LocmemBackend
+from .telegram_bot import create_link_token, link_telegram_account
+from .timezones import get_zone, localize_many
+from .transfer import import_slots as import_slot_rows, iter_json_rows
+from .waitlist import expire_offer, join_waitlist
+
+
+class FakeTelegramServer:
+    """
+    Minimal local stand-in for api.telegram.org that records sendMessage calls
+    """
+
+    def __init__(self):
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                server.requests.append((self.path, json.loads(body)))
+                payload = json.dumps({'ok': True, 'result': {}}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+
+    def settings(self):
+        """Sends through the real HTTP backend to this server"""
+        return override_settings(
+            TELEGRAM_API_URL=self.url,
+            TELEGRAM_BACKEND='bookings.telegram_backends.HttpBackend',
+        )
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+WEBHOOK_SETTINGS = {
+    'TELEGRAM_BOT_TOKEN': 'test-token',
+    'TELEGRAM_BOT_USERNAME': 'callhelper_bot',
+    'TELEGRAM_WEBHOOK_SECRET': 'webhook-secret',
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+}
+
+
+@override_settings(**WEBHOOK_SETTINGS)
+class TelegramWebhookTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+
+    def _start_update(self, update_id, token, chat_id=777):
+        return {
+            'update_id': update_id,
+            'message': {
+                'message_id': 1,
+                'chat': {'id': chat_id, 'type': 'private'},
+                'text': f'/start {token}',
+            },
+        }
+
+    def _post(self, update, secret='webhook-secret'):
+        return self.client.post(
+            reverse('bookings:telegram_webhook'),
+            data=json.dumps(update),
+            content_type='application/json',
+            HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN=secret,
+        )
+
+    def test_rejects_wrong_secret(self):
+        with mock.patch('bookings.views.process_telegram_update.delay') as delay:
+            response = self._post(self._start_update(1, 'x'), secret='wrong')
+        self.assertEqual(response.status_code, 403)
+        delay.assert_not_called()
+
+    def test_duplicate_updates_are_enqueued_once(self):
+        update = self._start_update(42, 'token')
+        with mock.patch('bookings.views.process_telegram_update.delay') as delay:
+            self.assertEqual(self._post(update).status_code, 200)
+            self.assertEqual(self._post(update).status_code, 200)
+        delay.assert_called_once()
+
+    def test_update_is_redelivered_when_broker_is_down(self):
+        update = self._start_update(43, 'token')
+        with mock.patch('bookings.views.process_telegram_update.delay',
+                        side_effect=ConnectionError):
+            self.assertEqual(self._post(update).status_code, 503)
+        with mock.patch('bookings.views.process_telegram_update.delay') as delay:
+            self.assertEqual(self._post(update).status_code, 200)
+            self.assertEqual(self._post(update).status_code, 200)
+        delay.assert_called_once()
+
+    def test_non_start_messages_are_not_enqueued(self):
+        update = {'update_id': 5, 'message': {'chat': {'id': 1}, 'text': 'hello'}}
+        with mock.patch('bookings.views.process_telegram_update.delay') as delay:
+            self.assertEqual(self._post(update).status_code, 200)
+        delay.assert_not_called()
+
+    def test_start_token_links_account(self):
+        token = create_link_token(self.user)
+        with FakeTelegramServer() as telegram, \
+                telegram.settings(), \
+                mock.patch('bookings.views.process_telegram_update.delay',
+                           side_effect=process_telegram_update):
+            self._post(self._start_update(7, token, chat_id=777))
+
+        self.assertEqual(UserProfile.objects.get(user=self.user).telegram_id, 777)
+        self.assertEqual(len(telegram.requests), 1)
+        path, payload = telegram.requests[0]
+        self.assertEqual(path, '/bottest-token/sendMessage')
+        self.assertEqual(payload['chat_id'], 777)
+
+    def test_token_is_single_use_and_moves_chat_between_accounts(self):
+        other = User.objects.create_user('other', password='secret')
+        UserProfile.objects.filter(user=other).update(telegram_id=777)
+        token = create_link_token(self.user)
+
+        with FakeTelegramServer() as telegram, \
+                telegram.settings():
+            process_telegram_update(self._start_update(8, token))
+            process_telegram_update(self._start_update(9, token, chat_id=888))
+
+        self.assertEqual(UserProfile.objects.get(user=self.user).telegram_id, 777)
+        self.assertIsNone(UserProfile.objects.get(user=other).telegram_id)
+        self.assertEqual(len(telegram.requests), 2)
+        self.assertIn('expired', telegram.requests[1][1]['text'])
+
+    def test_token_is_consumed_once_by_concurrent_updates(self):
+        token = create_link_token(self.user)
+        # Второй воркер прочитал токен, но первый успел его удалить
+        with mock.patch('bookings.telegram_bot.cache.delete', side_effect=[True, False]):
+            self.assertEqual(link_telegram_account(token, 777), self.user.pk)
+            self.assertIsNone(link_telegram_account(token, 888))
+        self.assertEqual(UserProfile.objects.get(user=self.user).telegram_id, 777)
+
+    def test_link_view_redirects_to_bot(self):
+        self.client.login(username='owner', password='secret')
+        response = self.client.get(reverse('bookings:telegram_link'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith('https://t.me/callhelper_bot?start='))
+
+
+@override_settings(**WEBHOOK_SETTINGS)
+class NotificationOutboxTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', password='secret')
+        UserProfile.objects.filter(user=self.owner).update(telegram_id=555)
+        self.session = BookingSession.objects.create(owner_session=self.owner, title='Calls')
+        start = timezone.now() + timedelta(days=2)
+        self.slot = TimeSlot.objects.create(
+            owner=self.owner,
+            session=self.session,
+            start_time=start,
+            end_time=start + timedelta(minutes=30),
+        )
+
+    def test_booking_writes_outbox_row(self):
+        with mock.patch('bookings.outbox.kick_dispatcher'):
+            self.slot.guest_name = 'Guest'
+            self.slot.save()
+        row = NotificationOutbox.objects.get()
+        self.assertEqual(row.chat_id, 555)
+        self.assertEqual(row.status, NotificationOutbox.STATUS_PENDING)
+
+    def test_rolled_back_booking_leaves_no_message(self):
+        with mock.patch('bookings.outbox.kick_dispatcher'):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.slot.guest_name = 'Guest'
+                self.slot.save()
+                raise RuntimeError
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_dispatch_marks_sent(self):
+        NotificationOutbox.objects.create(chat_id=1, message='a')
+        NotificationOutbox.objects.create(chat_id=2, message='b')
+        with FakeTelegramServer() as telegram, \
+                telegram.settings():
+            self.assertEqual(dispatch_batch(), 2)
+            self.assertEqual(dispatch_batch(), 0)
+        self.assertEqual(len(telegram.requests), 2)
+        self.assertFalse(NotificationOutbox.objects.exclude(
+            status=NotificationOutbox.STATUS_SENT).exists())
+
+    def test_failed_delivery_is_retried_later(self):
+        row = NotificationOutbox.objects.create(chat_id=1, message='a')
+        with mock.patch('bookings.telegram_service.send_telegram_message', return_value=False):
+            dispatch_batch()
+        row.refresh_from_db()
+        self.assertEqual(row.status, NotificationOutbox.STATUS_PENDING)
+        self.assertEqual(row.attempts, 1)
+        self.assertGreater(row.available_at, timezone.now())
+
+    def test_claim_leases_rows_before_sending(self):
+        row = NotificationOutbox.objects.create(chat_id=1, message='a')
+        self.assertEqual(_claim_outbox(10), [row])
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (NotificationOutbox.STATUS_PENDING, 1))
+        self.assertGreater(row.available_at, timezone.now())
+        # Пока идет отправка, второй диспетчер строку не берет
+        self.assertEqual(dispatch_batch(), 0)
+
+    def test_crashed_dispatch_is_retried_after_lease(self):
+        row = NotificationOutbox.objects.create(chat_id=1, message='a')
+        with mock.patch('bookings.telegram_service.send_telegram_message', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                dispatch_batch()
+        self.assertEqual(dispatch_batch(), 0)
+
+        NotificationOutbox.objects.filter(pk=row.pk).update(available_at=timezone.now())
+        with mock.patch('bookings.telegram_service.send_telegram_message', return_value=True):
+            self.assertEqual(dispatch_batch(), 1)
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (NotificationOutbox.STATUS_SENT, 2))
+
+
+class AdminChangelistQueryTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        self.client.force_login(self.admin)
+        start = timezone.now() + timedelta(days=1)
+        for i in range(3):
+            owner = User.objects.create_user(f'owner{i}', password='secret')
+            session = BookingSession.objects.create(owner_session=owner, title=f'Session {i}')
+            for j in range(5):
+                slot_start = start + timedelta(hours=j)
+                TimeSlot.objects.create(
+                    owner=owner,
+                    session=session,
+                    start_time=slot_start,
+                    end_time=slot_start + timedelta(minutes=30),
+                    booked_by=self.admin if j % 2 else None,
+                )
+
+    def _assert_changelist_queries(self, url, num):
+        # Число запросов не должно зависеть от количества строк на странице
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_timeslot_changelist(self):
+        url = reverse('admin:bookings_timeslot_changelist')
+        self._assert_changelist_queries(url, 4)
+        self._assert_changelist_queries(url + '?owner=owner1&q=Guest', 4)
+
+    def test_bookingsession_changelist(self):
+        url = reverse('admin:bookings_bookingsession_changelist')
+        self._assert_changelist_queries(url, 4)
+        response = self._assert_changelist_queries(url + '?owner=owner2', 4)
+        self.assertEqual(list(response.context['cl'].result_list), [
+            BookingSession.objects.get(owner_session__username='owner2')
+        ])
+
+    def test_userprofile_changelist(self):
+        url = reverse('admin:bookings_userprofile_changelist')
+        self._assert_changelist_queries(url + '?q=owner1', 4)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+
+    def setUp(self):
+        make_slots(make_session(), 3)
+
+    @contextmanager
+    def postgres(self, reltuples):
+        cursor = mock.MagicMock()
+        cursor.fetchone.return_value = (reltuples,)
+        fake = mock.MagicMock(vendor='postgresql')
+        fake.cursor.return_value.__enter__.return_value = cursor
+        with mock.patch('bookings.admin.connections', {'default': fake}):
+            yield cursor
+
+    def count(self, queryset):
+        return EstimatedCountPaginator(queryset, 100).count
+
+    def test_unfiltered_table_uses_estimate(self):
+        with self.postgres(250000) as cursor, self.assertNumQueries(0):
+            # Фильтр deleted_at IS NULL менеджера по умолчанию не считается
+            self.assertEqual(self.count(TimeSlot.objects.order_by('-start_time')), 250000)
+        cursor.execute.assert_called_once()
+        self.assertEqual(cursor.execute.call_args.args[1], ['bookings_timeslot'])
+
+    def test_filtered_or_small_tables_fall_back_to_count(self):
+        with self.postgres(250000) as cursor:
+            self.assertEqual(self.count(TimeSlot.objects.filter(is_booked=False)), 3)
+        cursor.execute.assert_not_called()
+        with self.postgres(10):
+            self.assertEqual(self.count(TimeSlot.objects.all()), 3)
+        # Не PostgreSQL
+        self.assertEqual(self.count(TimeSlot.objects.all()), 3)
+
+
+class TimezoneScheduleTests(TestCase):
+
+    def test_localize_many_matches_astimezone_across_dst(self):
+        tz = get_zone('Europe/Berlin')
+        start = datetime(2030, 3, 30, 20, 0, tzinfo=dt_timezone.utc)
+        values = [start + timedelta(minutes=17 * i) for i in range(200)]
+        expected = [value.astimezone(tz).replace(tzinfo=None) for value in values]
+        self.assertEqual(localize_many(values, tz), expected)
+
+    def test_schedule_groups_by_local_day(self):
+        owner = User.objects.create_user('owner', password='secret')
+        session = BookingSession.objects.create(owner_session=owner, title='Calls')
+        start = datetime(2030, 3, 30, 22, 0, tzinfo=dt_timezone.utc)
+        for i in range(3):
+            TimeSlot.objects.create(
+                owner=owner,
+                session=session,
+                start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i, minutes=30),
+            )
+
+        utc_days = build_public_schedule(session.id, 'UTC')
+        berlin_days = build_public_schedule(session.id, 'Europe/Berlin')
+
+        self.assertEqual([len(day['slots']) for day in utc_days], [2, 1])
+        self.assertEqual([len(day['slots']) for day in berlin_days], [1, 2])
+        self.assertEqual(
+            [slot['start'] for slot in berlin_days[1]['slots']],
+            ['00:00', '01:00'],
+        )
+
+
+@override_settings(**WEBHOOK_SETTINGS)
+class WaitlistTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', password='secret')
+        self.first = User.objects.create_user('first', password='secret')
+        self.second = User.objects.create_user('second', password='secret')
+        UserProfile.objects.filter(user=self.first).update(telegram_id=101)
+        self.session = BookingSession.objects.create(owner_session=self.owner, title='Calls')
+        start = timezone.now() + timedelta(days=1)
+        self.slot = TimeSlot.objects.create(
+            owner=self.owner,
+            session=self.session,
+            start_time=start,
+            end_time=start + timedelta(minutes=30),
+            guest_name='Guest',
+        )
+        join_waitlist(self.session, self.first)
+        join_waitlist(self.session, self.second)
+
+    def _cancel(self):
+        self.client.force_login(self.owner)
+        with mock.patch('bookings.outbox.kick_dispatcher'), \
+                mock.patch('bookings.waitlist._schedule_expiry'), \
+                mock.patch('bookings.tasks.promote_waitlist.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('bookings:cancel_booking', args=[self.slot.id]))
+        # Выполняем задачу синхронно, как это сделал бы воркер
+        with mock.patch('bookings.outbox.kick_dispatcher'), \
+                mock.patch('bookings.waitlist._schedule_expiry'):
+            promote_waitlist(*delay.call_args.args)
+
+    def test_cancel_offers_slot_to_first_in_queue(self):
+        self._cancel()
+        entry = WaitlistEntry.objects.get(user=self.first)
+        self.assertEqual(entry.status, WaitlistEntry.STATUS_OFFERED)
+        self.assertEqual(entry.offered_slot, self.slot)
+        self.assertTrue(NotificationOutbox.objects.filter(chat_id=101).exists())
+        self.assertEqual(
+            WaitlistEntry.objects.get(user=self.second).status,
+            WaitlistEntry.STATUS_WAITING,
+        )
+
+    def test_held_slot_can_only_be_booked_by_offered_user(self):
+        self._cancel()
+        url = reverse('bookings:book_slot', args=[self.session.public_link, self.slot.id])
+
+        self.client.force_login(self.second)
+        self.client.post(url)
+        self.slot.refresh_from_db()
+        self.assertFalse(self.slot.is_booked)
+
+        self.client.force_login(self.first)
+        self.client.post(url)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked_by, self.first)
+        self.assertEqual(
+            WaitlistEntry.objects.get(user=self.first).status,
+            WaitlistEntry.STATUS_BOOKED,
+        )
+
+    def test_expired_hold_moves_to_next_guest(self):
+        self._cancel()
+        entry = WaitlistEntry.objects.get(user=self.first)
+        WaitlistEntry.objects.filter(pk=entry.pk).update(
+            hold_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        with mock.patch('bookings.outbox.kick_dispatcher'), \
+                mock.patch('bookings.waitlist._schedule_expiry'):
+            self.assertTrue(expire_offer(entry.pk))
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, WaitlistEntry.STATUS_EXPIRED)
+        self.assertEqual(
+            WaitlistEntry.objects.get(user=self.second).status,
+            WaitlistEntry.STATUS_OFFERED,
+        )
+
+
+
+class LiveAvailabilityTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='secret')
+        self.session = BookingSession.objects.create(owner_session=self.owner, title='Calls')
+        start = timezone.now() + timedelta(days=2)
+        self.slot = TimeSlot.objects.create(
+            owner=self.owner,
+            session=self.session,
+            start_time=start,
+            end_time=start + timedelta(minutes=30),
+        )
+
+    def test_booking_publishes_unavailable_after_commit(self):
+        publisher = mock.Mock()
+        with mock.patch('bookings.live._get_publisher', return_value=publisher), \
+                mock.patch('bookings.outbox.kick_dispatcher'), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.slot.guest_name = 'Guest'
+            self.slot.save()
+
+        publisher.publish.assert_called_once_with(
+            channel_for(self.session.id),
+            json.dumps({'type': 'unavailable', 'slot_id': self.slot.id}),
+        )
+
+    def test_broadcaster_fans_out_to_session_clients(self):
+        async def scenario():
+            broadcaster = SlotBroadcaster()
+            with mock.patch.object(broadcaster, '_ensure_listener'):
+                first = broadcaster.subscribe(self.session.id)
+                second = broadcaster.subscribe(self.session.id)
+                other = broadcaster.subscribe(self.session.id + 1)
+            broadcaster.dispatch(channel_for(self.session.id), 'event')
+            broadcaster.unsubscribe(self.session.id, second)
+            broadcaster.dispatch(channel_for(self.session.id), 'next')
+            return first.qsize(), second.qsize(), other.qsize()
+
+        self.assertEqual(asyncio.run(scenario()), (2, 1, 0))
+
+    def test_slow_client_gets_single_resync(self):
+        async def scenario():
+            broadcaster = SlotBroadcaster()
+            with mock.patch.object(broadcaster, '_ensure_listener'), \
+                    mock.patch('bookings.live.CLIENT_QUEUE_SIZE', 3):
+                queue = broadcaster.subscribe(self.session.id)
+            for i in range(5):
+                broadcaster.dispatch(channel_for(self.session.id), f'event {i}')
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+        self.assertEqual(asyncio.run(scenario()), [
+            json.dumps({'type': 'resync'}), 'event 4',
+        ])
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+class CeleryRoutingTests(TestCase):
+
+    def route(self, task):
+        from callhelper.celery import app
+        return app.amqp.router.route({}, task.name)['queue'].name
+
+    def test_tasks_are_routed_to_dedicated_queues(self):
+        self.assertEqual(self.route(process_telegram_update), 'notifications')
+        self.assertEqual(self.route(send_slot_reminder), 'reminders')
+        self.assertEqual(self.route(reconcile_counters), 'maintenance')
+        self.assertEqual(self.route(promote_waitlist), 'notifications')
+        self.assertEqual(self.route(expire_waitlist_offer), 'notifications')
+
+    def test_beat_schedule_tasks_run_eagerly(self):
+        from callhelper.celery import app
+        for entry in app.conf.beat_schedule.values():
+            task = app.tasks[entry['task']]
+            with mock.patch('bookings.outbox.kick_dispatcher'):
+                result = task.apply()
+            self.assertTrue(result.successful(), entry['task'])
+
+    def test_migration_removes_stale_reminder_scan_entry(self):
+        from importlib import import_module
+        from django.apps import apps
+        from django_celery_beat.models import CrontabSchedule, PeriodicTask
+
+        migration = import_module('bookings.migrations.0014_remove_reminder_scan_beat_entry')
+        PeriodicTask.objects.create(
+            name='send-reminder-notifications',
+            task=migration.REMOVED_TASK,
+            crontab=CrontabSchedule.objects.create(minute='0'),
+        )
+        migration.remove_reminder_scan(apps, None)
+        self.assertFalse(PeriodicTask.objects.filter(task=migration.REMOVED_TASK).exists())
+
+
+class SlotImportExportTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', password='secret')
+        self.session = BookingSession.objects.create(owner_session=self.owner, title='Calls')
+        TimeSlot.objects.create(
+            owner=self.owner,
+            session=self.session,
+            start_time=datetime(2030, 1, 1, 10, 0, tzinfo=dt_timezone.utc),
+            end_time=datetime(2030, 1, 1, 11, 0, tzinfo=dt_timezone.utc),
+        )
+        self.client.force_login(self.owner)
+
+    def test_csv_import_skips_overlaps_and_updates_counters(self):
+        content = (
+            "start_time,end_time,guest_name\n"
+            "2030-01-01T10:30:00,2030-01-01T11:30:00,\n"   # пересекается с существующим
+            "2030-01-02T09:00:00,2030-01-02T10:00:00,Anna\n"
+            "2030-01-02T09:30:00,2030-01-02T10:30:00,\n"   # пересекается с файлом
+            "2030-01-03T09:00:00,2030-01-03T10:00:00,\n"
+            "not a date,2030-01-03T10:00:00,\n"
+        )
+        upload = SimpleUploadedFile('slots.csv', content.encode(), content_type='text/csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('bookings:import_slots'), {
+                'session_id': self.session.id,
+                'file': upload,
+            })
+
+        self.assertEqual(
+            [number for number, reason in response.context['result'].errors],
+            [1, 3, 5],
+        )
+        self.assertEqual(TimeSlot.objects.filter(owner=self.owner).count(), 3)
+        self.assertTrue(TimeSlot.objects.get(guest_name='Anna').is_booked)
+        self.session.refresh_from_db()
+        self.assertEqual(
+            (self.session.slots_count, self.session.free_future_count, self.session.booked_count),
+            (3, 2, 1),
+        )
+
+    def test_malformed_files_show_a_form_error(self):
+        uploads = [
+            # Поле длиннее csv.field_size_limit() - csv.Error
+            ('slots.csv', b'start_time,end_time\n"' + b'x' * 200000 + b'",x\n'),
+            ('slots.csv', b'start_time,end_time\n\xff\xfe,x\n'),
+            ('slots.json', b'[{"start_time": "2030-01-01T10:00:00", '),
+        ]
+        for name, content in uploads:
+            with self.subTest(name=name, content=content[:30]):
+                response = self.client.post(reverse('bookings:import_slots'), {
+                    'session_id': self.session.id,
+                    'file': SimpleUploadedFile(name, content),
+                })
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Could not read the file')
+        self.assertEqual(TimeSlot.objects.count(), 1)
+
+    def test_json_reader_is_incremental(self):
+        payload = json.dumps([
+            {'start_time': '2030-01-01T10:00:00', 'end_time': '2030-01-01T11:00:00'},
+            {'start_time': '2030-01-02T10:00:00', 'end_time': '2030-01-02T11:00:00'},
+        ]).encode()
+        lines = b'{"start_time": "a"}\n{"start_time": "b"}\n'
+        with mock.patch('bookings.transfer.READ_CHUNK_SIZE', 7):
+            self.assertEqual(len(list(iter_json_rows(io.BytesIO(payload)))), 2)
+            self.assertEqual(
+                [row['start_time'] for row in iter_json_rows(io.BytesIO(lines))],
+                ['a', 'b'],
+            )
+
+    def test_export_streams_bookings(self):
+        slot = TimeSlot.objects.get()
+        slot.guest_name = 'Anna'
+        with mock.patch('bookings.outbox.kick_dispatcher'):
+            slot.save()
+
+        response = self.client.get(reverse('bookings:export_slots') + '?booked=1')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'session', 'start_time'])
+        self.assertIn('Anna', lines[1])
+        self.assertEqual(len(lines), 2)
+
+
+class StartupTimeTests(TestCase):
+    """
+    Cold start of web and Celery processes; budgets are generous on purpose,
+    they catch heavy eager imports rather than measure exact timings
+    """
+    BUDGET_SECONDS = 5
+    PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+    def run_python(self, *args):
+        env = os.environ.copy()
+        env['DJANGO_SETTINGS_MODULE'] = settings.SETTINGS_MODULE
+        env['PYTHONPATH'] = os.pathsep.join(sys.path)
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, *args],
+            cwd=self.PROJECT_DIR, env=env, capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return time.perf_counter() - started, result.stdout
+
+    def test_manage_py_check_is_fast(self):
+        elapsed, _ = self.run_python('manage.py', 'check')
+        self.assertLess(elapsed, self.BUDGET_SECONDS)
+
+    def test_worker_boot_does_not_import_http_client(self):
+        elapsed, stdout = self.run_python('-c', (
+            'import sys; '
+            'from callhelper.celery import app; '
+            'app.loader.import_default_modules(); '
+            'from django.urls import get_resolver; get_resolver().url_patterns; '
+            'print(sorted({"requests", "bookings.telegram_service"} & set(sys.modules)))'
+        ))
+        self.assertLess(elapsed, self.BUDGET_SECONDS)
+        self.assertEqual(stdout.strip(), '[]')
+
+
+class GroupSlotTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='secret')
+        self.guest = User.objects.create_user('guest', password='secret')
+        self.session = BookingSession.objects.create(owner_session=self.owner, title='Webinar')
+        start = timezone.now() + timedelta(days=2)
+        self.slot = TimeSlot.objects.create(
+            owner=self.owner,
+            session=self.session,
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            capacity=3,
+        )
+
+    def counters(self):
+        self.session.refresh_from_db()
+        return (self.session.slots_count, self.session.free_future_count, self.session.booked_count)
+
+    def test_seats_are_claimed_until_capacity(self):
+        response = self.client.post(
+            reverse('bookings:book_slot', args=[self.session.public_link, self.slot.id]),
+            {'guest_name': 'Anna'},
+        )
+        self.assertEqual(response.status_code, 302)
+        claim_seat(self.slot, self.guest)
+        self.assertEqual(self.counters(), (1, 1, 0))
+
+        with mock.patch('bookings.outbox.kick_dispatcher'):
+            claim_seat(self.slot, guest_name='Boris')
+        self.slot.refresh_from_db()
+        self.assertTrue(self.slot.is_booked)
+        self.assertEqual(self.slot.booked_count, 3)
+        self.assertEqual(self.counters(), (1, 0, 1))
+        self.assertEqual(build_public_schedule(self.session.id, 'UTC'), [])
+
+        with self.assertRaises(SeatUnavailable):
+            claim_seat(self.slot, guest_name='Late')
+
+    def test_same_user_cannot_take_two_seats(self):
+        claim_seat(self.slot, self.guest)
+        with self.assertRaises(SeatUnavailable):
+            claim_seat(self.slot, self.guest)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked_count, 1)
+        self.assertEqual(SlotBooking.objects.count(), 1)
+
+    def test_release_frees_full_slot(self):
+        bookings = [claim_seat(self.slot, guest_name=name) for name in ('A', 'B', 'C')]
+        self.assertTrue(release_seat(bookings[0]))
+        self.assertFalse(release_seat(bookings[0]))
+
+        self.slot.refresh_from_db()
+        self.assertFalse(self.slot.is_booked)
+        self.assertEqual(self.slot.booked_count, 2)
+        self.assertEqual(self.counters(), (1, 1, 0))
+        day = build_public_schedule(self.session.id, 'UTC')[0]
+        self.assertEqual(day['slots'][0]['seats_left'], 1)
+
+    def test_release_from_full_slot_promotes_waitlist(self):
+        bookings = [claim_seat(self.slot, guest_name=name) for name in ('A', 'B', 'C')]
+        with mock.patch('bookings.tasks.promote_waitlist.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            release_seat(bookings[0])
+        delay.assert_called_once_with(self.slot.pk)
+
+        # Слот уже не был заполнен: очередь не трогаем
+        with mock.patch('bookings.tasks.promote_waitlist.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            release_seat(bookings[1])
+        delay.assert_not_called()
+
+    def test_waitlist_hold_reserves_one_seat(self):
+        held = make_user()
+        entry = WaitlistEntry.objects.create(
+            session=self.session,
+            user=held,
+            status=WaitlistEntry.STATUS_OFFERED,
+            offered_slot=self.slot,
+            hold_expires_at=timezone.now() + timedelta(minutes=15),
+        )
+        day = build_public_schedule(self.session.id, 'UTC')[0]
+        self.assertEqual(day['slots'][0]['seats_left'], 2)
+
+        url = reverse('bookings:book_slot', args=[self.session.public_link, self.slot.id])
+        with mock.patch('bookings.outbox.kick_dispatcher'):
+            self.client.post(url, {'guest_name': 'Anna'})
+            self.client.post(url, {'guest_name': 'Boris'})
+            # Осталось одно место, и оно держится за гостем из очереди
+            self.assertEqual(build_public_schedule(self.session.id, 'UTC'), [])
+            self.client.post(url, {'guest_name': 'Clara'})
+            self.slot.refresh_from_db()
+            self.assertEqual(self.slot.booked_count, 2)
+
+            self.client.force_login(held)
+            self.client.post(url)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked_count, 3)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, WaitlistEntry.STATUS_BOOKED)
+
+    def test_cancel_seat_from_cached_page_after_new_login(self):
+        cache.clear()
+        booking = claim_seat(self.slot, guest_name='Anna')
+        client = Client(enforce_csrf_checks=True)
+        client.login(username='owner', password='secret')
+        client.get(reverse('bookings:my_slots'))  # строки попадают в кэш
+
+        # Вход заново меняет CSRF-токен, строки отдаются из кэша
+        client.logout()
+        client.login(username='owner', password='secret')
+        page = client.get(reverse('bookings:my_slots')).content.decode()
+        token = re.search(
+            r'id="cancel-seat-form"[^>]*><input type="hidden" name="csrfmiddlewaretoken" value="([^"]+)"',
+            page,
+        ).group(1)
+        url = reverse('bookings:cancel_seat', args=[self.slot.pk, booking.pk])
+        self.assertIn(f'formaction="{url}"', page)
+
+        response = client.post(url, {'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(SlotBooking.objects.filter(pk=booking.pk).exists())
+
+
+class PublicLinkTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        local_links.clear()
+        self.owner = User.objects.create_user('owner', password='secret')
+        self.session = BookingSession.objects.create(owner_session=self.owner, title='Calls')
+
+    def test_links_are_base62(self):
+        self.assertEqual(len(self.session.public_link), 10)
+        self.assertTrue(self.session.public_link.isalnum())
+
+    def test_generation_retries_on_collision(self):
+        with mock.patch('bookings.models.generate_public_link',
+                        side_effect=[self.session.public_link, 'Fresh12345']):
+            other = BookingSession.objects.create(owner_session=self.owner, title='Other')
+        self.assertEqual(other.public_link, 'Fresh12345')
+
+    def test_missing_links_are_cached(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(resolve_public_link('NoSuchLink'))
+        local_links.clear()
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolve_public_link('NoSuchLink'))
+            self.assertIsNone(resolve_public_link('../../etc/passwd'))
+
+    def test_resolved_link_survives_until_session_is_deleted(self):
+        link = self.session.public_link
+        self.assertEqual(resolve_public_link(link), self.session.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_public_link(link), self.session.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.session.delete()
+        self.assertIsNone(resolve_public_link(link))
+
+
+class BookingPathQueryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        local_links.clear()
+        self.owner = User.objects.create_user('owner', password='secret')
+        UserProfile.objects.filter(user=self.owner).update(telegram_id=555)
+        self.session = BookingSession.objects.create(owner_session=self.owner, title='Calls')
+        start = timezone.now() + timedelta(days=2)
+        self.slot = TimeSlot.objects.create(
+            owner=self.owner,
+            session=self.session,
+            start_time=start,
+            end_time=start + timedelta(minutes=30),
+        )
+        self.url = reverse('bookings:book_slot', args=[self.session.public_link, self.slot.id])
+        resolve_public_link(self.session.public_link)
+
+    def test_guest_booking_query_count(self):
+        # slot + owner/profile/session/hold одним SELECT, затем в savepoint
+        # (SAVEPOINT ... RELEASE): UPDATE слота, UPDATE счетчиков, INSERT в outbox
+        with mock.patch('bookings.outbox.kick_dispatcher'), self.assertNumQueries(6):
+            response = self.client.post(self.url, {'guest_name': 'Anna'})
+
+        self.assertEqual(response.status_code, 302)
+        row = NotificationOutbox.objects.get()
+        self.assertEqual(row.chat_id, 555)
+        self.assertIn('Anna', row.message)
+
+    def test_manually_built_slot_still_tracks_previous_state(self):
+        slot = TimeSlot(
+            pk=self.slot.pk,
+            owner=self.owner,
+            session=self.session,
+            start_time=self.slot.start_time,
+            end_time=self.slot.end_time,
+            created_at=self.slot.created_at,
+            guest_name='Boris',
+        )
+        slot._state.adding = False
+        with mock.patch('bookings.outbox.kick_dispatcher'):
+            slot.save()
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.booked_count, 1)
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+    def test_deferred_slot_falls_back_to_select(self):
+        TimeSlot.objects.filter(pk=self.slot.pk).update(guest_name='Anna', is_booked=True)
+        BookingSession.objects.filter(pk=self.session.pk).update(booked_count=1, free_future_count=0)
+        slot = TimeSlot.objects.only('id', 'owner', 'start_time', 'end_time').get(pk=self.slot.pk)
+        slot.guest_name = None
+        with mock.patch('bookings.outbox.kick_dispatcher'):
+            slot.save()
+        slot = TimeSlot.objects.get(pk=self.slot.pk)
+        self.assertFalse(slot.is_booked)
+        self.assertEqual(slot.cancellations, 1)
+
+    def test_refresh_updates_loaded_snapshot(self):
+        slot = TimeSlot.objects.get(pk=self.slot.pk)
+        # Кто-то другой забронировал слот в обход save()
+        TimeSlot.objects.filter(pk=self.slot.pk).update(guest_name='Anna', is_booked=True)
+        BookingSession.objects.filter(pk=self.session.pk).update(booked_count=1, free_future_count=0)
+        slot.refresh_from_db()
+
+        slot.guest_name = None
+        with mock.patch('bookings.outbox.kick_dispatcher'):
+            slot.save()
+        self.assertEqual(TimeSlot.objects.get(pk=self.slot.pk).cancellations, 1)
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.free_future_count, self.session.booked_count), (1, 0))
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+
+class UtilizationRollupTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='secret')
+        UserProfile.objects.filter(user=self.owner).update(timezone='Europe/Berlin')
+        self.session = BookingSession.objects.create(owner_session=self.owner, title='Calls')
+        self.tz = get_zone('Europe/Berlin')
+        self.today = timezone.localdate(timezone=self.tz)
+        base = datetime.combine(self.today, datetime.min.time(), tzinfo=self.tz)
+        self.day_start = base.replace(hour=10)
+
+    def _slot(self, start, minutes=60, **kwargs):
+        return TimeSlot.objects.create(
+            owner=self.owner,
+            session=self.session,
+            start_time=start,
+            end_time=start + timedelta(minutes=minutes),
+            **kwargs,
+        )
+
+    def _day(self, series, day):
+        return next(item for item in series if item['date'] == day.isoformat())
+
+    def test_refresh_computes_hours_and_lead_time(self):
+        booked = self._slot(self.day_start)
+        self._slot(self.day_start + timedelta(hours=2))
+        TimeSlot.objects.filter(pk=booked.pk).update(
+            is_booked=True, guest_name='Anna', booked_at=self.day_start - timedelta(hours=4),
+        )
+        refresh_utilization(full=True)
+
+        day = self._day(utilization_series(self.owner, today=self.today), self.today)
+        self.assertEqual(day['offered_hours'], 2)
+        self.assertEqual(day['booked_hours'], 1)
+        self.assertEqual(day['utilization'], 0.5)
+        self.assertEqual(day['avg_lead_hours'], 4)
+
+    def test_cancellation_is_counted(self):
+        slot = self._slot(self.day_start)
+        slot.guest_name = 'Anna'
+        slot.save()
+        slot.is_booked = False
+        slot.guest_name = None
+        slot.save()
+        refresh_utilization()
+
+        day = self._day(utilization_series(self.owner, today=self.today), self.today)
+        self.assertEqual(day['cancellations'], 1)
+        self.assertEqual(day['cancellation_rate'], 1)
+
+    def test_moved_and_deleted_slots_clear_old_days(self):
+        slot = self._slot(self.day_start - timedelta(days=1))
+        other = self._slot(self.day_start - timedelta(days=2))
+        refresh_utilization()
+        self.assertEqual(DailyUtilization.objects.count(), 2)
+
+        slot.start_time = self.day_start
+        slot.end_time = self.day_start + timedelta(hours=1)
+        slot.save()
+        other.delete()
+        refresh_utilization()
+
+        self.assertEqual(
+            list(DailyUtilization.objects.values_list('day', flat=True)), [self.today]
+        )
+
+    def test_incremental_refresh_skips_untouched_days(self):
+        self._slot(self.day_start - timedelta(days=1))
+        self.assertEqual(refresh_utilization(), 1)
+        self.assertEqual(refresh_utilization(), 1)  # строки внутри OVERLAP
+        with mock.patch('bookings.analytics.OVERLAP', timedelta(0)):
+            self.assertEqual(refresh_utilization(), 0)
+
+    def test_api_returns_series(self):
+        self._slot(self.day_start)
+        refresh_utilization()
+        self.client.login(username='owner', password='secret')
+
+        response = self.client.get(reverse('bookings:utilization_api'), {'days': 7})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['days']), 7)
+        self.assertEqual(data['days'][-1]['date'], self.today.isoformat())
+        self.assertEqual(data['summary']['offered_hours'], 1)
+
+        response = self.client.get(reverse('bookings:dashboard'))
+        self.assertContains(response, 'Utilization, last 14 days')
+
+
+class SoftDeleteTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        local_links.clear()
+        self.owner = User.objects.create_user('owner', password='secret')
+        self.guest = User.objects.create_user('guest')
+        self.session = BookingSession.objects.create(owner_session=self.owner, title='Calls')
+        start = timezone.now() + timedelta(days=1)
+        self.slots = [
+            TimeSlot.objects.create(
+                owner=self.owner,
+                session=self.session,
+                start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i, minutes=30),
+                capacity=3 if i == 0 else 1,
+            )
+            for i in range(5)
+        ]
+        claim_seat(self.slots[0], user=self.guest)
+        join_waitlist(self.session, self.guest)
+
+    def _delete_session(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            soft_delete_session(self.session)
+
+    def test_delete_hides_session_and_slots_in_constant_queries(self):
+        resolve_public_link(self.session.public_link)
+        # SAVEPOINT, UPDATE слотов, мест, листа ожидания и сессии, RELEASE
+        with self.assertNumQueries(6):
+            soft_delete_session(self.session)
+
+        self.assertFalse(BookingSession.objects.filter(pk=self.session.pk).exists())
+        self.assertFalse(TimeSlot.objects.filter(session=self.session).exists())
+        self.assertEqual(TimeSlot.all_objects.filter(session=self.session).count(), 5)
+        self.assertFalse(WaitlistEntry.objects.filter(status=WaitlistEntry.STATUS_WAITING).exists())
+
+    def test_delete_clears_reminders_and_closes_live_pages(self):
+        with mock.patch('bookings.outbox.kick_dispatcher'), \
+                mock.patch('bookings.reminders._apply'):
+            self.slots[1].guest_name = 'Anna'
+            self.slots[1].save()
+        self.assertTrue(TimeSlot.objects.get(pk=self.slots[1].pk).reminder_task_id)
+
+        publisher = mock.Mock()
+        with mock.patch('bookings.live._get_publisher', return_value=publisher):
+            self._delete_session()
+        self.assertFalse(TimeSlot.all_objects.exclude(reminder_task_id='').exists())
+        publisher.publish.assert_called_once_with(
+            channel_for(self.session.pk),
+            json.dumps({'type': 'closed', 'slot_id': None}),
+        )
+
+    def test_deleted_session_is_gone_for_owner_and_guests(self):
+        link = self.session.public_link
+        self.client.login(username='owner', password='secret')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('bookings:delete_session', args=[self.session.pk]))
+        self.assertRedirects(response, reverse('bookings:sessions_list'))
+
+        response = self.client.get(reverse('bookings:public_booking', args=[link]))
+        self.assertContains(response, 'Session not found')
+        # Освободившееся время снова можно занять
+        TimeSlot.objects.create(
+            owner=self.owner,
+            start_time=self.slots[1].start_time,
+            end_time=self.slots[1].end_time,
+        )
+
+    def test_purge_removes_rows_after_retention(self):
+        self._delete_session()
+        self.assertEqual(purge_deleted(), {'slots': 0, 'sessions': 0})
+
+        purged = purge_deleted(retention=timedelta(0), batch_size=2)
+        self.assertEqual(purged, {'slots': 5, 'sessions': 1})
+        self.assertFalse(BookingSession.all_objects.exists())
+        self.assertFalse(SlotBooking.all_objects.exists())
+        self.assertFalse(WaitlistEntry.all_objects.exists())
+
+
+class ReminderSchedulingTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner')
+        UserProfile.objects.filter(user=self.owner).update(telegram_id=555)
+        self.session = BookingSession.objects.create(owner_session=self.owner, title='Calls')
+        self.start = timezone.now() + timedelta(days=2)
+        self.slot = TimeSlot.objects.create(
+            owner=self.owner,
+            session=self.session,
+            start_time=self.start,
+            end_time=self.start + timedelta(minutes=30),
+        )
+
+    def _save(self, **changes):
+        for name, value in changes.items():
+            setattr(self.slot, name, value)
+        with mock.patch('bookings.tasks.send_slot_reminder.apply_async') as apply_async, \
+                mock.patch('bookings.reminders._revoke') as revoke, \
+                mock.patch('bookings.outbox.kick_dispatcher'), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.slot.save()
+        return apply_async, revoke
+
+    def test_booking_schedules_reminder_with_eta(self):
+        with mock.patch('bookings.reminders.MAX_COUNTDOWN', timedelta(days=7)):
+            apply_async, revoke = self._save(guest_name='Anna')
+
+        task_id = self.slot.reminder_task_id
+        self.assertTrue(task_id)
+        apply_async.assert_called_once_with(
+            args=[self.slot.pk], task_id=task_id, eta=reminder_due(self.start),
+        )
+        revoke.assert_not_called()
+
+    def test_move_reschedules_and_cancel_revokes(self):
+        self._save(guest_name='Anna')
+        first_id = self.slot.reminder_task_id
+
+        new_start = self.start + timedelta(hours=3)
+        apply_async, revoke = self._save(start_time=new_start, end_time=new_start + timedelta(minutes=30))
+        second_id = self.slot.reminder_task_id
+        self.assertNotEqual(first_id, second_id)
+        revoke.assert_called_once_with(first_id)
+        self.assertEqual(apply_async.call_args.kwargs['task_id'], second_id)
+
+        apply_async, revoke = self._save(guest_name=None)
+        apply_async.assert_not_called()
+        revoke.assert_called_once_with(second_id)
+        self.assertEqual(TimeSlot.objects.get(pk=self.slot.pk).reminder_task_id, '')
+
+    def test_reminder_waits_then_goes_out_once(self):
+        self._save(guest_name='Anna')
+        task_id = self.slot.reminder_task_id
+
+        check_again_at = process_reminder(self.slot.pk, task_id)
+        self.assertLessEqual(check_again_at, reminder_due(self.start))
+        self.assertEqual(NotificationOutbox.objects.count(), 1)  # только о бронировании
+
+        due = reminder_due(self.start) + timedelta(seconds=1)
+        with mock.patch('bookings.outbox.kick_dispatcher'):
+            self.assertIsNone(process_reminder(self.slot.pk, task_id, now=due))
+            self.assertIsNone(process_reminder(self.slot.pk, task_id, now=due))
+            # Задача с устаревшим id ничего не отправляет
+            self.assertIsNone(process_reminder(self.slot.pk, 'stale', now=due))
+
+        self.assertEqual(NotificationOutbox.objects.filter(chat_id=555).count(), 2)
+        self.assertIsNotNone(TimeSlot.objects.get(pk=self.slot.pk).reminder_sent_at)
+
+    def test_late_booking_gets_no_reminder(self):
+        start = timezone.now() + timedelta(hours=2)
+        apply_async, _ = self._save(
+            start_time=start, end_time=start + timedelta(minutes=30), guest_name='Anna',
+        )
+        apply_async.assert_not_called()
+        self.assertEqual(self.slot.reminder_task_id, '')
+
+    def test_imported_bookings_get_reminders(self):
+        start = self.start + timedelta(days=1)
+        rows = [
+            {'start_time': start.isoformat(), 'end_time': (start + timedelta(minutes=30)).isoformat(),
+             'guest_name': 'Anna'},
+            {'start_time': (start + timedelta(hours=1)).isoformat(),
+             'end_time': (start + timedelta(hours=2)).isoformat()},
+        ]
+        with mock.patch('bookings.tasks.send_slot_reminder.apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            import_slot_rows(self.owner, self.session, rows, get_zone('UTC'))
+
+        booked = TimeSlot.objects.get(start_time=start)
+        self.assertTrue(booked.reminder_task_id)
+        apply_async.assert_called_once_with(
+            args=[booked.pk], task_id=booked.reminder_task_id, eta=mock.ANY,
+        )
+        self.assertLessEqual(apply_async.call_args.kwargs['eta'], reminder_due(start))
+
+    def test_backfill_schedules_existing_bookings_once(self):
+        # Бронирование, сделанное до планирования напоминаний при записи
+        TimeSlot.objects.filter(pk=self.slot.pk).update(is_booked=True, guest_name='Anna')
+        soon = make_slot(owner=self.owner, start=timezone.now() + timedelta(hours=3))
+        TimeSlot.objects.filter(pk=soon.pk).update(is_booked=True, guest_name='Boris')
+
+        with mock.patch('bookings.tasks.send_slot_reminder.apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            call_command('schedule_reminders', stdout=io.StringIO())
+            call_command('schedule_reminders', stdout=io.StringIO())
+
+        task_id = TimeSlot.objects.get(pk=self.slot.pk).reminder_task_id
+        self.assertTrue(task_id)
+        apply_async.assert_called_once_with(args=[self.slot.pk], task_id=task_id, eta=mock.ANY)
+        self.assertEqual(TimeSlot.objects.get(pk=soon.pk).reminder_task_id, '')
+
+
+class QueryBudgetMixin:
+    """
+    assertMaxQueries: like assertNumQueries, but a ceiling, so that making a
+    view cheaper doesn't fail the test and making it dearer does
+    """
+
+    @contextmanager
+    def assertMaxQueries(self, ceiling):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context)
+        self.assertLessEqual(
+            executed, ceiling,
+            f"{executed} queries executed, at most {ceiling} expected\n" + '\n'.join(
+                f"{i}. {query['sql']}" for i, query in enumerate(context.captured_queries, 1)
+            ),
+        )
+
+
+@mock.patch('bookings.outbox.kick_dispatcher')
+class ViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Every view with a query ceiling; counts include the session and user
+    lookups of the auth middleware. Lists are filled with several rows so
+    that N+1 patterns show up as a broken ceiling.
+    """
+
+    def setUp(self):
+        cache.clear()
+        local_links.clear()
+        LocmemBackend.outbox.clear()
+        self.owner = make_user('owner', telegram_id=555, tz='Europe/Berlin')
+        self.guest = make_user('guest', telegram_id=777)
+        self.session = make_session(self.owner, title='Consultations')
+        self.slots = make_slots(self.session, 5)
+        for slot in self.slots[:2]:
+            slot.guest_name = 'Anna'
+            slot.save()
+        self.group = make_slot(session=self.session, capacity=3)
+        claim_seat(self.group, user=self.guest)
+        self.link = self.session.public_link
+
+    def login(self, user=None):
+        self.client.force_login(user or self.owner)
+
+    # ---------- владелец ----------
+
+    def test_dashboard(self, kick):
+        self.login()
+        with self.assertMaxQueries(9):
+            response = self.client.get(reverse('bookings:dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_utilization_api(self, kick):
+        self.login()
+        with self.assertMaxQueries(4):
+            response = self.client.get(reverse('bookings:utilization_api'), {'days': 30})
+        self.assertEqual(len(response.json()['days']), 30)
+
+    def test_my_slots(self, kick):
+        self.login()
+        with self.assertMaxQueries(5):
+            response = self.client.get(reverse('bookings:my_slots'))
+        self.assertContains(response, 'Anna')
+
+    def test_create_slot(self, kick):
+        self.login()
+        with self.assertMaxQueries(3):
+            self.client.get(reverse('bookings:create_slot'))
+
+        start = timezone.now() + timedelta(days=10)
+        with self.assertMaxQueries(14):
+            response = self.client.post(reverse('bookings:create_slot'), {
+                'session_id': self.session.pk,
+                'start_time': start.strftime('%Y-%m-%dT%H:%M'),
+                'end_time': (start + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'),
+            })
+        self.assertRedirects(response, reverse('bookings:my_slots'))
+
+    def test_import_and_export_slots(self, kick):
+        self.login()
+        with self.assertMaxQueries(3):
+            self.client.get(reverse('bookings:import_slots'))
+        with self.assertMaxQueries(3):
+            response = self.client.get(reverse('bookings:export_slots'))
+            rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), len(self.slots) + 2)
+
+    def test_delete_slot(self, kick):
+        self.login()
+        url = reverse('bookings:delete_slot', args=[self.slots[-1].pk])
+        with self.assertMaxQueries(3):
+            self.client.get(url)
+        with self.assertMaxQueries(9):
+            self.client.post(url)
+        self.assertFalse(TimeSlot.objects.filter(pk=self.slots[-1].pk).exists())
+
+    def test_cancel_booking(self, kick):
+        self.login()
+        url = reverse('bookings:cancel_booking', args=[self.slots[0].pk])
+        with self.assertMaxQueries(3):
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True), self.assertMaxQueries(8):
+            self.client.post(url)
+        self.assertFalse(TimeSlot.objects.get(pk=self.slots[0].pk).is_booked)
+
+    def test_cancel_seat(self, kick):
+        self.login()
+        booking = SlotBooking.objects.get(slot=self.group)
+        with self.assertMaxQueries(8):
+            self.client.post(reverse('bookings:cancel_seat', args=[self.group.pk, booking.pk]))
+        self.assertFalse(SlotBooking.objects.exists())
+
+    def test_sessions(self, kick):
+        make_session(self.owner)
+        self.login()
+        with self.assertMaxQueries(3):
+            self.client.get(reverse('bookings:sessions_list'))
+        with self.assertMaxQueries(5):
+            self.client.post(reverse('bookings:create_session'), {'title': 'Mentoring'})
+
+        url = reverse('bookings:edit_session', args=[self.session.pk])
+        with self.assertMaxQueries(3):
+            self.client.get(url)
+        with self.assertMaxQueries(4):
+            self.client.post(url, {'title': 'Renamed', 'description': ''})
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.title, 'Renamed')
+
+        with self.captureOnCommitCallbacks(execute=True), self.assertMaxQueries(9):
+            self.client.post(reverse('bookings:delete_session', args=[self.session.pk]))
+        self.assertFalse(BookingSession.objects.filter(pk=self.session.pk).exists())
+
+    def test_profile_settings(self, kick):
+        self.login()
+        with self.assertMaxQueries(3):
+            self.client.get(reverse('bookings:profile_settings'))
+        # Новый пояс сохраняется и в сессии (SAVEPOINT, UPDATE, RELEASE)
+        with self.assertMaxQueries(7):
+            response = self.client.post(reverse('bookings:profile_settings'), {
+                'timezone': 'Asia/Tokyo', 'language': 'en',
+            })
+        self.assertRedirects(response, reverse('bookings:profile_settings'))
+        self.assertEqual(self.client.session['owner_tz'], 'Asia/Tokyo')
+
+    @override_settings(TELEGRAM_BOT_USERNAME='callhelper_bot')
+    def test_telegram_link(self, kick):
+        self.login()
+        with self.assertMaxQueries(2):
+            response = self.client.get(reverse('bookings:telegram_link'))
+        self.assertTrue(response['Location'].startswith('https://t.me/callhelper_bot?start='))
+
+    @override_settings(TELEGRAM_WEBHOOK_SECRET='webhook-secret')
+    def test_telegram_webhook(self, kick):
+        with self.assertMaxQueries(0):
+            response = self.client.post(
+                reverse('bookings:telegram_webhook'),
+                data=json.dumps({'update_id': 1, 'message': {'text': 'hi'}}),
+                content_type='application/json',
+                HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN='webhook-secret',
+            )
+        self.assertEqual(response.status_code, 200)
+
+    # ---------- гости ----------
+
+    def test_public_view(self, kick):
+        url = reverse('bookings:public_booking', args=[self.link])
+        # ссылка -> id, сессия с профилем владельца, расписание
+        with self.assertMaxQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.context['slots_count'], 4)
+        # Повторный просмотр: ссылка и расписание уже в кэше, остается сессия
+        with self.assertMaxQueries(1):
+            self.client.get(url)
+
+    def test_public_view_unknown_link(self, kick):
+        url = reverse('bookings:public_booking', args=['nope'])
+        # Промах ищется в БД один раз и кэшируется
+        with self.assertMaxQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, 'Session not found')
+        with self.assertNumQueries(0):
+            self.client.get(url)
+            self.client.post(reverse('bookings:book_slot', args=['nope', 1]))
+
+    def test_join_waitlist_unknown_link(self, kick):
+        self.login(self.guest)
+        resolve_public_link('nope')
+        # 2 запроса - сессия и пользователь для login_required
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('bookings:join_waitlist', args=['nope']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_public_events_need_live_events_and_asgi(self, kick):
+        url = reverse('bookings:public_events', args=[self.link])
+        with self.assertMaxQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 204)
+        with override_settings(LIVE_EVENTS_ENABLED=True), self.assertMaxQueries(0):
+            # WSGI: поток занял бы воркер навсегда
+            self.assertEqual(self.client.get(url).status_code, 204)
+
+    @override_settings(LIVE_EVENTS_ENABLED=True)
+    async def test_public_events_unknown_link(self, kick):
+        response = await self.async_client.get(reverse('bookings:public_events', args=['nope']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_book_slot_as_guest(self, kick):
+        url = reverse('bookings:book_slot', args=[self.link, self.slots[2].pk])
+        with self.assertMaxQueries(2):
+            self.client.get(url)
+        with self.assertMaxQueries(6):
+            response = self.client.post(url, {'guest_name': 'Boris'})
+        self.assertRedirects(response, reverse('bookings:public_booking', args=[self.link]))
+        self.assertTrue(TimeSlot.objects.get(pk=self.slots[2].pk).is_booked)
+
+    def test_book_slot_as_user(self, kick):
+        self.login(self.guest)
+        url = reverse('bookings:book_slot', args=[self.link, self.slots[3].pk])
+        with self.captureOnCommitCallbacks(execute=True), self.assertMaxQueries(9):
+            self.client.post(url)
+        self.assertEqual(TimeSlot.objects.get(pk=self.slots[3].pk).booked_by, self.guest)
+
+    def test_book_group_seat(self, kick):
+        url = reverse('bookings:book_slot', args=[self.link, self.group.pk])
+        with self.assertMaxQueries(11):
+            self.client.post(url, {'guest_name': 'Boris'})
+        self.assertEqual(SlotBooking.objects.filter(slot=self.group).count(), 2)
+
+    def test_join_waitlist(self, kick):
+        self.login(self.guest)
+        with self.assertMaxQueries(8):
+            self.client.post(reverse('bookings:join_waitlist', args=[self.link]))
+        self.assertTrue(WaitlistEntry.objects.filter(user=self.guest).exists())
+
+    def test_register(self, kick):
+        with self.assertMaxQueries(0):
+            self.client.get(reverse('register'))
+        # +1: пояс из профиля кладется в сессию при входе
+        with self.assertMaxQueries(16):
+            response = self.client.post(reverse('register'), {
+                'username': 'newcomer',
+                'email': 'newcomer@example.com',
+                'password1': 'Str0ng-passw0rd',
+                'password2': 'Str0ng-passw0rd',
+            })
+        self.assertRedirects(response, reverse('bookings:dashboard'))
+
+
+class TelegramBackendTests(TestCase):
+
+    def setUp(self):
+        LocmemBackend.outbox.clear()
+
+    def test_outbox_delivers_to_locmem(self):
+        NotificationOutbox.objects.create(chat_id=42, message='Hello')
+        self.assertEqual(dispatch_batch(), 1)
+        self.assertEqual(LocmemBackend.outbox[0]['chat_id'], 42)
+        self.assertEqual(NotificationOutbox.objects.get().status, NotificationOutbox.STATUS_SENT)
+
+    @override_settings(TELEGRAM_BACKEND='bookings.telegram_backends.HttpBackend')
+    def test_http_errors_are_reported_as_undelivered(self):
+        import requests
+
+        with mock.patch('requests.post', side_effect=requests.exceptions.ConnectionError):
+            self.assertFalse(telegram_service.send_telegram_message(42, 'Hello'))
+        self.assertEqual(LocmemBackend.outbox, [])
+
+    @override_settings(TELEGRAM_BOT_TOKEN='')
+    def test_nothing_is_sent_without_token(self):
+        self.assertFalse(telegram_service.send_telegram_message(42, 'Hello'))
+        self.assertEqual(LocmemBackend.outbox, [])
+
+
+class SlotIntervalIndexTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user()
+        self.day = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+        self.first = make_slot(owner=self.owner, start=self.at(10), minutes=60)
+        self.second = make_slot(owner=self.owner, start=self.at(12), minutes=60)
+
+    def at(self, hour, minute=0):
+        return self.day.replace(hour=hour, minute=minute)
+
+    def test_overlap_and_adjacency_at_boundaries(self):
+        index = SlotIntervalIndex.for_owner(self.owner.pk)
+        cases = [
+            ((9, 0), (10, 0), False),    # заканчивается, когда начинается первый
+            ((11, 0), (12, 0), False),   # ровно в промежутке
+            ((13, 0), (14, 0), False),   # начинается, когда заканчивается второй
+            ((10, 59), (11, 1), True),
+            ((9, 0), (10, 1), True),
+            ((12, 59), (14, 0), True),
+            ((9, 0), (14, 0), True),     # накрывает оба
+        ]
+        for start, end, expected in cases:
+            with self.subTest(start=start, end=end):
+                self.assertEqual(index.overlaps(self.at(*start), self.at(*end)), expected)
+
+        conflicts = index.conflicts(self.at(9), self.at(14))
+        self.assertEqual([pk for pk, _, _ in conflicts], [self.first.pk, self.second.pk])
+        self.assertFalse(index.overlaps(self.at(10), self.at(11), exclude_pk=self.first.pk))
+
+    def test_batch_is_checked_against_slots_and_itself(self):
+        index = SlotIntervalIndex.for_owner(self.owner.pk)
+        errors = index.check_batch([
+            (self.at(14), self.at(15)),
+            (self.at(10, 30), self.at(11, 30)),
+            (self.at(14, 30), self.at(16)),
+            (self.at(17), self.at(17)),
+        ])
+        self.assertEqual([pos for pos, _ in errors], [1, 2, 3])
+
+    def test_index_is_rebuilt_only_after_commit(self):
+        self.assertEqual(len(SlotIntervalIndex.for_owner(self.owner.pk)), 2)
+        version = cache.get(_version_key(self.owner.pk))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            make_slot(owner=self.owner, start=self.at(15))
+        # До коммита читатели видят прежний снимок
+        self.assertEqual(cache.get(_version_key(self.owner.pk)), version)
+        self.assertEqual(len(SlotIntervalIndex.for_owner(self.owner.pk)), 2)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(cache.get(_version_key(self.owner.pk)), version)
+        with self.assertNumQueries(1):
+            index = SlotIntervalIndex.for_owner(self.owner.pk)
+        self.assertEqual(len(index), 3)
+        with self.assertNumQueries(0):
+            SlotIntervalIndex.for_owner(self.owner.pk)
+
+    def test_move_and_delete_bump_version(self):
+        SlotIntervalIndex.for_owner(self.owner.pk)
+        versions = {cache.get(_version_key(self.owner.pk))}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.start_time = self.at(18)
+            self.second.end_time = self.at(19)
+            self.second.save()
+        versions.add(cache.get(_version_key(self.owner.pk)))
+        self.assertTrue(SlotIntervalIndex.for_owner(self.owner.pk).overlaps(self.at(18), self.at(19)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.delete()
+        versions.add(cache.get(_version_key(self.owner.pk)))
+        self.assertEqual(len(versions), 3)
+        self.assertFalse(SlotIntervalIndex.for_owner(self.owner.pk).overlaps(self.at(10), self.at(11)))
+
+
+@mock.patch('bookings.outbox.kick_dispatcher')
+class SessionCounterTests(TestCase):
+
+    def setUp(self):
+        self.owner = make_user()
+        self.session = make_session(self.owner)
+        self.other = make_session(self.owner)
+        self.slot = make_slot(session=self.session)
+        make_slot(session=self.session, start=timezone.now() - timedelta(days=1))
+
+    def counters(self, session=None):
+        session = session or self.session
+        session.refresh_from_db()
+        return (session.slots_count, session.free_future_count, session.booked_count)
+
+    def test_apply_adds_deltas_in_one_update(self, kick):
+        with self.assertNumQueries(1):
+            apply_session_counters(self.session.pk, 2, 1, 1)
+        with self.assertNumQueries(0):
+            apply_session_counters(self.session.pk)
+            apply_session_counters(None, 1, 1, 1)
+        self.assertEqual(self.counters(), (4, 2, 1))
+
+    def test_book_cancel_and_delete(self, kick):
+        self.assertEqual(self.counters(), (2, 1, 0))
+        self.slot.guest_name = 'Anna'
+        self.slot.save()
+        self.assertEqual(self.counters(), (2, 0, 1))
+        self.slot.guest_name = None
+        self.slot.save()
+        self.assertEqual(self.counters(), (2, 1, 0))
+        self.slot.delete()
+        self.assertEqual(self.counters(), (1, 0, 0))
+
+    def test_move_between_sessions(self, kick):
+        self.slot.guest_name = 'Anna'
+        self.slot.save()
+        self.slot.session = self.other
+        self.slot.save()
+        self.assertEqual(self.counters(), (1, 0, 0))
+        self.assertEqual(self.counters(self.other), (1, 0, 1))
+
+        # Перенос в прошлое убирает свободный слот из будущих
+        self.slot.guest_name = None
+        self.slot.save()
+        self.assertEqual(self.counters(self.other), (1, 1, 0))
+        self.slot.start_time = timezone.now() - timedelta(hours=2)
+        self.slot.end_time = self.slot.start_time + timedelta(minutes=30)
+        self.slot.save()
+        self.assertEqual(self.counters(self.other), (1, 0, 0))
+
+    def test_migration_backfill_is_batched(self, kick):
+        from importlib import import_module
+        from django.apps import apps
+
+        migration = import_module('bookings.migrations.0004_bookingsession_counters')
+        make_session(self.owner)
+        BookingSession.objects.update(slots_count=0, free_future_count=0, booked_count=0)
+        # SELECT с агрегатами и один bulk UPDATE на пачку
+        with self.assertNumQueries(2):
+            migration.fill_session_counters(apps, None)
+        self.assertEqual(self.counters(), (2, 1, 0))
+        self.assertEqual(self.counters(self.other), (0, 0, 0))
+
+    def test_reconcile_fixes_drifted_counts(self, kick):
+        BookingSession.objects.filter(pk=self.session.pk).update(
+            slots_count=7, free_future_count=5, booked_count=3,
+        )
+        # Свободный слот ушел в прошлое без сохранения
+        TimeSlot.objects.filter(pk=self.slot.pk).update(start_time=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(reconcile_session_counters(), 1)
+        self.assertEqual(self.counters(), (2, 0, 0))
+        self.assertEqual(self.counters(self.other), (0, 0, 0))
+        self.assertEqual(reconcile_session_counters(), 0)
+
+
+class NotificationRenderingTests(TestCase):
+
+    def setUp(self):
+        self.owner = make_user('owner', telegram_id=42, tz='Europe/Moscow')
+        self.guest = make_user('guest')
+        self.session = make_session(self.owner, title='Консультация', description='Возьмите ноутбук')
+        self.start = datetime(2030, 1, 1, 9, 0, tzinfo=dt_timezone.utc)
+        self.slot = make_slot(
+            session=self.session, start=self.start, minutes=90, booked_by=self.guest,
+        )
+
+    def notification(self):
+        return telegram_service.load_slot_notification(self.slot.pk)
+
+    def test_booking_text(self):
+        notification = self.notification()
+        self.assertEqual(telegram_service.render_booking_notification(notification), (
+            "📅 <b>Новое бронирование!</b>\n\n"
+            "⏰ <b>Время:</b> 01.01.2030 12:00 - 13:30\n"
+            "👤 <b>Забронировано:</b> guest\n"
+            "⏱️ <b>Длительность:</b> 1h 30m\n"
+            "📋 <b>Сессия:</b> Консультация"
+        ))
+        guest_text = telegram_service.render_booking_notification(notification, is_owner=False)
+        self.assertIn("👤 <b>С кем:</b> owner", guest_text)
+        self.assertTrue(guest_text.endswith("\n📝 Возьмите ноутбук"))
+
+    def test_cancellation_and_reminder_text(self):
+        notification = self.notification()
+        self.assertEqual(telegram_service.render_cancellation_notification(notification), (
+            "❌ <b>Бронирование отменено</b>\n\n"
+            "⏰ <b>Время:</b> 01.01.2030 12:00 - 13:30"
+        ))
+        self.assertEqual(telegram_service.render_reminder_notification(notification), (
+            "⏰ <b>Напоминание!</b> Встреча через 24 часа\n\n"
+            "⏰ <b>Время:</b> 01.01.2030 12:00 - 13:30\n"
+            "👤 <b>С кем:</b> guest"
+        ))
+
+    def test_language_and_guest_name(self):
+        UserProfile.objects.filter(user=self.owner).update(language='en')
+        TimeSlot.objects.filter(pk=self.slot.pk).update(booked_by=None, guest_name='Anna')
+        self.assertEqual(telegram_service.render_reminder_notification(self.notification()), (
+            "⏰ <b>Reminder!</b> You have a meeting in 24 hours\n\n"
+            "⏰ <b>Time:</b> 01.01.2030 12:00 - 13:30\n"
+            "👤 <b>With:</b> Anna"
+        ))
+
+    def test_slot_instance_renders_like_projection(self):
+        slot = TimeSlot.objects.get(pk=self.slot.pk)
+        self.assertEqual(
+            telegram_service.format_booking_notification(slot),
+            telegram_service.render_booking_notification(self.notification()),
+        )
+
+    def test_notifications_load_in_one_query(self):
+        make_slots(self.session, 5)
+        with self.assertNumQueries(1):
+            notifications = list(telegram_service.load_slot_notifications(
+                TimeSlot.objects.filter(session=self.session)
+            ))
+        self.assertEqual(len(notifications), 6)
+        self.assertEqual({n.telegram_id for n in notifications}, {42})
+        self.assertEqual({n.session_title for n in notifications}, {'Консультация'})
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.owner = make_user()
+        self.client.force_login(self.owner)
+        self.python = make_session(self.owner, title='Python office hours')
+        self.cooking = make_session(
+            self.owner, title='Cooking class', description='Bring a python cookbook',
+        )
+        self.other = make_session(self.owner, title='Design review')
+        self.booked = make_slot(session=self.other, guest_name='Anna Karenina')
+        make_slot(session=self.other, guest_name='Boris')
+        make_slot(session=self.python)
+
+    def sessions(self, term):
+        return list(search_sessions(BookingSession.objects.order_by('-created_at'), term))
+
+    def test_blank_query_keeps_queryset(self):
+        queryset = BookingSession.objects.order_by('-created_at')
+        for term in (None, '', '   '):
+            with self.subTest(term=term):
+                self.assertIs(search_sessions(queryset, term), queryset)
+                slots = TimeSlot.objects.all()
+                self.assertIs(search_slots(slots, term), slots)
+
+    def test_sessions_by_title_description_and_link(self):
+        self.assertEqual(set(self.sessions('python')), {self.python, self.cooking})
+        self.assertEqual(self.sessions('review'), [self.other])
+        self.assertEqual(self.sessions(self.other.public_link), [self.other])
+        self.assertEqual(self.sessions('nothing like this'), [])
+
+    def test_slots_by_guest_booker_and_session(self):
+        slots = TimeSlot.objects.all()
+        self.assertEqual(list(search_slots(slots, 'anna')), [self.booked])
+        self.assertEqual(search_slots(slots, 'design').count(), 2)
+
+        guest = make_user('guestlogin')
+        TimeSlot.objects.filter(pk=self.booked.pk).update(booked_by=guest)
+        self.assertEqual(list(search_slots(slots, 'guestlogin')), [self.booked])
+
+    @skipUnless(connection.vendor == 'postgresql', 'ranking uses PostgreSQL full-text search')
+    def test_title_match_ranks_first(self):
+        self.assertEqual(self.sessions('python'), [self.python, self.cooking])
+        # Нечеткое совпадение по триграммам
+        self.assertEqual(self.sessions('pytho'), [self.python])
+
+    def test_views_filter_by_query(self):
+        response = self.client.get(reverse('bookings:sessions_list'), {'q': 'review'})
+        self.assertEqual(list(response.context['sessions']), [self.other])
+        self.assertEqual(response.context['query'], 'review')
+
+        response = self.client.get(reverse('bookings:sessions_list'), {'q': '  '})
+        self.assertEqual(len(response.context['sessions']), 3)
+
+        response = self.client.get(reverse('bookings:my_slots'), {'q': 'Boris'})
+        self.assertContains(response, 'Boris')
+        self.assertNotContains(response, 'Anna Karenina')
+
+
+@mock.patch('bookings.outbox.kick_dispatcher')
+class MySlotsFragmentCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user()
+        self.client.force_login(self.owner)
+        self.session = make_session(self.owner, title='Office hours')
+        self.slot = make_slot(session=self.session, guest_name='Anna')
+
+    def get(self):
+        return self.client.get(reverse('bookings:my_slots'))
+
+    def test_rows_are_served_from_cache(self, kick):
+        with CaptureQueriesContext(connection) as first:
+            response = self.get()
+        version = response.context['slots_version']
+        with CaptureQueriesContext(connection) as second:
+            response = self.get()
+        self.assertEqual(response.context['slots_version'], version)
+        # Строки слотов не запрашиваются: фрагмент взят из кэша
+        self.assertLess(len(second), len(first))
+        self.assertFalse(any('bookings_slotbooking' in q['sql'] for q in second))
+
+        # UPDATE в обход save() не меняет версию, поэтому виден старый фрагмент
+        TimeSlot.objects.filter(pk=self.slot.pk).update(guest_name='Boris')
+        self.assertContains(self.get(), 'Anna')
+
+    def test_booking_changes_version(self, kick):
+        version = self.get().context['slots_version']
+        self.slot.guest_name = 'Boris'
+        self.slot.save()
+        response = self.get()
+        self.assertNotEqual(response.context['slots_version'], version)
+        self.assertContains(response, 'Boris')
+        self.assertNotContains(response, 'Anna')
+
+    def test_session_edit_changes_version(self, kick):
+        version = self.get().context['slots_version']
+        self.client.post(
+            reverse('bookings:edit_session', args=[self.session.pk]), {'title': 'Renamed'},
+        )
+        response = self.get()
+        self.assertNotEqual(response.context['slots_version'], version)
+        self.assertContains(response, 'Renamed')
+
+    def test_new_slot_changes_version(self, kick):
+        version = self.get().context['slots_version']
+        make_slot(session=self.session)
+        self.assertNotEqual(self.get().context['slots_version'], version)
+
+
+@mock.patch('bookings.outbox.kick_dispatcher')
+class OwnerTimezoneTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user(tz='Europe/Berlin')
+        self.session = make_session(self.owner)
+        self.client.login(username=self.owner.username, password=PASSWORD)
+
+    def test_form_and_import_read_the_same_local_time(self, kick):
+        self.client.post(reverse('bookings:create_slot'), {
+            'session_id': self.session.pk,
+            'start_time': '2030-01-10T10:00',
+            'end_time': '2030-01-10T10:30',
+        })
+        import_slot_rows(self.owner, self.session, iter([
+            {'start_time': '2030-01-11 10:00', 'end_time': '2030-01-11 10:30'},
+        ]), get_zone('Europe/Berlin'))
+
+        starts = sorted(TimeSlot.objects.values_list('start_time', flat=True))
+        self.assertEqual(starts, [
+            datetime(2030, 1, 10, 9, 0, tzinfo=dt_timezone.utc),
+            datetime(2030, 1, 11, 9, 0, tzinfo=dt_timezone.utc),
+        ])
+
+    def test_my_slots_shows_and_caches_per_zone(self, kick):
+        make_slot(session=self.session, start=datetime(2030, 1, 10, 9, 0, tzinfo=dt_timezone.utc))
+        self.assertContains(self.get_slots(), '10:00 - 10:30')
+
+        self.client.post(reverse('bookings:profile_settings'), {
+            'timezone': 'Asia/Tokyo', 'language': 'en',
+        })
+        # Версия слотов та же, но фрагмент другого пояса - другой ключ кэша
+        self.assertContains(self.get_slots(), '18:00 - 18:30')
+
+    def test_session_without_zone_reads_profile_once(self, kick):
+        session = self.client.session
+        del session['owner_tz']
+        session.save()
+        self.get_slots()
+        self.assertEqual(self.client.session['owner_tz'], 'Europe/Berlin')
+
+    def get_slots(self):
+        return self.client.get(reverse('bookings:my_slots'))
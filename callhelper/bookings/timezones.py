@@ -0,0 +1,87 @@
+"""
+Работа с часовыми поясами владельцев и гостей
+
+ZoneInfo объекты кэшируются, а перевод большого отсортированного списка
+UTC-времен в локальное время выполняется с кэшированием смещения по
+15-минутным интервалам: переходы на летнее время происходят на границах
+таких интервалов, так что utcoffset вычисляется один раз на интервал,
+а не для каждого слота.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+GUEST_TZ_COOKIE = 'guest_tz'
+# Пояс владельца хранится в сессии, чтобы не читать профиль на каждый запрос
+OWNER_TZ_SESSION_KEY = 'owner_tz'
+_BUCKET_SECONDS = 15 * 60
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    """Returns a cached ZoneInfo instance"""
+    return ZoneInfo(name)
+
+
+def is_valid_timezone(name):
+    if not name or len(name) > 64:
+        return False
+    try:
+        get_zone(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+def validate_timezone(value):
+    """Валидатор поля модели с названием часового пояса"""
+    if not is_valid_timezone(value):
+        raise ValidationError(f"Unknown time zone: {value}")
+
+
+def default_zone():
+    return get_zone(settings.TIME_ZONE)
+
+
+def localize_many(values, tz):
+    """
+    Переводит последовательность aware datetime (или epoch seconds) в tz
+
+    Returns:
+        list[datetime]: naive локальные datetime в том же порядке
+    """
+    offsets = {}
+    result = []
+    for value in values:
+        ts = value if isinstance(value, (int, float)) else value.timestamp()
+        bucket = int(ts // _BUCKET_SECONDS)
+        offset = offsets.get(bucket)
+        if offset is None:
+            moment = datetime.fromtimestamp(bucket * _BUCKET_SECONDS, tz=dt_timezone.utc)
+            offset = offsets[bucket] = moment.astimezone(tz).utcoffset().total_seconds()
+        result.append(datetime(1970, 1, 1) + timedelta(seconds=ts + offset))
+    return result
+
+
+def get_guest_timezone(request, fallback=None):
+    """
+    Определяет часовой пояс гостя
+
+    Порядок: параметр ?tz= (его подставляет JS из Intl API), cookie,
+    затем fallback (обычно часовой пояс владельца), затем TIME_ZONE.
+    """
+    for name in (request.GET.get('tz'), request.COOKIES.get(GUEST_TZ_COOKIE), fallback):
+        if is_valid_timezone(name):
+            return name
+    return settings.TIME_ZONE
+
+
+def remember_owner_timezone(request, name):
+    """Запоминает пояс владельца в сессии (вход, смена настроек)"""
+    name = name if is_valid_timezone(name) else settings.TIME_ZONE
+    # Без изменений сессия не перезаписывается
+    if request.session.get(OWNER_TZ_SESSION_KEY) != name:
+        request.session[OWNER_TZ_SESSION_KEY] = name
@@ -0,0 +1,203 @@
+"""
+Bulk import and export of slots
+
+Import reads CSV or JSON incrementally, keeps only compact (start, end)
+intervals in memory, checks them against the owner's existing slots in one
+sorted sweep (SlotIntervalIndex.check_batch) and writes them with
+bulk_create. bulk_create skips save() and the signals, so counters,
+caches and reminders of booked rows are handled here once for the batch.
+
+Export streams CSV rows straight from a server-side cursor, so memory use
+does not depend on the number of rows.
+"""
+import csv
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .counters import apply_session_counters, slot_contribution
+from .live import publish_slot_event
+from .models import TimeSlot
+from .reminders import new_reminder_id, schedule_reminder
+from .schedule import invalidate_public_schedule
+from .slot_index import SlotIntervalIndex, invalidate_owner_index
+
+IMPORT_FIELDS = ('start_time', 'end_time', 'guest_name')
+EXPORT_FIELDS = (
+    'id', 'session__title', 'start_time', 'end_time',
+    'is_booked', 'guest_name', 'booked_by__username', 'booked_at',
+)
+EXPORT_HEADER = (
+    'id', 'session', 'start_time', 'end_time',
+    'is_booked', 'guest_name', 'booked_by', 'booked_at',
+)
+READ_CHUNK_SIZE = 64 * 1024
+# Ошибки разбора загруженного файла; json.JSONDecodeError - подкласс ValueError
+READ_ERRORS = (ValueError, UnicodeDecodeError, csv.Error)
+
+
+class ImportResult:
+    __slots__ = ('created', 'errors')
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+
+def iter_csv_rows(fileobj):
+    """Yields dict rows from a binary CSV file"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        # Файл закрывает вызывающий код
+        text.detach()
+
+
+def iter_json_rows(fileobj):
+    """
+    Yields objects from a JSON array or from JSON Lines without loading
+    the whole document
+    """
+    decoder = json.JSONDecoder()
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig')
+    buffer = ''
+    started = False
+    eof = False
+    try:
+        while True:
+            # Пропускаем разделители между объектами
+            stripped = buffer.lstrip()
+            if not started and stripped.startswith('['):
+                stripped = stripped[1:]
+                started = True
+            stripped = stripped.lstrip(', \r\n\t')
+            if stripped.startswith(']'):
+                return
+            buffer = stripped
+
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    if buffer.strip():
+                        raise
+                    return
+                chunk = text.read(READ_CHUNK_SIZE)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield obj
+            buffer = buffer[end:]
+    finally:
+        text.detach()
+
+
+def _parse_time(value, tz):
+    parsed = parse_datetime(str(value or '').strip())
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, tz)
+    return parsed
+
+
+def import_slots(owner, session, rows, tz, batch_size=500):
+    """
+    Creates slots for `owner` in `session` from an iterable of dict rows
+
+    Naive times are read in `tz`. Invalid rows are reported in
+    ImportResult.errors as (row_number, message) and skipped, the rest is
+    imported in one transaction.
+    """
+    result = ImportResult()
+    intervals = []
+    guests = []
+    numbers = []
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            result.errors.append((number, 'Row must be an object.'))
+            continue
+        start = _parse_time(row.get('start_time'), tz)
+        end = _parse_time(row.get('end_time'), tz)
+        if start is None or end is None:
+            result.errors.append((number, 'Invalid start_time or end_time.'))
+            continue
+        intervals.append((start, end))
+        guests.append((row.get('guest_name') or '').strip()[:100] or None)
+        numbers.append(number)
+
+    with transaction.atomic():
+        # Блокировка владельца сериализует импорты одного пользователя
+        User.objects.select_for_update().filter(pk=owner.pk).first()
+        index = SlotIntervalIndex.build(owner.pk)
+        rejected = dict(index.check_batch(intervals))
+        result.errors.extend((numbers[pos], reason) for pos, reason in rejected.items())
+        result.errors.sort()
+
+        now = timezone.now()
+        totals = [0, 0, 0]
+        batch = []
+        for pos, (start, end) in enumerate(intervals):
+            if pos in rejected:
+                continue
+            guest = guests[pos]
+            batch.append(TimeSlot(
+                owner=owner,
+                session=session,
+                start_time=start,
+                end_time=end,
+                guest_name=guest,
+                is_booked=bool(guest),
+                booked_at=now if guest else None,
+                reminder_task_id=new_reminder_id(start, now) if guest else '',
+            ))
+            for i, value in enumerate(slot_contribution(bool(guest), start, now)):
+                totals[i] += value
+            if len(batch) >= batch_size:
+                result.created += _create_batch(batch)
+                batch = []
+        if batch:
+            result.created += _create_batch(batch)
+
+        if result.created:
+            apply_session_counters(session.pk, *totals)
+            invalidate_owner_index(owner.pk)
+            invalidate_public_schedule(session.pk)
+            publish_slot_event(session.pk, None, 'resync')
+    return result
+
+
+def _create_batch(batch):
+    # pk после bulk_create есть на PostgreSQL и SQLite (RETURNING)
+    TimeSlot.objects.bulk_create(batch, batch_size=len(batch))
+    for slot in batch:
+        if slot.reminder_task_id:
+            schedule_reminder(slot.pk, slot.reminder_task_id, slot.start_time)
+    return len(batch)
+
+
+class _Echo:
+    """File-like object for csv.writer that returns the written line"""
+
+    def write(self, value):
+        return value
+
+
+def _format_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def iter_slots_csv(queryset, chunk_size=2000):
+    """Yields CSV lines for the slots in `queryset`"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_HEADER)
+    rows = queryset.order_by('start_time').values_list(*EXPORT_FIELDS)
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield writer.writerow([_format_value(value) for value in row])
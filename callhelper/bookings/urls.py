@@ -8,8 +8,11 @@ urlpatterns = [
     
     path('slots/', views.my_slots, name='my_slots'),
     path('slots/create/', views.create_slot, name='create_slot'),
+    path('slots/import/', views.import_slots, name='import_slots'),
+    path('slots/export/', views.export_slots, name='export_slots'),
     path('slots/<int:slot_id>/delete/', views.delete_slot, name='delete_slot'),
     path('slots/<int:slot_id>/cancel/', views.cancel_booking, name='cancel_booking'),
+    path('slots/<int:slot_id>/seats/<int:booking_id>/cancel/', views.cancel_seat, name='cancel_seat'),
     
     path('sessions/', views.sessions_list, name='sessions_list'),
     path('sessions/create/', views.create_session, name='create_session'),
@@ -18,4 +21,13 @@ urlpatterns = [
     
     path('public/<str:public_link>/', views.public_view, name='public_booking'),
     path('public/<str:public_link>/book/<int:slot_id>/', views.book_slot, name='book_slot'),
+    path('public/<str:public_link>/events/', views.public_events, name='public_events'),
+    path('public/<str:public_link>/waitlist/', views.join_waitlist, name='join_waitlist'),
+
+    path('settings/', views.profile_settings, name='profile_settings'),
+
+    path('analytics/utilization/', views.utilization_api, name='utilization_api'),
+
+    path('telegram/link/', views.telegram_link, name='telegram_link'),
+    path('telegram/webhook/', views.telegram_webhook, name='telegram_webhook'),
 ]
\ No newline at end of file
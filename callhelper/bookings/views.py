@@ -1,72 +1,188 @@
+from asgiref.sync import sync_to_async
 from django.utils import timezone
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.core.exceptions import ValidationError
-from django.db.models import Q, Count
-from .models import TimeSlot, BookingSession
-from .forms import UserRegistrationForm
+from django.db.models import Q, Count, Max, Prefetch, Sum
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+from .models import TimeSlot, BookingSession, SlotBooking, UserProfile
+from .analytics import owner_zones, utilization_series
+from .forms import UserRegistrationForm, ProfileSettingsForm
+from .links import resolve_public_link
+from .purge import soft_delete_session
+from .live import stream_slot_events
+from .transfer import (
+    READ_ERRORS as TRANSFER_READ_ERRORS,
+    import_slots as import_slot_rows,
+    iter_csv_rows,
+    iter_json_rows,
+    iter_slots_csv,
+)
+from .schedule import get_public_schedule, get_schedule_version
+from .search import search_sessions, search_slots
+from .seats import SeatUnavailable, claim_seat, release_seat
+from .slot_index import SlotIntervalIndex
+from .tasks import process_telegram_update
+from .telegram_bot import create_link_token, forget_update, get_deep_link, mark_update_seen
+from .timezones import GUEST_TZ_COOKIE, get_guest_timezone, get_zone, remember_owner_timezone
+from .waitlist import held_for_user_id, join_waitlist as join_waitlist_entry, mark_offer_booked
+from functools import lru_cache
+import hmac
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 @login_required
 def my_slots(request):
     """
     Displays a list of slots for the current user.
     """
-    slots = TimeSlot.objects.filter(
-        owner=request.user).order_by('-start_time')
+    query = request.GET.get('q', '').strip()
+    slots = search_slots(TimeSlot.objects.filter(
+        owner=request.user), query).select_related(
+            'session', 'booked_by').prefetch_related(
+                # Места групповых слотов - одним запросом на страницу
+                Prefetch('seat_bookings', queryset=SlotBooking.objects.select_related(
+                    'user').order_by('created_at'))
+            ).order_by('-start_time')
+
+    # Версия списка для {% cache %}: меняется при любом изменении слотов или сессий
+    versions = TimeSlot.objects.filter(owner=request.user).aggregate(
+        count=Count('id'),
+        slots_updated=Max('updated_at'),
+        sessions_updated=Max('session__updated_at'),
+    )
     context = {
-        'slots':slots
+        # Генератор: строки считаются только при промахе кэша фрагмента
+        'slots': _with_slot_urls(slots),
+        'query': query,
+        'slots_version': '{count}:{slots_updated}:{sessions_updated}'.format(**versions),
     }
     return render(request, 'bookings/my_slots.html', context)
 
+
+@lru_cache(maxsize=None)
+def _url_template(viewname, **samples):
+    """
+    Reverses a URL once and returns it as a str.format template,
+    so rows don't pay for a {% url %} reversal each.
+    """
+    url = reverse(viewname, kwargs=samples)
+    for name, sample in samples.items():
+        url = url.replace(str(sample), '{%s}' % name)
+    return url
+
+
+_SAMPLE_ID = 2147483647
+_SAMPLE_LINK = 'PUBLICLINKSAMPLE'
+
+
+def _with_slot_urls(slots):
+    delete_url = _url_template('bookings:delete_slot', slot_id=_SAMPLE_ID)
+    cancel_url = _url_template('bookings:cancel_booking', slot_id=_SAMPLE_ID)
+    public_url = _url_template('bookings:public_booking', public_link=_SAMPLE_LINK)
+    cancel_seat_url = _url_template(
+        'bookings:cancel_seat', slot_id=_SAMPLE_ID, booking_id=_SAMPLE_ID - 1
+    )
+    for slot in slots:
+        slot.delete_url = delete_url.format(slot_id=slot.id)
+        slot.cancel_url = cancel_url.format(slot_id=slot.id)
+        if slot.is_group:
+            slot.seats = [
+                (booking, cancel_seat_url.format(slot_id=slot.id, booking_id=booking.id))
+                for booking in slot.seat_bookings.all()
+            ]
+        if slot.session:
+            slot.public_url = public_url.format(public_link=slot.session.public_link)
+        yield slot
+
+def _parse_slot_time(value):
+    """
+    Parses a datetime-local value from the form into an aware datetime in
+    the owner's zone (activated by OwnerTimezoneMiddleware), as import does
+    """
+    parsed = parse_datetime(value or '')
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _parse_capacity(value):
+    """Количество мест из формы; 1 - обычный слот"""
+    try:
+        return max(int(value or 1), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
 @login_required
 def create_slot(request):
+    sessions = list(BookingSession.objects.filter(
+        owner_session=request.user).order_by('-created_at'))
+    conflicts = None
+
     if request.method=='POST':
 
         session_id = request.POST.get('session_id')
         if session_id:
-            try:
-                session = BookingSession.objects.get(id=session_id, owner_session=request.user)
-            except BookingSession.DoesNotExist:
+            session = next((s for s in sessions if str(s.id) == session_id), None)
+            if session is None:
                 messages.error(request, 'Session not found')
                 return redirect('bookings:create_slot')
         else:
-            session = BookingSession.objects.filter(
-                owner_session=request.user
-                ).order_by('-created_at').first()
+            session = sessions[0] if sessions else None
             if not session:
                 session = BookingSession(
                     owner_session=request.user,
                     title=f'Session from {timezone.now().strftime("%d.%m.%Y %H:%M")}',
                 )
                 session.save()
+                sessions.insert(0, session)
                 
-        start_time = request.POST.get('start_time')
-        end_time = request.POST.get('end_time')
+        start_time = _parse_slot_time(request.POST.get('start_time'))
+        end_time = _parse_slot_time(request.POST.get('end_time'))
 
-        slot = TimeSlot(
-            owner=request.user,
-            session=session,    
-            start_time=start_time,
-            end_time=end_time)
+        if start_time is None or end_time is None:
+            messages.error(request, 'Please provide valid start and end time')
+        elif request.POST.get('action') == 'preview':
+            # Показываем конфликты без создания слота
+            conflicts = SlotIntervalIndex.for_owner(request.user.id).conflicts(start_time, end_time)
+            if not conflicts:
+                messages.success(request, 'No conflicts, this time is free.')
+        elif SlotIntervalIndex.for_owner(request.user.id).overlaps(start_time, end_time):
+            messages.error(request, 'This time slot overlaps with an existing slot. Please choose a different time.')
+        else:
+            slot = TimeSlot(
+                owner=request.user,
+                session=session,    
+                start_time=start_time,
+                end_time=end_time,
+                capacity=_parse_capacity(request.POST.get('capacity')))
 
-        try:
-            slot.full_clean()  
-            slot.save()
-            messages.success(request, 'Slot successfully created!')
-            return redirect('bookings:my_slots')
-        except ValidationError as e:
-           
-            messages.error(request, str(e.message_dict.get('__all__', [e.message])[0]))
-        except Exception as e:
-            messages.error(request, f'Error creating slot: {str(e)}')
+            try:
+                slot.full_clean()  
+                slot.save()
+                messages.success(request, 'Slot successfully created!')
+                return redirect('bookings:my_slots')
+            except ValidationError as e:
+               
+                messages.error(request, str(e.message_dict.get('__all__', [e.message])[0]))
+            except Exception as e:
+                messages.error(request, f'Error creating slot: {str(e)}')
     
-    sessions = BookingSession.objects.filter(
-        owner_session=request.user).order_by('-created_at')
     context = {
         'sessions':sessions,
-        'active_session': sessions.first() if sessions.exists() else None
+        'active_session': sessions[0] if sessions else None,
+        'conflicts': conflicts,
     }
     return render(request, 'bookings/create_slot.html', context)
 
@@ -74,12 +190,16 @@ def create_slot(request):
 def dashboard(request):
     owner = request.user
 
-    session_count = BookingSession.objects.filter(
-        owner_session=owner).count()
-    slots_count = TimeSlot.objects.filter(
-        owner=owner).count()
-    booking_count = TimeSlot.objects.filter(
-        owner=owner, is_booked=True).count()
+    # Счетчики берем из денормализованных полей сессий
+    totals = BookingSession.objects.filter(
+        owner_session=owner).aggregate(
+            session_count=Count('id'),
+            slots_count=Sum('slots_count'),
+            booking_count=Sum('booked_count'),
+        )
+    session_count = totals['session_count']
+    slots_count = totals['slots_count'] or 0
+    booking_count = totals['booking_count'] or 0
     
     # Последние бронирования
     recent_bookings = TimeSlot.objects.filter(
@@ -89,10 +209,11 @@ def dashboard(request):
     
     # Активные сессии (с хотя бы одним слотом)
     active_sessions = BookingSession.objects.filter(
-        owner_session=owner
-    ).annotate(
-        slots_count=Count('session_slots')
-    ).filter(slots_count__gt=0).order_by('-created_at')[:5]
+        owner_session=owner,
+        slots_count__gt=0,
+    ).order_by('-created_at')[:5]
+    
+    utilization = utilization_series(owner, days=14, today=_owner_today(owner))
     
     context = {
         'session_count': session_count,
@@ -100,43 +221,155 @@ def dashboard(request):
         'slots_count': slots_count,
         'recent_bookings': recent_bookings,
         'active_sessions': active_sessions,
+        'utilization': utilization,
+        'utilization_summary': _summarize_utilization(utilization),
     }
     return render(request, 'bookings/dashboard.html', context)
 
 
-def public_view(request, public_link):  
+def _owner_today(user):
+    """Дни в агрегатах считаются в поясе владельца"""
+    return timezone.localdate(timezone=owner_zones([user.pk])[user.pk])
+
+
+def _summarize_utilization(series):
+    offered = sum(day['offered_hours'] for day in series)
+    booked = sum(day['booked_hours'] for day in series)
+    bookings = sum(day['bookings'] for day in series)
+    cancellations = sum(day['cancellations'] for day in series)
+    lead_hours = sum(day['avg_lead_hours'] * day['bookings'] for day in series if day['bookings'])
+    return {
+        'offered_hours': offered,
+        'booked_hours': booked,
+        'cancellation_rate': 100 * cancellations / (bookings + cancellations) if bookings + cancellations else 0,
+        'avg_lead_hours': lead_hours / bookings if bookings else None,
+    }
+
+
+@login_required
+def utilization_api(request):
+    """
+    JSON для графиков: ?days=30&session=<id>, читает только агрегаты
+    """
     try:
-        session = BookingSession.objects.get(public_link=public_link)
-        
-        free_slots = session.session_slots.filter(
-            is_booked=False,
-            start_time__gt=timezone.now()
-        ).order_by('start_time')
-        
-        context = {
-            'session': session,
-            'slots': free_slots,
-        }
-        
+        days = min(max(int(request.GET.get('days', 30)), 1), 366)
+        session_id = int(request.GET['session']) if request.GET.get('session') else None
+    except ValueError:
+        return HttpResponseBadRequest('Invalid parameters')
 
+    series = utilization_series(
+        request.user, days=days, session_id=session_id, today=_owner_today(request.user)
+    )
+    return JsonResponse({'days': series, 'summary': _summarize_utilization(series)})
 
-        return render(request, 'bookings/public_view.html', context)
-        
+
+def public_view(request, public_link):  
+    try:
+        # Ссылка -> id через кэш, несуществующие ссылки не доходят до БД
+        session_id = resolve_public_link(public_link)
+        if session_id is None:
+            raise BookingSession.DoesNotExist
+        session = BookingSession.objects.select_related(
+            'owner_session__profile'
+        ).get(pk=session_id)
     except BookingSession.DoesNotExist:
         messages.error(request, 'Session not found')
         return render(request, 'bookings/error.html', {'error': 'Session not found'})
 
+    owner_profile = getattr(session.owner_session, 'profile', None)
+    guest_timezone = get_guest_timezone(
+        request,
+        fallback=owner_profile.timezone if owner_profile else None,
+    )
+    # Слоты уже сгруппированы по локальным дням и закэшированы
+    version = get_schedule_version(session.id)
+    days = get_public_schedule(session.id, guest_timezone, version=version)
+
+    book_url = _url_template(
+        'bookings:book_slot', public_link=_SAMPLE_LINK, slot_id=_SAMPLE_ID
+    ).replace('{public_link}', public_link)
+    slots_count = 0
+    for day in days:
+        for slot in day['slots']:
+            slot['book_url'] = book_url.format(slot_id=slot['id'])
+        slots_count += len(day['slots'])
+
+    # Прошедшие слоты уходят из начала списка, поэтому первый слот и
+    # количество вместе с версией однозначно задают видимый список
+    first_ts = days[0]['slots'][0]['start_ts'] if days else 0
+    context = {
+        'session': session,
+        'days': days,
+        'slots_count': slots_count,
+        'public_link': public_link,
+        'guest_timezone': guest_timezone,
+        'schedule_version': f'{version}:{first_ts}:{slots_count}',
+        'live_events': settings.LIVE_EVENTS_ENABLED,
+    }
+    response = render(request, 'bookings/public_view.html', context)
+    if request.GET.get('tz') == guest_timezone:
+        response.set_cookie(GUEST_TZ_COOKIE, guest_timezone, max_age=60 * 60 * 24 * 365, samesite='Lax')
+    return response
+
+async def public_events(request, public_link):
+    """
+    SSE поток изменений доступности слотов для открытой публичной страницы
+
+    Работает под ASGI: соединение держит только корутина, а сообщения
+    приходят из общей подписки процесса на Redis (см. live.py). Под WSGI
+    бесконечный поток занял бы воркер целиком, поэтому там, как и при
+    выключенных событиях, отвечаем 204: EventSource больше не переподключается,
+    а страница остается без живых обновлений.
+    """
+    if not settings.LIVE_EVENTS_ENABLED or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    session_id = await sync_to_async(resolve_public_link)(public_link)
+    if session_id is None:
+        raise Http404('Session not found')
+
+    response = StreamingHttpResponse(
+        stream_slot_events(session_id), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Отключаем буферизацию ответа в nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _render_in_guest_timezone(request, template_name, context):
+    """Рендерит шаблон, показывая время в часовом поясе гостя"""
+    with timezone.override(get_zone(get_guest_timezone(request))):
+        return render(request, template_name, context)
+
+
 def book_slot(request, public_link, slot_id):
     try:
-        slot = TimeSlot.objects.get(id=slot_id, session__public_link=public_link)
+        session_id = resolve_public_link(public_link)
+        if session_id is None:
+            # session_id=None совпал бы со слотами без сессии
+            raise TimeSlot.DoesNotExist
+        # Все, что нужно save(), сигналам и уведомлению, - одним запросом
+        slot = TimeSlot.objects.select_related(
+            'owner__profile', 'session', 'booked_by'
+        ).annotate(
+            held_for_id=held_for_user_id()
+        ).get(id=slot_id, session_id=session_id)
         
         if request.method == 'POST':
             if slot.is_booked:
                 messages.error(request, 'Slot already booked')
-                return redirect('bookings:public_view', public_link=public_link)
+                return redirect('bookings:public_booking', public_link=public_link)
+
+            # Слот может удерживаться за гостем из листа ожидания; в групповом
+            # слоте за ним держится только одно место
+            held_for_other = bool(slot.held_for_id) and slot.held_for_id != request.user.id
+            if held_for_other and not slot.is_group:
+                messages.error(request, 'This slot is on hold for a waitlisted guest')
+                return redirect('bookings:public_booking', public_link=public_link)
             
+            booker, guest_name = None, ''
             if request.user.is_authenticated:
-                slot.booked_by = request.user
+                booker = request.user
             else:
                 # Для гостей - сохранить имя
                 guest_name = request.POST.get('guest_name', '').strip()
@@ -146,22 +379,58 @@ def book_slot(request, public_link, slot_id):
                         'slot': slot,
                         'public_link': public_link,
                     }
-                    return render(request, 'bookings/book_slot.html', context)
+                    return _render_in_guest_timezone(request, 'bookings/book_slot.html', context)
+
+            if slot.is_group:
+                # Групповой слот: одно условное UPDATE на место, без копий слота
+                try:
+                    claim_seat(slot, booker, guest_name, reserved=int(held_for_other))
+                except SeatUnavailable as e:
+                    messages.error(request, str(e))
+                    return redirect('bookings:public_booking', public_link=public_link)
+                if slot.held_for_id and not held_for_other:
+                    mark_offer_booked(slot, request.user)
+                messages.success(request, 'Seat booked successfully!')
+                return redirect('bookings:public_booking', public_link=public_link)
+
+            if booker is not None:
+                slot.booked_by = booker
+            else:
                 slot.guest_name = guest_name
-            
+
             slot.save()
+            if slot.held_for_id:
+                mark_offer_booked(slot, request.user)
             messages.success(request, 'Slot booked successfully!')
-            return redirect('bookings:public_view', public_link=public_link)
+            return redirect('bookings:public_booking', public_link=public_link)
         
         context = {
             'slot': slot,
             'public_link': public_link,
         }
-        return render(request, 'bookings/book_slot.html', context)
+        return _render_in_guest_timezone(request, 'bookings/book_slot.html', context)
         
     except TimeSlot.DoesNotExist:
         messages.error(request, 'Slot not found')
-        return redirect('bookings:public_view', public_link=public_link)
+        return redirect('bookings:public_booking', public_link=public_link)
+
+
+@login_required
+@require_POST
+def join_waitlist(request, public_link):
+    """
+    Подписка на освобождение слотов сессии
+    """
+    session_id = resolve_public_link(public_link)
+    if session_id is None:
+        raise Http404('Session not found')
+    session = get_object_or_404(BookingSession, pk=session_id)
+    entry, created = join_waitlist_entry(session, request.user)
+    if created:
+        messages.success(request, "You're on the waitlist. We'll message you in Telegram when a slot frees up.")
+    else:
+        messages.info(request, "You're already on the waitlist for this session.")
+    return redirect('bookings:public_booking', public_link=public_link)
 
 
 def register(request):
@@ -186,17 +455,39 @@ def register(request):
 
 
 
+@login_required
+def profile_settings(request):
+    """
+    Настройки профиля: часовой пояс и язык уведомлений
+    """
+    profile, _ = UserProfile.objects.get_or_create(user=request.user)
+    if request.method == 'POST':
+        form = ProfileSettingsForm(request.POST, instance=profile)
+        if form.is_valid():
+            profile = form.save()
+            remember_owner_timezone(request, profile.timezone)
+            messages.success(request, 'Settings saved!')
+            return redirect('bookings:profile_settings')
+    else:
+        form = ProfileSettingsForm(instance=profile)
+
+    return render(request, 'bookings/profile_settings.html', {'form': form})
+
+
 @login_required
 def sessions_list(request):
     """
     List of all session
     """
+    query = request.GET.get('q', '').strip()
     sessions = BookingSession.objects.filter(
         owner_session=request.user
     ).order_by('-created_at')
+    sessions = search_sessions(sessions, query)
     
     context = {
         'sessions': sessions,
+        'query': query,
     }
     return render(request, 'bookings/sessions_list.html', context)
 
@@ -264,7 +555,8 @@ def delete_session(request, session_id):
     
     if request.method == 'POST':
         session_title = session.title
-        session.delete()
+        # Слоты скрываются одним UPDATE, физически их удалит фоновая очистка
+        soft_delete_session(session)
         messages.success(request, f'Session "{session_title}" deleted successfully!')
         return redirect('bookings:sessions_list')
     
@@ -274,6 +566,61 @@ def delete_session(request, session_id):
     return render(request, 'bookings/delete_session.html', context)
 
 
+# ==================== ИМПОРТ И ЭКСПОРТ ====================
+
+MAX_IMPORT_ERRORS_SHOWN = 20
+
+
+@login_required
+def import_slots(request):
+    """
+    Массовая загрузка слотов из CSV или JSON файла
+    """
+    sessions = list(BookingSession.objects.filter(
+        owner_session=request.user).order_by('-created_at'))
+    result = None
+
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        session = next((s for s in sessions if str(s.id) == request.POST.get('session_id')), None)
+        if upload is None or session is None:
+            messages.error(request, 'Please choose a session and a file')
+        else:
+            if upload.name.lower().endswith(('.json', '.jsonl')):
+                rows = iter_json_rows(upload)
+            else:
+                rows = iter_csv_rows(upload)
+            profile = UserProfile.objects.filter(user=request.user).first()
+            tz = get_zone(profile.timezone if profile else settings.TIME_ZONE)
+            try:
+                result = import_slot_rows(request.user, session, rows, tz)
+            except TRANSFER_READ_ERRORS as e:
+                messages.error(request, f'Could not read the file: {e}')
+            else:
+                messages.success(request, f'Imported {result.created} slot(s)')
+
+    context = {
+        'sessions': sessions,
+        'result': result,
+        'errors': result.errors[:MAX_IMPORT_ERRORS_SHOWN] if result else [],
+        'hidden_errors': max(len(result.errors) - MAX_IMPORT_ERRORS_SHOWN, 0) if result else 0,
+    }
+    return render(request, 'bookings/import_slots.html', context)
+
+
+@login_required
+def export_slots(request):
+    """
+    Потоковая выгрузка слотов в CSV; ?booked=1 - только бронирования
+    """
+    slots = TimeSlot.objects.filter(owner=request.user)
+    if request.GET.get('booked'):
+        slots = slots.filter(is_booked=True)
+    response = StreamingHttpResponse(iter_slots_csv(slots), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="slots.csv"'
+    return response
+
+
 # ==================== УПРАВЛЕНИЕ СЛОТАМИ ====================
 
 @login_required
@@ -299,7 +646,10 @@ def cancel_booking(request, slot_id):
     """
     Отмена бронирования (только владелец слота может отменить)
     """
-    slot = get_object_or_404(TimeSlot, id=slot_id, owner=request.user)
+    slot = get_object_or_404(
+        TimeSlot.objects.select_related('owner__profile', 'session'),
+        id=slot_id, owner=request.user,
+    )
     
     if request.method == 'POST':
         if not slot.is_booked:
@@ -320,4 +670,69 @@ def cancel_booking(request, slot_id):
     return render(request, 'bookings/cancel_booking.html', context)
 
 
+@login_required
+@require_POST
+def cancel_seat(request, slot_id, booking_id):
+    """
+    Отмена одного места в групповом слоте (только владелец слота)
+    """
+    booking = get_object_or_404(
+        SlotBooking.objects.select_related('slot'),
+        id=booking_id, slot_id=slot_id, slot__owner=request.user,
+    )
+    if release_seat(booking):
+        messages.success(request, 'Seat cancelled successfully!')
+    return redirect('bookings:my_slots')
+
+
+# ==================== TELEGRAM ====================
+
+@login_required
+def telegram_link(request):
+    """
+    Перенаправляет пользователя в бота с одноразовым токеном привязки
+    """
+    if not settings.TELEGRAM_BOT_USERNAME:
+        messages.error(request, 'Telegram bot is not configured')
+        return redirect('bookings:dashboard')
+
+    token = create_link_token(request.user)
+    return redirect(get_deep_link(token))
+
+
+@csrf_exempt
+@require_POST
+def telegram_webhook(request):
+    """
+    Принимает update от Telegram и ставит его в очередь Celery
+
+    Здесь только проверка секрета и дедупликация по update_id,
+    разбор и привязка аккаунта выполняются в воркере.
+    """
+    secret = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+    if not settings.TELEGRAM_WEBHOOK_SECRET or not hmac.compare_digest(
+        secret, settings.TELEGRAM_WEBHOOK_SECRET
+    ):
+        return HttpResponseForbidden()
+
+    try:
+        update = json.loads(request.body)
+        update_id = int(update['update_id'])
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest()
+
+    text = ((update.get('message') or {}).get('text') or '')
+    # Telegram повторяет доставку, пока не получит 200 - отвечаем сразу
+    if text.startswith('/start') and mark_update_seen(update_id):
+        try:
+            process_telegram_update.delay({
+                'update_id': update_id,
+                'message': update['message'],
+            })
+        except Exception as e:
+            # Брокер недоступен: пусть Telegram доставит update еще раз
+            logger.error(f"Could not enqueue Telegram update {update_id}: {e}")
+            forget_update(update_id)
+            return HttpResponse(status=503)
+    return HttpResponse(status=200)
 
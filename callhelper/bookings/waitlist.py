@@ -0,0 +1,205 @@
+"""
+Лист ожидания с автоматическим продвижением
+
+Когда бронирование отменяется, слот предлагается первому ожидающему:
+слот удерживается за ним HOLD на короткое время, а ему уходит уведомление
+в Telegram. Очередь разбирается через SELECT ... FOR UPDATE SKIP LOCKED,
+поэтому параллельные отмены не выдают одну запись дважды.
+"""
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import TimeSlot, UserProfile, WaitlistEntry
+from .live import publish_slot_event
+from .outbox import enqueue_notification
+from .schedule import invalidate_public_schedule
+
+logger = logging.getLogger(__name__)
+
+
+def hold_duration():
+    return timedelta(minutes=settings.WAITLIST_HOLD_MINUTES)
+
+
+def join_waitlist(session, user, slot=None):
+    """
+    Подписывает пользователя на освобождение слотов сессии
+
+    Returns:
+        tuple: (entry, created)
+    """
+    existing = WaitlistEntry.objects.filter(
+        session=session,
+        user=user,
+        status__in=[WaitlistEntry.STATUS_WAITING, WaitlistEntry.STATUS_OFFERED],
+    ).first()
+    if existing:
+        return existing, False
+    try:
+        with transaction.atomic():
+            return WaitlistEntry.objects.create(session=session, user=user, slot=slot), True
+    except IntegrityError:
+        # Параллельный запрос уже создал запись
+        return WaitlistEntry.objects.get(
+            session=session,
+            user=user,
+            status__in=[WaitlistEntry.STATUS_WAITING, WaitlistEntry.STATUS_OFFERED],
+        ), False
+
+
+def active_offer(slot_id, now=None):
+    """Возвращает действующее предложение по слоту или None"""
+    return WaitlistEntry.objects.filter(
+        offered_slot_id=slot_id,
+        status=WaitlistEntry.STATUS_OFFERED,
+        hold_expires_at__gt=now or timezone.now(),
+    ).first()
+
+
+def held_for_user_id(now=None):
+    """
+    Subquery for annotate(): id of the guest the slot is held for, so the
+    booking path learns about holds without a separate query
+    """
+    return Subquery(WaitlistEntry.objects.filter(
+        offered_slot_id=OuterRef('pk'),
+        status=WaitlistEntry.STATUS_OFFERED,
+        hold_expires_at__gt=now or timezone.now(),
+    ).values('user_id')[:1])
+
+
+def promote_next(slot_id):
+    """
+    Предлагает свободный слот следующему в очереди
+
+    Returns:
+        WaitlistEntry | None: запись, которой предложен слот
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Блокировка слота сериализует продвижение по одному слоту
+        slot = TimeSlot.objects.select_for_update().filter(
+            pk=slot_id,
+            is_booked=False,
+            start_time__gt=now,
+        ).first()
+        if slot is None or slot.session_id is None or active_offer(slot.pk, now):
+            return None
+
+        entry = WaitlistEntry.objects.select_for_update(skip_locked=True).filter(
+            Q(slot__isnull=True) | Q(slot=slot),
+            session_id=slot.session_id,
+            status=WaitlistEntry.STATUS_WAITING,
+        ).order_by('created_at').first()
+        if entry is None:
+            return None
+
+        entry.status = WaitlistEntry.STATUS_OFFERED
+        entry.offered_slot = slot
+        entry.hold_expires_at = now + hold_duration()
+        entry.save(update_fields=['status', 'offered_slot', 'hold_expires_at', 'updated_at'])
+
+        _notify_offer(entry, slot)
+        invalidate_public_schedule(slot.session_id)
+        # В групповом слоте остальные места по-прежнему свободны
+        publish_slot_event(slot.session_id, slot.pk, 'resync' if slot.is_group else 'unavailable')
+        transaction.on_commit(lambda: _schedule_expiry(entry))
+    return entry
+
+
+def _notify_offer(entry, slot):
+    from .telegram_service import load_slot_notification, render_waitlist_offer
+
+    profile = UserProfile.objects.filter(user_id=entry.user_id).first()
+    if not profile or not profile.telegram_id:
+        return
+
+    notification = load_slot_notification(slot.pk)
+    # Язык и часовой пояс - получателя, а не владельца слота
+    notification.language = profile.language
+    notification.timezone = profile.timezone
+    url = settings.SITE_URL + reverse(
+        'bookings:book_slot',
+        kwargs={'public_link': slot.session.public_link, 'slot_id': slot.pk},
+    )
+    enqueue_notification(
+        profile.telegram_id,
+        render_waitlist_offer(notification, settings.WAITLIST_HOLD_MINUTES, url),
+    )
+
+
+def schedule_promotion(slot_id):
+    """Запускает продвижение очереди по освободившемуся слоту после коммита"""
+    transaction.on_commit(lambda: _delay_promotion(slot_id))
+
+
+def _delay_promotion(slot_id):
+    from .tasks import promote_waitlist
+
+    try:
+        promote_waitlist.delay(slot_id)
+    except Exception as e:
+        logger.error(f"Не удалось запустить продвижение листа ожидания: {e}")
+
+
+def _schedule_expiry(entry):
+    from .tasks import expire_waitlist_offer
+
+    try:
+        expire_waitlist_offer.apply_async(
+            args=[entry.pk],
+            countdown=hold_duration().total_seconds(),
+        )
+    except Exception as e:
+        # Просроченные предложения подберет периодическая задача
+        logger.warning(f"Could not schedule waitlist expiry: {e}")
+
+
+def expire_offer(entry_id):
+    """
+    Снимает просроченное удержание и продвигает очередь дальше
+
+    Returns:
+        bool: True если предложение истекло
+    """
+    with transaction.atomic():
+        entry = WaitlistEntry.objects.select_for_update(skip_locked=True).filter(
+            pk=entry_id,
+            status=WaitlistEntry.STATUS_OFFERED,
+            hold_expires_at__lte=timezone.now(),
+        ).first()
+        if entry is None:
+            return False
+        entry.status = WaitlistEntry.STATUS_EXPIRED
+        entry.save(update_fields=['status', 'updated_at'])
+        slot_id = entry.offered_slot_id
+        invalidate_public_schedule(entry.session_id)
+        publish_slot_event(entry.session_id, slot_id, 'available')
+
+    if slot_id:
+        promote_next(slot_id)
+    return True
+
+
+def expire_stale_offers():
+    """Периодическая страховка: истекает все просроченные предложения"""
+    expired_ids = WaitlistEntry.objects.filter(
+        status=WaitlistEntry.STATUS_OFFERED,
+        hold_expires_at__lte=timezone.now(),
+    ).values_list('pk', flat=True)
+    return sum(expire_offer(entry_id) for entry_id in list(expired_ids))
+
+
+def mark_offer_booked(slot, user):
+    """Закрывает предложение, если слот забронировал тот, кому он предложен"""
+    WaitlistEntry.objects.filter(
+        offered_slot=slot,
+        user=user,
+        status=WaitlistEntry.STATUS_OFFERED,
+    ).update(status=WaitlistEntry.STATUS_BOOKED, updated_at=timezone.now())
@@ -12,14 +12,21 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+# Пакет callhelper уже загрузил приложение Celery (callhelper/__init__.py),
+# поэтому crontab здесь почти ничего не стоит при старте процесса
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Load environment variables. Явный путь вместо find_dotenv(), который
+# обходит стек и каталоги при каждом запуске процесса
+for env_file in (BASE_DIR / '.env', BASE_DIR.parent / '.env'):
+    if env_file.is_file():
+        load_dotenv(env_file)
+        break
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
@@ -42,6 +49,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_celery_beat',
     'bookings',
 ]
@@ -52,18 +60,27 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'bookings.middleware.OwnerTimezoneMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'callhelper.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # В production шаблоны компилируются один раз на процесс
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -84,6 +101,85 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 CELERY_TIMEZONE = 'UTC'
 
+# Отдельные очереди, чтобы всплеск уведомлений не задерживал остальное
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+# Очереди описаны словарем: Celery сам создаст kombu.Queue для каждой
+CELERY_TASK_QUEUES = {
+    'default': {},
+    'notifications': {},
+    'reminders': {},
+    'maintenance': {},
+}
+CELERY_TASK_ROUTES = {
+    'bookings.tasks.dispatch_notification_outbox': {'queue': 'notifications'},
+    'bookings.tasks.process_telegram_update': {'queue': 'notifications'},
+    'bookings.tasks.send_slot_reminder': {'queue': 'reminders'},
+    # Предложение слота из листа ожидания ждет гость, а не ночная очередь
+    'bookings.tasks.promote_waitlist': {'queue': 'notifications'},
+    'bookings.tasks.expire_waitlist_offer': {'queue': 'notifications'},
+    'bookings.tasks.expire_waitlist_holds': {'queue': 'maintenance'},
+    'bookings.tasks.reconcile_counters': {'queue': 'maintenance'},
+    'bookings.tasks.refresh_utilization_rollups': {'queue': 'maintenance'},
+    'bookings.tasks.purge_deleted_rows': {'queue': 'maintenance'},
+}
+# Задачи в основном ждут сеть: берем по одной и подтверждаем после выполнения
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Расписание beat хранится в коде, DatabaseScheduler синхронизирует его в БД
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-notification-outbox': {
+        'task': 'bookings.tasks.dispatch_notification_outbox',
+        'schedule': 30.0,
+    },
+    'expire-waitlist-holds': {
+        'task': 'bookings.tasks.expire_waitlist_holds',
+        'schedule': crontab(minute='*/5'),
+    },
+    'refresh-utilization-rollups': {
+        'task': 'bookings.tasks.refresh_utilization_rollups',
+        'schedule': crontab(minute='*/10'),
+    },
+    'reconcile-session-counters': {
+        'task': 'bookings.tasks.reconcile_counters',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'purge-deleted-rows': {
+        'task': 'bookings.tasks.purge_deleted_rows',
+        'schedule': crontab(hour=4, minute=0),
+    },
+}
+
+TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
+TELEGRAM_BOT_USERNAME = os.getenv('TELEGRAM_BOT_USERNAME', '')
+TELEGRAM_WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET', '')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+# Транспорт сообщений, см. bookings/telegram_backends.py
+TELEGRAM_BACKEND = 'bookings.telegram_backends.HttpBackend'
+TELEGRAM_LINK_TOKEN_TTL = 60 * 15
+
+# Абсолютный адрес сайта для ссылок в уведомлениях
+SITE_URL = os.getenv('SITE_URL', 'http://127.0.0.1:8000')
+WAITLIST_HOLD_MINUTES = 15
+
+# Напоминание о встрече уходит владельцу за столько часов до начала
+REMINDER_LEAD_HOURS = 24
+
+# Удаленные сессии и слоты физически удаляются не раньше чем через это время
+SOFT_DELETE_RETENTION_HOURS = 24
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://127.0.0.1:6379')
+# Публикация событий слотов для живых публичных страниц (SSE)
+LIVE_EVENTS_ENABLED = os.getenv('LIVE_EVENTS_ENABLED', 'True') == 'True'
+
+# Общий кэш для веб и celery воркеров (токены привязки, дедупликация update)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'{REDIS_URL}/1',
+    }
+}
 
 
 DATABASES = {
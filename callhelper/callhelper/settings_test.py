@@ -0,0 +1,34 @@
+"""
+Settings for running the test suite without Postgres, Redis or Telegram
+
+    python manage.py test --settings=callhelper.settings_test
+"""
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Задачи выполняются сразу в процессе теста, брокер не нужен
+CELERY_BROKER_URL = 'memory://'
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_TASK_EAGER_PROPAGATES = True
+
+# Сообщения складываются в telegram_backends.LocmemBackend.outbox
+TELEGRAM_BOT_TOKEN = 'test-token'
+TELEGRAM_BACKEND = 'bookings.telegram_backends.LocmemBackend'
+
+LIVE_EVENTS_ENABLED = False
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']